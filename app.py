@@ -1,4 +1,8 @@
-from serve import main
+import os
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if os.getenv('SERVE_MODE', 'flask').lower() == 'async':
+        from serve_async import main
+    else:
+        from serve import main
+    main()
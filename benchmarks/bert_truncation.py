@@ -0,0 +1,42 @@
+# 校验截断后的 BERT 特征与完整模型一致，并对比前向耗时
+# 用法: python -m benchmarks.bert_truncation
+import time
+import torch
+from transformers import AutoModelForMaskedLM, AutoTokenizer
+from tools.path import pretrained_models_base_path
+from gptsovits.text.chinese.bert_feature_extractor import BertFeatureExtractor, verify_bert_features
+
+TEXTS = [
+    "今天天气不错，我们一起去公园散步吧。",
+    "这款手机支持五十瓦快充，三十分钟可以充满百分之八十的电量。",
+    "请在收到货物后七天内确认收货，如有质量问题可以申请退换。",
+]
+
+def timeit(fn, repeat=10):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    model_path = pretrained_models_base_path('gptsovits/chinese-roberta-wwm-ext-large')
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    max_diff = verify_bert_features(model_path, tokenizer, TEXTS)
+    print(f"max abs diff vs full model: {max_diff:.2e}")
+
+    full_model = AutoModelForMaskedLM.from_pretrained(model_path).eval()
+    extractor = BertFeatureExtractor(model_path)
+    inputs = tokenizer(TEXTS, return_tensors="pt", padding=True)
+    with torch.no_grad():
+        full_time = timeit(lambda: full_model(**inputs, output_hidden_states=True))
+        truncated_time = timeit(lambda: extractor(**inputs))
+
+    def param_bytes(module):
+        return sum(p.numel() * p.element_size() for p in module.parameters())
+
+    print(f"full:      {full_time * 1000:.1f} ms, {param_bytes(full_model) / 2**20:.0f} MB")
+    print(f"truncated: {truncated_time * 1000:.1f} ms, {param_bytes(extractor) / 2**20:.0f} MB")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# 对比 float32 与动态 int8 量化的 T2S 在 CPU 上的 RTF、权重内存和 semantic token 一致率
+# 用法: python -m benchmarks.int8_quantization --voice <voice_id> --ref_id <ref_id>
+import argparse
+import time
+import torch
+from gptsovits.index import GPTSovits
+from gptsovits.frontend import GPTSovitsFrontend
+from gptsovits.AR.models.t2s_quantized import quantized_memory_size
+
+SENTENCES = [
+    '今天天气很好，我们一起去公园散步吧。',
+    '这款手机支持五十瓦快充，半小时可以充满百分之八十的电量。',
+    '根据最新发布的数据，今年第三季度的国内生产总值同比增长了百分之五点二。',
+    '请在下单后二十四小时内完成付款，否则订单将被自动取消。',
+    '他说这件事情需要再考虑一下，明天给我们答复。',
+]
+
+def t2s_weight_bytes(t2s_model):
+    tensors = list(t2s_model.parameters()) + list(t2s_model.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors) + quantized_memory_size(t2s_model)
+
+def run(gptsovits, ref_id, seed):
+    reference = gptsovits.get_reference(ref_id)
+    model = gptsovits.model
+    tokens = []
+    audio_seconds = 0
+    start = time.perf_counter()
+    for text in SENTENCES:
+        for sentence_index, model_input in enumerate(gptsovits.frontend.zero_shot(text, reference)):
+            generators = model.create_generators(seed, sentence_index)
+            pred_semantic = model._extract_pred_semantic(
+                model_input['all_phoneme_ids'], model_input['all_phoneme_len'],
+                model_input['prompt_semantic'], model_input['bert_features'], generators['t2s_generator'],
+            )
+            audio = model.sovits.decode(pred_semantic, model_input['phoneme'], None, ge=model_input['ge'], generator=generators['sovits_generator'])
+            tokens.append(pred_semantic.flatten().cpu())
+            audio_seconds += audio.shape[-1] / 32000
+    return time.perf_counter() - start, audio_seconds, tokens
+
+def agreement(tokens_a, tokens_b):
+    matched = total = 0
+    for a, b in zip(tokens_a, tokens_b):
+        n = min(len(a), len(b))
+        matched += (a[:n] == b[:n]).sum().item()
+        total += max(len(a), len(b))
+    return matched / total
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--voice', required=True)
+    parser.add_argument('--ref_id', required=True)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--threads', type=int, default=0)
+    args = parser.parse_args()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    frontend = GPTSovitsFrontend()
+    results = {}
+    for name in ['float32', 'int8']:
+        gptsovits = GPTSovits(args.voice, frontend=frontend)
+        # 与服务相同，通过 T2S 的 Precision 量化 (等同于 PRECISION_T2S=int8)
+        gptsovits.load(t2s_precision='int8' if name == 'int8' else 'fp32')
+        assert gptsovits.model.t2s_precision.name == ('int8' if name == 'int8' else 'fp32')
+        # top_k=1 时为贪心解码，token 一致率只反映量化误差
+        gptsovits.model.top_k = 1
+        with torch.no_grad():
+            run(gptsovits, args.ref_id, args.seed)
+            elapsed, audio_seconds, tokens = run(gptsovits, args.ref_id, args.seed)
+        results[name] = (elapsed / audio_seconds, t2s_weight_bytes(gptsovits.model.gpt.model), tokens)
+        print(f"{name:8s} RTF: {elapsed / audio_seconds:.3f}  T2S weights: {results[name][1] / 1024 / 1024:.1f} MB")
+
+    rtf_fp32, mem_fp32, tokens_fp32 = results['float32']
+    rtf_int8, mem_int8, tokens_int8 = results['int8']
+    print(f"speedup: {rtf_fp32 / rtf_int8:.2f}x, memory: {mem_int8 / mem_fp32:.2%} of float32")
+    print(f"semantic token agreement (greedy): {agreement(tokens_fp32, tokens_int8):.2%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# 对比逐音节重建映射表的拼音->音素转换与预先计算的 SYLLABLE_INDEX 的速度 (syllables/sec)
+# 用法: python -m benchmarks.pinyin_index --syllables 200000
+import argparse
+import random
+import time
+from gptsovits.text.chinese.pinyin_index import SYLLABLE_INDEX, pinyin_to_symbol_map
+
+def map_pinyin_to_phone(c, v):
+    # 原实现：每个音节重建替换表、检查 keys() 并拆分字符串
+    v_without_tone = v[:-1]
+    tone = v[-1]
+    assert tone in "12345"
+    if c:
+        v_rep_map = {"uei": "ui", "iou": "iu", "uen": "un"}
+        pinyin = c + v_rep_map.get(v_without_tone, v_without_tone)
+    else:
+        pinyin = c + v_without_tone
+        pinyin_rep_map = { "ing": "ying", "i": "yi", "in": "yin", "u": "wu" }
+        if pinyin in pinyin_rep_map.keys():
+            pinyin = pinyin_rep_map[pinyin]
+        else:
+            single_rep_map = { "v": "yu", "e": "e", "i": "y", "u": "w" }
+            if pinyin[0] in single_rep_map.keys():
+                pinyin = single_rep_map[pinyin[0]] + pinyin[1:]
+    assert pinyin in pinyin_to_symbol_map.keys()
+    new_c, new_v = pinyin_to_symbol_map[pinyin].split(" ")
+    return [new_c, new_v + tone]
+
+def run_legacy(syllables):
+    phones = []
+    for c, v in syllables:
+        phones.extend(map_pinyin_to_phone(c, v))
+    return phones
+
+def run_index(syllables):
+    phones = []
+    for c, v in syllables:
+        phones.extend(SYLLABLE_INDEX[(c, v)])
+    return phones
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--syllables', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    keys = list(SYLLABLE_INDEX)
+    syllables = random.Random(args.seed).choices(keys, k=args.syllables)
+
+    results = {}
+    for name, fn in [('legacy', run_legacy), ('index', run_index)]:
+        fn(syllables[:1000])
+        start = time.perf_counter()
+        phones = fn(syllables)
+        elapsed = time.perf_counter() - start
+        results[name] = (args.syllables / elapsed, phones)
+        print(f"{name:6s}: {args.syllables / elapsed:,.0f} syllables/sec")
+
+    print(f"speedup: {results['index'][0] / results['legacy'][0]:.2f}x, phones match: {results['index'][1] == results['legacy'][1]}")
+    print(f"index covers {len(SYLLABLE_INDEX)} (initial, final+tone) keys")
+
+if __name__ == '__main__':
+    main()
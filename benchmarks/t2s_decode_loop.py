@@ -0,0 +1,78 @@
+# 对比逐步同步 EOS 的解码循环与按块检查 EOS 的 infer_panel_naive 的解码速度 (steps/sec)
+# 用法: python -m benchmarks.t2s_decode_loop --steps 500 --device cpu
+import argparse
+import time
+import torch
+from tqdm import tqdm
+from gptsovits.AR.models.sampler import Sampler
+from gptsovits.AR.models.t2s_model import Text2SemanticDecoder
+from benchmarks.t2s_kv_cache import CONFIG
+
+def run_per_step_sync(model, x, prompts, bert_feature, steps, seed):
+    # 原实现：每步 argmax/EOS 判断同步回 host，torch.concat 追加 y，每步索引并转换位置编码，带 tqdm 进度条
+    xy_pos, xy_attn_mask, y, y_len, prefix_len, ref_free = model.prepare_prompt(x, prompts, bert_feature)
+    src_len = xy_pos.shape[1]
+    generator = torch.Generator(device=x.device).manual_seed(seed)
+    sampler = Sampler(y, model.vocab_size, top_k=15, top_p=1, temperature=1, repetition_penalty=1.35, generator=generator)
+    kv_cache = None
+    start = time.perf_counter()
+    for idx in tqdm(range(steps)):
+        if xy_attn_mask is not None:
+            xy_dec, kv_cache = model.t2s_transformer.process_prompt(xy_pos, xy_attn_mask, None, True, src_len + 1500)
+        else:
+            xy_dec, kv_cache = model.t2s_transformer.decode_next_token(xy_pos, kv_cache)
+        logits = model.ar_predict_layer(xy_dec[:, -1])
+        if idx == 0:
+            xy_attn_mask = None
+            logits = logits[:, :-1]
+        samples = sampler.sample(logits)
+        y = torch.concat([y, samples], dim=1)
+        if (y.shape[1] - prefix_len) > steps - 1:
+            break
+        if torch.argmax(logits, dim=-1)[0] == model.EOS or samples[0, 0] == model.EOS:
+            break
+        y_emb = model.ar_audio_embedding(y[:, -1:])
+        xy_pos = y_emb * model.ar_audio_position.x_scale + model.ar_audio_position.alpha * model.ar_audio_position.pe[:, y_len + idx].to(dtype=y_emb.dtype, device=y_emb.device)
+    return time.perf_counter() - start, y[:, :-1]
+
+def run_blocked(model, x, prompts, bert_feature, steps, seed, eos_check_interval):
+    generator = torch.Generator(device=x.device).manual_seed(seed)
+    start = time.perf_counter()
+    y, _ = model.infer_panel_naive(
+        x, None, prompts, bert_feature, top_k=15, top_p=1, temperature=1, early_stop_num=steps - 1,
+        generator=generator, eos_check_interval=eos_check_interval,
+    )
+    return time.perf_counter() - start, y
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--steps', type=int, default=500)
+    parser.add_argument('--text_len', type=int, default=60)
+    parser.add_argument('--prompt_len', type=int, default=150)
+    parser.add_argument('--eos_check_interval', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--device', default='cpu')
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    device = torch.device(args.device)
+    model = Text2SemanticDecoder(CONFIG).to(device).eval()
+    x = torch.randint(0, CONFIG["phoneme_vocab_size"], (1, args.text_len), device=device)
+    prompts = torch.randint(0, CONFIG["EOS"], (1, args.prompt_len), device=device)
+    bert_feature = torch.randn(1, 1024, args.text_len, device=device)
+
+    with torch.no_grad():
+        # 预热
+        run_per_step_sync(model, x, prompts, bert_feature, 8, args.seed)
+        run_blocked(model, x, prompts, bert_feature, 8, args.seed, args.eos_check_interval)
+        sync_time, y_sync = run_per_step_sync(model, x, prompts, bert_feature, args.steps, args.seed)
+        blocked_time, y_blocked = run_blocked(model, x, prompts, bert_feature, args.steps, args.seed, args.eos_check_interval)
+
+    sync_steps = y_sync.shape[1] - args.prompt_len + 1
+    blocked_steps = y_blocked.shape[1] - args.prompt_len + 1
+    print(f"per-step sync: {sync_steps / sync_time:.1f} steps/sec ({sync_steps} steps)")
+    print(f"blocked (N={args.eos_check_interval}): {blocked_steps / blocked_time:.1f} steps/sec ({blocked_steps} steps)")
+    print(f"speedup: {(blocked_steps / blocked_time) / (sync_steps / sync_time):.2f}x, tokens match: {torch.equal(y_sync.long(), y_blocked.long())}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# 对比逐条执行全部规则的中文文本规范化与按触发字符预筛的规范化的速度，并校验结果一致
+# 用法: python -m benchmarks.zh_normalizer --repeat 200
+import argparse
+import re
+import time
+from gptsovits.text.chinese.zh_normalization.char_convert import tranditional_to_simplified
+from gptsovits.text.chinese.zh_normalization.constants import F2H_ASCII_LETTERS, F2H_DIGITS, F2H_SPACE
+from gptsovits.text.chinese.zh_normalization.quantifier import replace_measure
+from gptsovits.text.chinese.zh_normalization import text_normlization as tn
+
+# 新闻与电商场景的句子，大部分不含数字
+CORPUS = [
+    '国务院常务会议今天召开，研究部署进一步扩大内需的政策措施。',
+    '会议指出，要坚持稳中求进工作总基调，推动经济实现质的有效提升和量的合理增长。',
+    '2023年第三季度，全国规模以上工业增加值同比增长4.2%，比上季度加快0.5个百分点。',
+    '据气象台预报，明天白天多云转阴，最高气温28℃，夜间最低气温-3°C。',
+    '本次活动时间为8:30-12:30，请各位参会代表提前十五分钟到场签到。',
+    '记者从市交通委获悉，地铁十四号线东段将于年底前开通试运营。',
+    '该公司表示，将继续加大研发投入，提升核心竞争力，为用户提供更优质的服务。',
+    '专家认为，房地产市场正在逐步企稳，但仍需关注区域分化带来的风险。',
+    '事故发生后，当地政府立即启动应急预案，组织力量全力开展救援工作。',
+    '截至2024-06-30，该基金累计净值为1.2345元，近一年收益率为12.5%。',
+    '詳細資訊請聯繫客服中心，我們將竭誠為您服務。',
+    '这款保温杯容量500ml，采用304不锈钢内胆，保温时长可达12小时。',
+    '亲，本店所有商品均支持七天无理由退换货，请放心购买哦！',
+    '下单立减20元，满299元再送精美礼品一份，数量有限先到先得。',
+    '商品尺寸为30cm*20cm*10cm，净重1.5kg，适合家庭日常使用。',
+    '客服热线400-123-4567，工作时间为每天9:00~21:00。',
+    '如有疑问请拨打13812345678联系我们，我们会第一时间为您处理。',
+    '宝贝已经发货啦，预计三到五天送达，请注意查收。',
+    '这件衣服面料柔软舒适，版型宽松，适合春秋季节穿着。',
+    '收到货后如果满意的话，麻烦给个五星好评，谢谢亲的支持！',
+    '本产品不含任何防腐剂，开封后请冷藏保存并尽快食用。',
+    '使用前请仔细阅读说明书，儿童请在成人监护下使用。',
+    '已有1/3的用户选择了年度会员，平均每月仅需15元。',
+    '这台笔记本电脑搭载最新处理器，运行速度提升约30%，续航时间长达十小时。',
+    '小区周边配套齐全，步行五分钟即可到达超市、医院和学校。',
+    '他表示，双方将在人工智能、新能源等领域开展深入合作，实现互利共赢。',
+    '比赛第二节，主队凭借一波十比零的小高潮反超比分。',
+    '受降雨影响，部分航班出现延误，旅客可通过官方渠道查询最新动态。',
+    '新学期开学在即，各地教育部门纷纷出台措施，确保校园安全。',
+    '今年以来，全市新增城镇就业岗位约12万个，城镇调查失业率保持在较低水平。',
+]
+
+def legacy_normalize_sentence(normalizer, sentence):
+    # 原实现：每句依次执行全部规则
+    sentence = tranditional_to_simplified(sentence)
+    sentence = sentence.translate(F2H_ASCII_LETTERS).translate(F2H_DIGITS).translate(F2H_SPACE)
+    sentence = tn.RE_DATE.sub(tn.replace_date, sentence)
+    sentence = tn.RE_DATE2.sub(tn.replace_date2, sentence)
+    sentence = tn.RE_TIME_RANGE.sub(tn.replace_time, sentence)
+    sentence = tn.RE_TIME.sub(tn.replace_time, sentence)
+    sentence = tn.RE_TO_RANGE.sub(tn.replace_to_range, sentence)
+    sentence = tn.RE_DIMENSION.sub(tn.replace_dimension, sentence)
+    sentence = tn.RE_TEMPERATURE.sub(tn.replace_temperature, sentence)
+    sentence = replace_measure(sentence)
+    while tn.RE_ASMD.search(sentence):
+        sentence = tn.RE_ASMD.sub(tn.replace_asmd, sentence)
+    sentence = tn.RE_POWER.sub(tn.replace_power, sentence)
+    sentence = tn.RE_FRAC.sub(tn.replace_frac, sentence)
+    sentence = tn.RE_PERCENTAGE.sub(tn.replace_percentage, sentence)
+    sentence = tn.RE_MOBILE_PHONE.sub(tn.replace_mobile, sentence)
+    sentence = tn.RE_TELEPHONE.sub(tn.replace_phone, sentence)
+    sentence = tn.RE_NATIONAL_UNIFORM_NUMBER.sub(tn.replace_phone, sentence)
+    sentence = tn.RE_RANGE.sub(tn.replace_range, sentence)
+    sentence = tn.RE_INTEGER.sub(tn.replace_negative_num, sentence)
+    sentence = tn.RE_DECIMAL_NUM.sub(tn.replace_number, sentence)
+    sentence = tn.RE_POSITIVE_QUANTIFIERS.sub(tn.replace_positive_quantifier, sentence)
+    sentence = tn.RE_DEFAULT_NUM.sub(tn.replace_default_num, sentence)
+    sentence = tn.RE_NUMBER.sub(tn.replace_number, sentence)
+    return legacy_post_replace(sentence)
+
+def legacy_post_replace(sentence):
+    for key, value in tn.POST_REPLACE_TABLE.items():
+        sentence = sentence.replace(chr(key), value)
+    return re.sub(r'[-——《》【】<=>{}()（）#&@“”^_|\\]', '', sentence)
+
+def run_legacy(sentences):
+    # 原实现每次调用都新建 TextNormalizer
+    return [legacy_normalize_sentence(tn.TextNormalizer(), sentence) for sentence in sentences]
+
+def run_compiled(sentences):
+    return [tn.zh_text_normalizer.normalize_sentence(sentence) for sentence in sentences]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    sentences = [sentence for text in CORPUS for sentence in tn.zh_text_normalizer._split(text)]
+    legacy_outputs = run_legacy(sentences)
+    compiled_outputs = run_compiled(sentences)
+    mismatches = [(s, a, b) for s, a, b in zip(sentences, legacy_outputs, compiled_outputs) if a != b]
+    for sentence, expected, actual in mismatches:
+        print(f"mismatch: {sentence!r}\n  legacy:   {expected!r}\n  compiled: {actual!r}")
+
+    results = {}
+    for name, fn in [('legacy', run_legacy), ('compiled', run_compiled)]:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            fn(sentences)
+        elapsed = time.perf_counter() - start
+        results[name] = len(sentences) * args.repeat / elapsed
+        print(f"{name:8s}: {results[name]:,.0f} sentences/sec")
+    print(f"speedup: {results['compiled'] / results['legacy']:.2f}x, outputs match: {not mismatches} ({len(sentences)} sentences)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+from typing import List, Optional, Union
+import torch
+import torch.nn.functional as F
+
+
+def _row_param(value, batch_size: int, device, dtype=torch.float32) -> torch.Tensor:
+    """标量或每行一个值的列表 -> [B, 1] 张量"""
+    if isinstance(value, (list, tuple)):
+        assert len(value) == batch_size
+        return torch.tensor(value, dtype=dtype, device=device).unsqueeze(-1)
+    return torch.full((batch_size, 1), value, dtype=dtype, device=device)
+
+
+class Sampler:
+    """
+    T2S 解码的采样器，与 logits_to_probs + multinomial_sample_one_no_sync 的结果分布一致。
+    - 每行维护一张词表大小的 token 计数表，每步只做一次 scatter_add，不再对整段历史 gather/scatter
+    - top-k / top-p / 温度 / softmax 只在 topk 切片上计算，不对整个词表排序
+    - top_k、top_p、temperature、repetition_penalty 可以每行不同
+    - generator 可以是单个 torch.Generator 或每行一个
+    """
+    def __init__(
+        self,
+        prev_tokens: torch.Tensor,
+        vocab_size: int,
+        top_k: Union[int, List[int]] = -100,
+        top_p: Union[float, List[float]] = 100,
+        temperature: Union[float, List[float]] = 1.0,
+        repetition_penalty: Union[float, List[float]] = 1.35,
+        generator: Union[None, torch.Generator, List[Optional[torch.Generator]]] = None,
+    ):
+        batch_size = prev_tokens.shape[0]
+        device = prev_tokens.device
+        self.vocab_size = vocab_size
+        # prompt 中的 token 同样参与重复惩罚，与原实现保持一致
+        self.counts = torch.zeros((batch_size, vocab_size), dtype=torch.int32, device=device)
+        if prev_tokens.shape[1] > 0:
+            self.counts.scatter_add_(1, prev_tokens.long(), torch.ones_like(prev_tokens, dtype=torch.int32))
+
+        top_k = [k if k is not None and k > 0 else vocab_size for k in (top_k if isinstance(top_k, (list, tuple)) else [top_k] * batch_size)]
+        self.top_k = torch.tensor(top_k, dtype=torch.long, device=device).unsqueeze(-1)
+        self.row_top_k = top_k
+        # top_p >= 1 的行不做截断，用 inf 避免累加误差超过 1
+        top_p = [p if p is not None and p < 1.0 else float('inf') for p in (top_p if isinstance(top_p, (list, tuple)) else [top_p] * batch_size)]
+        self.top_p = torch.tensor(top_p, dtype=torch.float32, device=device).unsqueeze(-1)
+        self.use_top_p = any(p != float('inf') for p in top_p)
+        self.temperature = _row_param(temperature, batch_size, device).clamp_min(1e-5)
+        self.repetition_penalty = _row_param(repetition_penalty, batch_size, device)
+        self.generator = generator
+
+    @property
+    def batch_size(self) -> int:
+        return self.counts.shape[0]
+
+    @property
+    def max_top_k(self) -> int:
+        return max(self.row_top_k)
+
+    def sample(self, logits: torch.Tensor) -> torch.Tensor:
+        """logits [B, V'] (V' <= vocab_size) -> tokens [B, 1]，并把采样结果计入计数表"""
+        vocab = logits.shape[-1]
+        logits = logits.float()
+        penalty = self.repetition_penalty
+        penalized = torch.where(logits < 0, logits * penalty, logits / penalty)
+        logits = torch.where(self.counts[:, :vocab] > 0, penalized, logits)
+
+        # 参数在 host 上记录，避免每步同步设备
+        k = min(self.max_top_k, vocab)
+        values, indices = torch.topk(logits, k, dim=-1)
+        rank = torch.arange(k, device=logits.device).unsqueeze(0)
+        remove = rank >= self.top_k
+        if self.use_top_p:
+            # 截断按整个词表上(未除温度)的概率累加，topk 结果已按降序排列
+            cum_probs = torch.exp(values - torch.logsumexp(logits, dim=-1, keepdim=True)).cumsum(dim=-1)
+            remove = remove | ((cum_probs > self.top_p) & (rank > 0))
+        values = values.masked_fill(remove, -float('Inf')) / self.temperature
+        probs = F.softmax(values, dim=-1)
+
+        choice = torch.argmax(probs / self._exponential(probs), dim=-1, keepdim=True)
+        tokens = torch.gather(indices, -1, choice)
+        self.counts.scatter_add_(1, tokens, torch.ones_like(tokens, dtype=torch.int32))
+        return tokens
+
+    def index_select(self, index: torch.Tensor) -> 'Sampler':
+        """只保留 index 中的行"""
+        rows = index.tolist()
+        self.counts = self.counts.index_select(0, index)
+        self.top_k = self.top_k.index_select(0, index)
+        self.row_top_k = [self.row_top_k[i] for i in rows]
+        self.top_p = self.top_p.index_select(0, index)
+        self.temperature = self.temperature.index_select(0, index)
+        self.repetition_penalty = self.repetition_penalty.index_select(0, index)
+        if isinstance(self.generator, list):
+            self.generator = [self.generator[i] for i in rows]
+        return self
+
+    @staticmethod
+    def cat(samplers: List['Sampler']) -> 'Sampler':
+        """按行拼接多个采样器，用于把新请求加入正在解码的 batch"""
+        sampler = Sampler.__new__(Sampler)
+        sampler.vocab_size = samplers[0].vocab_size
+        sampler.row_top_k = [k for s in samplers for k in s.row_top_k]
+        sampler.use_top_p = any(s.use_top_p for s in samplers)
+        sampler.counts = torch.cat([s.counts for s in samplers], dim=0)
+        sampler.top_k = torch.cat([s.top_k for s in samplers], dim=0)
+        sampler.top_p = torch.cat([s.top_p for s in samplers], dim=0)
+        sampler.temperature = torch.cat([s.temperature for s in samplers], dim=0)
+        sampler.repetition_penalty = torch.cat([s.repetition_penalty for s in samplers], dim=0)
+        sampler.generator = [g for s in samplers for g in s._row_generators()]
+        return sampler
+
+    def _row_generators(self) -> List[Optional[torch.Generator]]:
+        if isinstance(self.generator, list):
+            return self.generator
+        if self.generator is not None and self.batch_size > 1:
+            raise ValueError('a shared generator cannot be split into rows')
+        return [self.generator] * self.batch_size
+
+    def _exponential(self, probs: torch.Tensor) -> torch.Tensor:
+        if not isinstance(self.generator, list):
+            return torch.empty_like(probs).exponential_(1, generator=self.generator)
+        if all(g is None for g in self.generator):
+            return torch.empty_like(probs).exponential_(1)
+        # 每行使用各自的 generator，且只按本行的 top_k 抽取噪声，抽取的数量与同 batch 的其他行无关；
+        # 本行 top_k 之外的概率为 0，噪声取 1 即可
+        noise = torch.ones_like(probs)
+        for i, g in enumerate(self.generator):
+            noise[i, :min(self.row_top_k[i], probs.shape[-1])].exponential_(1, generator=g)
+        return noise
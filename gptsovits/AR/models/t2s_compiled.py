@@ -0,0 +1,147 @@
+import bisect
+import logging
+import threading
+from typing import List, Optional
+import torch
+from torch import nn
+from torch.nn import functional as F
+
+logger = logging.getLogger(__name__)
+
+BLOCK_WEIGHTS = ['qkv_w', 'qkv_b', 'out_w', 'out_b', 'norm_w1', 'norm_b1', 'norm_w2', 'norm_b2']
+MLP_WEIGHTS = ['w1', 'b1', 'w2', 'b2']
+
+
+class T2SDecodeStep(nn.Module):
+    """
+    单个 token 的解码步，只看 KV 缓存的前 capacity 个位置，输入输出形状固定，可以整体编译成一张图。
+    权重和缓存都注册为非持久化 buffer，与 T2SBlock 共享同一份存储，不额外占用内存。
+    """
+    def __init__(self, blocks, k_cache: torch.Tensor, v_cache: torch.Tensor, capacity: int):
+        super().__init__()
+        self.num_layers = len(blocks)
+        self.num_heads = blocks[0].num_heads
+        self.hidden_dim = blocks[0].hidden_dim
+        self.capacity = capacity
+        self.norm_eps1 = [block.norm_eps1 for block in blocks]
+        self.norm_eps2 = [block.norm_eps2 for block in blocks]
+        for i, block in enumerate(blocks):
+            for name in BLOCK_WEIGHTS:
+                self.register_buffer(f'{name}_{i}', getattr(block, name), persistent=False)
+            for name in MLP_WEIGHTS:
+                self.register_buffer(f'mlp_{name}_{i}', getattr(block.mlp, name), persistent=False)
+        # [num_layers, 1, max_len, hidden_dim]，各个 bucket 共用，只取前 capacity 个位置
+        self.register_buffer('k_cache', k_cache, persistent=False)
+        self.register_buffer('v_cache', v_cache, persistent=False)
+
+    def forward(self, x: torch.Tensor, pos: torch.Tensor, k_cache: Optional[torch.Tensor] = None, v_cache: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """
+        x: [1, 1, D]，pos: [1] 当前 token 在缓存中的写入位置。
+        torch.compile 时缓存作为 buffer (CUDA Graph 的静态地址)；TorchScript freeze 会把 buffer 内联成常量，缓存改为作为输入传入。
+        """
+        capacity = self.capacity
+        k_cache = self.k_cache if k_cache is None else k_cache
+        v_cache = self.v_cache if v_cache is None else v_cache
+        mask = (torch.arange(capacity, device=x.device) <= pos).view(1, 1, 1, capacity)
+        for i in range(self.num_layers):
+            q, k, v = F.linear(x, getattr(self, f'qkv_w_{i}'), getattr(self, f'qkv_b_{i}')).chunk(3, dim=-1)
+            k_layer = k_cache[i, :, :capacity]
+            v_layer = v_cache[i, :, :capacity]
+            k_layer.index_copy_(1, pos, k)
+            v_layer.index_copy_(1, pos, v)
+
+            q = q.view(1, 1, self.num_heads, -1).transpose(1, 2)
+            k = k_layer.view(1, capacity, self.num_heads, -1).transpose(1, 2)
+            v = v_layer.view(1, capacity, self.num_heads, -1).transpose(1, 2)
+            attn = F.scaled_dot_product_attention(q, k, v, mask)
+            attn = attn.transpose(1, 2).reshape(1, 1, self.hidden_dim)
+            attn = F.linear(attn, getattr(self, f'out_w_{i}'), getattr(self, f'out_b_{i}'))
+
+            x = x + attn
+            x = F.layer_norm(x, [self.hidden_dim], getattr(self, f'norm_w1_{i}'), getattr(self, f'norm_b1_{i}'), self.norm_eps1[i])
+            h = F.relu(F.linear(x, getattr(self, f'mlp_w1_{i}'), getattr(self, f'mlp_b1_{i}')))
+            x = x + F.linear(h, getattr(self, f'mlp_w2_{i}'), getattr(self, f'mlp_b2_{i}'))
+            x = F.layer_norm(x, [self.hidden_dim], getattr(self, f'norm_w2_{i}'), getattr(self, f'norm_b2_{i}'), self.norm_eps2[i])
+        return x
+
+
+class T2SCompiledDecoder:
+    """
+    按 bucket 长度编译的解码步，每个 bucket 一张静态形状的图，解码时按当前缓存长度选用最小的 bucket。
+    各 bucket 在第一次用到时才编译，加载音色时不再集中编译全部 bucket。
+    backend 为 'compile' 时使用 torch.compile (CUDA 上为 reduce-overhead 即 CUDA Graph)，
+    为 'jit' 时使用 trace + freeze 的 TorchScript 图。
+    静态缓存只有一份，同一时间只服务一个请求，被占用时调用方回退到普通解码路径。
+    """
+    def __init__(self, t2s_model, backend: str = 'compile', bucket_size: int = 256, max_len: int = 2560):
+        blocks = t2s_model.t2s_transformer.blocks
+        weight = blocks[0].qkv_w
+        self.backend = backend
+        self.device = weight.device
+        self.dtype = weight.dtype
+        self.hidden_dim = blocks[0].hidden_dim
+        self.buckets = list(range(bucket_size, max_len + 1, bucket_size))
+        self.max_len = self.buckets[-1]
+        shape = (len(blocks), 1, self.max_len, self.hidden_dim)
+        self.k_cache = torch.zeros(shape, dtype=self.dtype, device=self.device)
+        self.v_cache = torch.zeros(shape, dtype=self.dtype, device=self.device)
+        self.pos = torch.zeros(1, dtype=torch.long, device=self.device)
+        self.lock = threading.Lock()
+        self.blocks = blocks
+        self.steps = {}
+
+    def _get_step(self, capacity: int):
+        # 调用方持有 self.lock，同一 bucket 只编译一次
+        step = self.steps.get(capacity)
+        if step is None:
+            logger.info('compiling t2s decode step (%s) for bucket %d', self.backend, capacity)
+            step = self.steps[capacity] = self._compile(T2SDecodeStep(self.blocks, self.k_cache, self.v_cache, capacity).eval())
+        return step
+
+    def _compile(self, step: T2SDecodeStep):
+        if self.backend == 'jit':
+            example = (torch.zeros(1, 1, self.hidden_dim, dtype=self.dtype, device=self.device), self.pos, self.k_cache, self.v_cache)
+            with torch.no_grad():
+                traced = torch.jit.trace(step, example, check_trace=False)
+            frozen = torch.jit.freeze(traced)
+            return lambda x, pos: frozen(x, pos, self.k_cache, self.v_cache)
+        mode = 'reduce-overhead' if self.device.type == 'cuda' else 'default'
+        return torch.compile(step, mode=mode, fullgraph=True, dynamic=False)
+
+    def warmup(self):
+        """提前编译并运行每个 bucket 的图，避免请求承担编译耗时；默认不调用，由第一次用到时编译"""
+        x = torch.zeros(1, 1, self.hidden_dim, dtype=self.dtype, device=self.device)
+        with torch.no_grad(), self.lock:
+            for capacity in self.buckets:
+                step = self._get_step(capacity)
+                self.pos.fill_(capacity - 1)
+                # CUDA Graph 需要先运行再录制
+                for _ in range(3):
+                    step(x, self.pos)
+            self.k_cache.zero_()
+            self.v_cache.zero_()
+        logger.info('compiled t2s decode step (%s) for buckets %s', self.backend, self.buckets)
+
+    def acquire(self, needed_len: int) -> bool:
+        """缓存长度足够且未被占用时占用静态缓存"""
+        if needed_len > self.max_len:
+            return False
+        return self.lock.acquire(blocking=False)
+
+    def release(self):
+        self.lock.release()
+
+    def load_prompt(self, k_cache: List[torch.Tensor], v_cache: List[torch.Tensor], length: int):
+        """把 process_prompt 得到的 KV 缓存拷贝进静态缓存"""
+        for i in range(len(k_cache)):
+            self.k_cache[i, :, :length] = k_cache[i][:, :length]
+            self.v_cache[i, :, :length] = v_cache[i][:, :length]
+
+    def step(self, x: torch.Tensor, pos: int) -> torch.Tensor:
+        capacity = self.buckets[bisect.bisect_left(self.buckets, pos + 1)]
+        self.pos.fill_(pos)
+        # CUDA Graph 的输出在下次回放时会被覆盖，拷贝出来再交给调用方
+        return self._get_step(capacity)(x, self.pos).clone()
+
+    def memory_size(self) -> int:
+        return 2 * self.k_cache.numel() * self.k_cache.element_size()
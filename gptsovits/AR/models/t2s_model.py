@@ -1,11 +1,13 @@
 # modified from https://github.com/yangdongchao/SoundStorm/blob/master/soundstorm/s1/AR/models/t2s_model.py
 # reference: https://github.com/lifeiteng/vall-e
 import math
+import logging
 from typing import List, Optional
 import torch
 from tqdm import tqdm
 
 from .utils import make_pad_mask
+from .sampler import Sampler
 from .utils import (
     topk_sampling,
     sample,
@@ -21,6 +23,13 @@ from torch import nn
 from torch.nn import functional as F
 from torchmetrics.classification import MulticlassAccuracy
 
+logger = logging.getLogger(__name__)
+
+# 单句最多解码的 semantic token 数
+MAX_DECODE_STEPS = 1500
+# 解码时每隔多少步把 EOS 标记同步回 host 检查一次
+EOS_CHECK_INTERVAL = 8
+
 default_config = {
     "embedding_dim": 512,
     "hidden_dim": 512,
@@ -183,19 +192,20 @@ class T2SBlock:
             )
         return x, k_cache, v_cache
     
-    def decode_next_token(self, x:torch.Tensor, k_cache:torch.Tensor, v_cache:torch.Tensor, attn_mask:Optional[torch.Tensor]=None, torch_sdpa:bool=True):
+    def decode_next_token(self, x:torch.Tensor, k_cache:torch.Tensor, v_cache:torch.Tensor, cache_len:int, attn_mask:Optional[torch.Tensor]=None, torch_sdpa:bool=True):
         q, k, v = F.linear(x, self.qkv_w, self.qkv_b).chunk(3, dim=-1)
 
-        k_cache = torch.cat([k_cache, k], dim=1)
-        v_cache = torch.cat([v_cache, v], dim=1)
-        
         batch_size = q.shape[0]
         q_len = q.shape[1]
-        kv_len = k_cache.shape[1]
+        kv_len = cache_len + q_len
+
+        # 原地写入预分配的缓存，避免每步 torch.cat 重新分配整个缓存
+        k_cache[:, cache_len:kv_len] = k
+        v_cache[:, cache_len:kv_len] = v
 
         q = q.view(batch_size, q_len, self.num_heads, -1).transpose(1, 2)
-        k = k_cache.view(batch_size, kv_len, self.num_heads, -1).transpose(1, 2)
-        v = v_cache.view(batch_size, kv_len, self.num_heads, -1).transpose(1, 2)
+        k = k_cache[:, :kv_len].view(batch_size, kv_len, self.num_heads, -1).transpose(1, 2)
+        v = v_cache[:, :kv_len].view(batch_size, kv_len, self.num_heads, -1).transpose(1, 2)
 
 
         if torch_sdpa:
@@ -219,7 +229,81 @@ class T2SBlock:
             self.norm_b2,
             self.norm_eps2,
         )
-        return x, k_cache, v_cache
+        return x
+
+    def decode_next_token_rows(self, x:torch.Tensor, k_caches:List[torch.Tensor], v_caches:List[torch.Tensor], cache_lens:List[int]):
+        # 连续批处理：线性层整批计算，注意力按行使用各自的 KV 缓存
+        q, k, v = F.linear(x, self.qkv_w, self.qkv_b).chunk(3, dim=-1)
+
+        attn_list : List[torch.Tensor] = []
+        for i in range(len(k_caches)):
+            cache_len = cache_lens[i]
+            kv_len = cache_len + 1
+            k_caches[i][:, cache_len:kv_len] = k[i:i+1]
+            v_caches[i][:, cache_len:kv_len] = v[i:i+1]
+
+            q_i = q[i:i+1].view(1, 1, self.num_heads, -1).transpose(1, 2)
+            k_i = k_caches[i][:, :kv_len].view(1, kv_len, self.num_heads, -1).transpose(1, 2)
+            v_i = v_caches[i][:, :kv_len].view(1, kv_len, self.num_heads, -1).transpose(1, 2)
+            attn_i = F.scaled_dot_product_attention(q_i, k_i, v_i)
+            attn_list.append(attn_i.transpose(1, 2).reshape(1, 1, self.hidden_dim))
+
+        attn = F.linear(torch.cat(attn_list, dim=0), self.out_w, self.out_b)
+
+        x = x + attn
+        x = F.layer_norm(
+            x, [self.hidden_dim], self.norm_w1, self.norm_b1, self.norm_eps1
+        )
+        x = x + self.mlp.forward(x)
+        x = F.layer_norm(
+            x,
+            [self.hidden_dim],
+            self.norm_w2,
+            self.norm_b2,
+            self.norm_eps2,
+        )
+        return x
+
+
+@torch.jit.script
+class T2SKVCache:
+    """每层预分配到 max_len 的 KV 缓存，length 为当前写入位置"""
+    def __init__(self, k_cache: List[torch.Tensor], v_cache: List[torch.Tensor], length: int):
+        self.k_cache = k_cache
+        self.v_cache = v_cache
+        self.length: int = length
+
+    def capacity(self) -> int:
+        return self.k_cache[0].shape[1]
+
+    def reserve(self, n: int):
+        # 超出预分配长度时按倍数扩容，正常解码路径不会触发
+        need = self.length + n
+        capacity = self.capacity()
+        if need <= capacity:
+            return
+        new_capacity = max(need, capacity * 2)
+        for i in range(len(self.k_cache)):
+            k = self.k_cache[i]
+            v = self.v_cache[i]
+            new_k = k.new_empty((k.shape[0], new_capacity, k.shape[2]))
+            new_v = v.new_empty((v.shape[0], new_capacity, v.shape[2]))
+            new_k[:, :self.length] = k[:, :self.length]
+            new_v[:, :self.length] = v[:, :self.length]
+            self.k_cache[i] = new_k
+            self.v_cache[i] = new_v
+
+    def index_select(self, index: torch.Tensor):
+        # 只拷贝已写入部分，移除 batch 中已经生成完毕的序列
+        for i in range(len(self.k_cache)):
+            k = self.k_cache[i]
+            v = self.v_cache[i]
+            new_k = k.new_empty((index.shape[0], k.shape[1], k.shape[2]))
+            new_v = v.new_empty((index.shape[0], v.shape[1], v.shape[2]))
+            new_k[:, :self.length] = torch.index_select(k[:, :self.length], 0, index)
+            new_v[:, :self.length] = torch.index_select(v[:, :self.length], 0, index)
+            self.k_cache[i] = new_k
+            self.v_cache[i] = new_v
 
 
 @torch.jit.script
@@ -231,26 +315,47 @@ class T2STransformer:
     def process_prompt(
         self, x:torch.Tensor, attn_mask : torch.Tensor,
         padding_mask : Optional[torch.Tensor]=None, 
-        torch_sdpa:bool=True
+        torch_sdpa:bool=True,
+        max_len:int=0
         ):
         k_cache : List[torch.Tensor] = []
         v_cache : List[torch.Tensor] = []
+        src_len = x.shape[1]
+        capacity = max(max_len, src_len)
         for i in range(self.num_blocks):
             x, k_cache_, v_cache_ = self.blocks[i].process_prompt(x, attn_mask, padding_mask, torch_sdpa)
-            k_cache.append(k_cache_)
-            v_cache.append(v_cache_)
-        return x, k_cache, v_cache
+            k_buf = k_cache_.new_empty((k_cache_.shape[0], capacity, k_cache_.shape[2]))
+            v_buf = v_cache_.new_empty((v_cache_.shape[0], capacity, v_cache_.shape[2]))
+            k_buf[:, :src_len] = k_cache_
+            v_buf[:, :src_len] = v_cache_
+            k_cache.append(k_buf)
+            v_cache.append(v_buf)
+        return x, T2SKVCache(k_cache, v_cache, src_len)
 
     def decode_next_token(
         self, x:torch.Tensor, 
-        k_cache: List[torch.Tensor], 
-        v_cache: List[torch.Tensor], 
+        kv_cache: T2SKVCache,
         attn_mask : Optional[torch.Tensor]=None,
         torch_sdpa:bool=True
     ):
+        q_len = x.shape[1]
+        kv_cache.reserve(q_len)
         for i in range(self.num_blocks):
-            x, k_cache[i], v_cache[i] = self.blocks[i].decode_next_token(x, k_cache[i], v_cache[i], attn_mask, torch_sdpa)
-        return x, k_cache, v_cache
+            x = self.blocks[i].decode_next_token(x, kv_cache.k_cache[i], kv_cache.v_cache[i], kv_cache.length, attn_mask, torch_sdpa)
+        kv_cache.length += q_len
+        return x, kv_cache
+
+    def decode_next_token_rows(self, x:torch.Tensor, kv_caches: List[T2SKVCache]):
+        for kv_cache in kv_caches:
+            kv_cache.reserve(1)
+        cache_lens = [kv_cache.length for kv_cache in kv_caches]
+        for i in range(self.num_blocks):
+            k_caches = [kv_cache.k_cache[i] for kv_cache in kv_caches]
+            v_caches = [kv_cache.v_cache[i] for kv_cache in kv_caches]
+            x = self.blocks[i].decode_next_token_rows(x, k_caches, v_caches, cache_lens)
+        for kv_cache in kv_caches:
+            kv_cache.length += 1
+        return x
 
 
 class Text2SemanticDecoder(nn.Module):
@@ -333,6 +438,8 @@ class Text2SemanticDecoder(nn.Module):
             blocks.append(block)
         
         self.t2s_transformer = T2STransformer(self.num_layers, blocks)
+        # 可选的编译解码步，见 T2SCompiledDecoder
+        self.compiled_decoder = None
 
     def make_input_data(self, x, x_lens, y, y_lens, bert_feature):
         x = self.ar_text_embedding(x)
@@ -603,8 +710,7 @@ class Text2SemanticDecoder(nn.Module):
         x_attn_mask = torch.zeros((x_len, x_len), dtype=torch.bool)
         stop = False
 
-        k_cache = None
-        v_cache = None
+        kv_cache = None
         ###################  first step ##########################
         if y is not None:
             y_emb = self.ar_audio_embedding(y)
@@ -661,11 +767,12 @@ class Text2SemanticDecoder(nn.Module):
         y_list = [None]*y.shape[0]
         batch_idx_map = list(range(y.shape[0]))
         idx_list = [None]*y.shape[0]
-        for idx in tqdm(range(1500)):
+        sampler = Sampler(y, self.vocab_size, top_k=top_k, top_p=top_p, temperature=temperature, repetition_penalty=repetition_penalty, generator=kwargs.get("generator"))
+        for idx in range(1500):
             if idx == 0:
-                xy_dec, k_cache, v_cache = self.t2s_transformer.process_prompt(xy_pos, xy_attn_mask, xy_padding_mask, False)
+                xy_dec, kv_cache = self.t2s_transformer.process_prompt(xy_pos, xy_attn_mask, xy_padding_mask, False, src_len + 1500)
             else:
-                xy_dec, k_cache, v_cache = self.t2s_transformer.decode_next_token(xy_pos, k_cache, v_cache, xy_attn_mask, False)
+                xy_dec, kv_cache = self.t2s_transformer.decode_next_token(xy_pos, kv_cache, xy_attn_mask, False)
             logits = self.ar_predict_layer(
                 xy_dec[:, -1]
             )
@@ -676,9 +783,7 @@ class Text2SemanticDecoder(nn.Module):
             else:
                 xy_attn_mask = F.pad(xy_attn_mask,(0,1),value=False)
 
-            samples = sample(
-                    logits, y, top_k=top_k, top_p=top_p, repetition_penalty=repetition_penalty, temperature=temperature
-                )[0]
+            samples = sampler.sample(logits)
 
             y = torch.concat([y, samples], dim=1)
             
@@ -704,11 +809,10 @@ class Text2SemanticDecoder(nn.Module):
             if reserved_idx_of_batch_for_y is not None:
                 # index = torch.LongTensor(batch_idx_map).to(y.device)
                 y = torch.index_select(y, dim=0, index=reserved_idx_of_batch_for_y)
+                sampler.index_select(reserved_idx_of_batch_for_y)
                 xy_attn_mask = torch.index_select(xy_attn_mask, dim=0, index=reserved_idx_of_batch_for_y)
-                if k_cache is not None :
-                    for i in range(len(k_cache)):
-                        k_cache[i] = torch.index_select(k_cache[i], dim=0, index=reserved_idx_of_batch_for_y)
-                        v_cache[i] = torch.index_select(v_cache[i], dim=0, index=reserved_idx_of_batch_for_y)
+                if kv_cache is not None :
+                    kv_cache.index_select(reserved_idx_of_batch_for_y)
                 
                 
             if (early_stop_num != -1 and (y.shape[1] - prefix_len) > early_stop_num) or idx==1499:
@@ -773,18 +877,11 @@ class Text2SemanticDecoder(nn.Module):
         
         return y_list, idx_list
     
-    def infer_panel_naive(
+    def prepare_prompt(
         self,
         x:torch.LongTensor,  #####全部文本token
-        x_lens:torch.LongTensor,
-        prompts:torch.LongTensor,  ####参考音频token
+        prompts:Optional[torch.LongTensor],  ####参考音频token
         bert_feature:torch.LongTensor,
-        top_k: int = -100,
-        top_p: int = 100,
-        early_stop_num: int = -1,
-        temperature: float = 1.0,
-        repetition_penalty: float = 1.35,
-        **kwargs
     ):
         x = self.ar_text_embedding(x)
         x = x + self.bert_proj(bert_feature.transpose(1, 2))
@@ -795,12 +892,7 @@ class Text2SemanticDecoder(nn.Module):
 
         x_len = x.shape[1]
         x_attn_mask = torch.zeros((x_len, x_len), dtype=torch.bool)
-        stop = False
-        # print(1111111,self.num_layers)
 
-        k_cache = None
-        v_cache = None
-        ###################  first step ##########################
         if y is not None:
             y_emb = self.ar_audio_embedding(y)
             y_len = y_emb.shape[1]
@@ -809,10 +901,8 @@ class Text2SemanticDecoder(nn.Module):
             xy_pos = torch.concat([x, y_pos], dim=1)
             ref_free = False
         else:
-            y_emb = None
             y_len = 0
             prefix_len = 0
-            y_pos = None
             xy_pos = x
             y = torch.zeros(x.shape[0], 0, dtype=torch.int, device=x.device)
             ref_free = True
@@ -834,47 +924,87 @@ class Text2SemanticDecoder(nn.Module):
                                                 .expand(bsz*self.num_head, -1, -1)\
                                                 .view(bsz, self.num_head, src_len, src_len)\
                                                 .to(device=x.device, dtype=torch.bool)
+        return xy_pos, xy_attn_mask, y, y_len, prefix_len, ref_free
 
-        for idx in tqdm(range(1500)):
-            if xy_attn_mask is not None:
-                xy_dec, k_cache, v_cache = self.t2s_transformer.process_prompt(xy_pos, xy_attn_mask, None)
-            else:
-                xy_dec, k_cache, v_cache = self.t2s_transformer.decode_next_token(xy_pos, k_cache, v_cache)
-
-            logits = self.ar_predict_layer(
-                xy_dec[:, -1]
-            )
-
-            if idx == 0:
-                xy_attn_mask = None
-                logits = logits[:, :-1]
-
-            samples = sample(
-                logits, y, top_k=top_k, top_p=top_p, repetition_penalty=repetition_penalty, temperature=temperature
-            )[0]
+    def audio_position_table(self, start:int, length:int, dtype:torch.dtype, device:torch.device):
+        """[length, 1, D] 的音频位置编码 (已乘 alpha)，解码前一次性转换到目标 dtype/device"""
+        pe = self.ar_audio_position.pe[0, start:start + length].to(dtype=dtype, device=device)
+        return (self.ar_audio_position.alpha.to(dtype=dtype) * pe).unsqueeze(1)
 
-            y = torch.concat([y, samples], dim=1)
-
-            if early_stop_num != -1 and (y.shape[1] - prefix_len) > early_stop_num:
-                print("use early stop num:", early_stop_num)
-                stop = True
-
-            if torch.argmax(logits, dim=-1)[0] == self.EOS or samples[0, 0] == self.EOS:
-                stop = True
-            if stop:
-                if y.shape[1] == 0:
-                    y = torch.concat([y, torch.zeros_like(samples)], dim=1)
-                    print("bad zero prediction")
-                print(f"T2S Decoding EOS [{prefix_len} -> {y.shape[1]}]")
-                break
-
-            ####################### update next step ###################################
-            y_emb = self.ar_audio_embedding(y[:, -1:])
-            xy_pos = y_emb * self.ar_audio_position.x_scale + self.ar_audio_position.alpha * self.ar_audio_position.pe[:, y_len + idx].to(dtype=y_emb.dtype,device=y_emb.device)
+    def embed_next_token(self, y:torch.Tensor, positions:torch.Tensor):
+        """y: [B, 1] 最新生成的 semantic token, positions: [B] 各行在音频位置编码中的下标"""
+        y_emb = self.ar_audio_embedding(y)
+        pe = self.ar_audio_position.pe[0, positions].to(dtype=y_emb.dtype, device=y_emb.device).unsqueeze(1)
+        return y_emb * self.ar_audio_position.x_scale + self.ar_audio_position.alpha * pe
 
+    def infer_panel_naive(
+        self,
+        x:torch.LongTensor,  #####全部文本token
+        x_lens:torch.LongTensor,
+        prompts:torch.LongTensor,  ####参考音频token
+        bert_feature:torch.LongTensor,
+        top_k: int = -100,
+        top_p: int = 100,
+        early_stop_num: int = -1,
+        temperature: float = 1.0,
+        repetition_penalty: float = 1.35,
+        **kwargs
+    ):
+        """
+        逐步解码时不在每步同步 EOS，每 eos_check_interval 步才把 EOS 标记取回 host 检查一次。
+        块内越过 EOS 多解码的几步直接丢弃，返回的 token 与逐步检查相同。
+        """
+        xy_pos, xy_attn_mask, y, y_len, prefix_len, ref_free = self.prepare_prompt(x, prompts, bert_feature)
+        src_len = xy_pos.shape[1]
+        check_interval = max(1, kwargs.get("eos_check_interval", EOS_CHECK_INTERVAL))
+        # early stop 的步数在 host 上已知，不需要逐步判断
+        max_steps = MAX_DECODE_STEPS if early_stop_num == -1 else min(MAX_DECODE_STEPS, early_stop_num + 1)
+        sampler = Sampler(y, self.vocab_size, top_k=top_k, top_p=top_p, temperature=temperature, repetition_penalty=repetition_penalty, generator=kwargs.get("generator"))
+        tokens = torch.zeros((1, max_steps), dtype=torch.long, device=xy_pos.device)
+        eos = torch.zeros(max_steps, dtype=torch.bool, device=xy_pos.device)
+        pe = self.audio_position_table(y_len, max_steps, xy_pos.dtype, xy_pos.device)
+        x_scale = self.ar_audio_position.x_scale
+
+        # 编译解码步被其他请求占用或长度超出 bucket 时使用普通解码
+        compiled_decoder = self.compiled_decoder
+        if compiled_decoder is not None and not compiled_decoder.acquire(src_len + max_steps):
+            compiled_decoder = None
+        try:
+            xy_dec, kv_cache = self.t2s_transformer.process_prompt(xy_pos, xy_attn_mask, None, True, src_len if compiled_decoder is not None else src_len + MAX_DECODE_STEPS)
+            if compiled_decoder is not None:
+                compiled_decoder.load_prompt(kv_cache.k_cache, kv_cache.v_cache, src_len)
+            stop_step = max_steps - 1
+            for block_start in range(0, max_steps, check_interval):
+                block_end = min(block_start + check_interval, max_steps)
+                for idx in range(block_start, block_end):
+                    if idx > 0:
+                        xy_pos = self.ar_audio_embedding(tokens[:, idx - 1:idx]) * x_scale + pe[idx - 1]
+                        if compiled_decoder is not None:
+                            xy_dec = compiled_decoder.step(xy_pos, src_len + idx - 1)
+                        else:
+                            xy_dec, kv_cache = self.t2s_transformer.decode_next_token(xy_pos, kv_cache)
+                    logits = self.ar_predict_layer(xy_dec[:, -1])
+                    if idx == 0:
+                        logits = logits[:, :-1]
+                    samples = sampler.sample(logits)
+                    tokens[:, idx] = samples[:, 0]
+                    eos[idx] = (torch.argmax(logits, dim=-1)[0] == self.EOS) | (samples[0, 0] == self.EOS)
+                hits = torch.nonzero(eos[block_start:block_end])
+                if hits.numel() > 0:
+                    stop_step = block_start + int(hits[0, 0])
+                    break
+            else:
+                if early_stop_num != -1 and max_steps == early_stop_num + 1:
+                    logger.debug("use early stop num: %d", early_stop_num)
+        finally:
+            if compiled_decoder is not None:
+                compiled_decoder.release()
+
+        y = torch.concat([y, tokens[:, :stop_step + 1].to(y.dtype)], dim=1)
+        logger.debug("T2S Decoding EOS [%d -> %d]", prefix_len, y.shape[1])
         if ref_free:
             return y[:, :-1], 0
-        return y[:, :-1], idx - 1
+        return y[:, :-1], stop_step - 1
     
     
     def infer_panel(
@@ -0,0 +1,172 @@
+from typing import List, Optional
+import torch
+from torch import nn
+from torch.nn import functional as F
+from .t2s_model import T2SKVCache, scaled_dot_product_attention
+from gptsovits.utils.quantization import packed_linear_bytes, quantize_linear, quantize_linears
+
+
+class QuantizedT2SBlock:
+    """
+    T2SBlock 的 int8 版本：qkv / out / MLP 的线性层为动态量化，LayerNorm 与注意力仍为 float32。
+    只在 CPU 上使用，接口与 T2SBlock 相同。
+    """
+    def __init__(self, block):
+        self.num_heads = block.num_heads
+        self.hidden_dim = block.hidden_dim
+        self.qkv = quantize_linear(block.qkv_w, block.qkv_b)
+        self.out = quantize_linear(block.out_w, block.out_b)
+        self.mlp1 = quantize_linear(block.mlp.w1, block.mlp.b1)
+        self.mlp2 = quantize_linear(block.mlp.w2, block.mlp.b2)
+        self.norm_w1 = block.norm_w1
+        self.norm_b1 = block.norm_b1
+        self.norm_eps1 = block.norm_eps1
+        self.norm_w2 = block.norm_w2
+        self.norm_b2 = block.norm_b2
+        self.norm_eps2 = block.norm_eps2
+
+    def memory_size(self) -> int:
+        """int8 线性层的字节数；LayerNorm 参数引用 self.h 中的参数，已计入 parameters()"""
+        return sum(packed_linear_bytes(linear) for linear in (self.qkv, self.out, self.mlp1, self.mlp2))
+
+    def _to_mask(self, x: torch.Tensor, padding_mask: Optional[torch.Tensor]):
+        if padding_mask is None:
+            return x
+        if padding_mask.dtype == torch.bool:
+            return x.masked_fill(padding_mask, 0)
+        return x * padding_mask
+
+    def _feed_forward(self, x: torch.Tensor, attn: torch.Tensor):
+        x = F.layer_norm(x + attn, [self.hidden_dim], self.norm_w1, self.norm_b1, self.norm_eps1)
+        x = x + self.mlp2(F.relu(self.mlp1(x)))
+        return F.layer_norm(x, [self.hidden_dim], self.norm_w2, self.norm_b2, self.norm_eps2)
+
+    def _merge_heads(self, attn: torch.Tensor, batch_size: int, q_len: int):
+        attn = attn.permute(2, 0, 1, 3).reshape(batch_size * q_len, self.hidden_dim)
+        return attn.view(q_len, batch_size, self.hidden_dim).transpose(1, 0)
+
+    def process_prompt(self, x: torch.Tensor, attn_mask: torch.Tensor, padding_mask: Optional[torch.Tensor] = None, torch_sdpa: bool = True):
+        q, k, v = self.qkv(self._to_mask(x, padding_mask)).chunk(3, dim=-1)
+        batch_size, q_len, kv_len = q.shape[0], q.shape[1], k.shape[1]
+
+        q = self._to_mask(q, padding_mask)
+        k_cache = self._to_mask(k, padding_mask)
+        v_cache = self._to_mask(v, padding_mask)
+
+        q = q.view(batch_size, q_len, self.num_heads, -1).transpose(1, 2)
+        k = k_cache.view(batch_size, kv_len, self.num_heads, -1).transpose(1, 2)
+        v = v_cache.view(batch_size, kv_len, self.num_heads, -1).transpose(1, 2)
+        if torch_sdpa:
+            attn = F.scaled_dot_product_attention(q, k, v, ~attn_mask)
+        else:
+            attn = scaled_dot_product_attention(q, k, v, attn_mask)
+        attn = self.out(self._to_mask(self._merge_heads(attn, batch_size, q_len), padding_mask))
+
+        if padding_mask is not None:
+            for i in range(batch_size):
+                idx = torch.where(padding_mask[i, :, 0] == False)[0]
+                x[i, idx, :] = self._feed_forward(x[i, idx, :].unsqueeze(0), attn[i, idx, :].unsqueeze(0)).squeeze(0)
+            x = self._to_mask(x, padding_mask)
+        else:
+            x = self._feed_forward(x, attn)
+        return x, k_cache, v_cache
+
+    def decode_next_token(self, x: torch.Tensor, k_cache: torch.Tensor, v_cache: torch.Tensor, cache_len: int, attn_mask: Optional[torch.Tensor] = None, torch_sdpa: bool = True):
+        q, k, v = self.qkv(x).chunk(3, dim=-1)
+        batch_size, q_len = q.shape[0], q.shape[1]
+        kv_len = cache_len + q_len
+        k_cache[:, cache_len:kv_len] = k
+        v_cache[:, cache_len:kv_len] = v
+
+        q = q.view(batch_size, q_len, self.num_heads, -1).transpose(1, 2)
+        k = k_cache[:, :kv_len].view(batch_size, kv_len, self.num_heads, -1).transpose(1, 2)
+        v = v_cache[:, :kv_len].view(batch_size, kv_len, self.num_heads, -1).transpose(1, 2)
+        if torch_sdpa:
+            attn = F.scaled_dot_product_attention(q, k, v)
+        else:
+            attn = scaled_dot_product_attention(q, k, v, attn_mask)
+        attn = self.out(self._merge_heads(attn, batch_size, q_len))
+        return self._feed_forward(x, attn)
+
+    def decode_next_token_rows(self, x: torch.Tensor, k_caches: List[torch.Tensor], v_caches: List[torch.Tensor], cache_lens: List[int]):
+        q, k, v = self.qkv(x).chunk(3, dim=-1)
+        attn_list = []
+        for i in range(len(k_caches)):
+            cache_len = cache_lens[i]
+            kv_len = cache_len + 1
+            k_caches[i][:, cache_len:kv_len] = k[i:i+1]
+            v_caches[i][:, cache_len:kv_len] = v[i:i+1]
+            q_i = q[i:i+1].view(1, 1, self.num_heads, -1).transpose(1, 2)
+            k_i = k_caches[i][:, :kv_len].view(1, kv_len, self.num_heads, -1).transpose(1, 2)
+            v_i = v_caches[i][:, :kv_len].view(1, kv_len, self.num_heads, -1).transpose(1, 2)
+            attn_i = F.scaled_dot_product_attention(q_i, k_i, v_i)
+            attn_list.append(attn_i.transpose(1, 2).reshape(1, 1, self.hidden_dim))
+        attn = self.out(torch.cat(attn_list, dim=0))
+        return self._feed_forward(x, attn)
+
+
+class QuantizedT2STransformer:
+    """与 T2STransformer 接口相同，KV 缓存同样使用 T2SKVCache"""
+    def __init__(self, t2s_transformer):
+        self.num_blocks = t2s_transformer.num_blocks
+        self.blocks = [QuantizedT2SBlock(block) for block in t2s_transformer.blocks]
+
+    def memory_size(self) -> int:
+        return sum(block.memory_size() for block in self.blocks)
+
+    def process_prompt(self, x: torch.Tensor, attn_mask: torch.Tensor, padding_mask: Optional[torch.Tensor] = None, torch_sdpa: bool = True, max_len: int = 0):
+        k_cache, v_cache = [], []
+        src_len = x.shape[1]
+        capacity = max(max_len, src_len)
+        for block in self.blocks:
+            x, k_cache_, v_cache_ = block.process_prompt(x, attn_mask, padding_mask, torch_sdpa)
+            k_buf = k_cache_.new_empty((k_cache_.shape[0], capacity, k_cache_.shape[2]))
+            v_buf = v_cache_.new_empty((v_cache_.shape[0], capacity, v_cache_.shape[2]))
+            k_buf[:, :src_len] = k_cache_
+            v_buf[:, :src_len] = v_cache_
+            k_cache.append(k_buf)
+            v_cache.append(v_buf)
+        return x, T2SKVCache(k_cache, v_cache, src_len)
+
+    def decode_next_token(self, x: torch.Tensor, kv_cache: T2SKVCache, attn_mask: Optional[torch.Tensor] = None, torch_sdpa: bool = True):
+        q_len = x.shape[1]
+        kv_cache.reserve(q_len)
+        for i, block in enumerate(self.blocks):
+            x = block.decode_next_token(x, kv_cache.k_cache[i], kv_cache.v_cache[i], kv_cache.length, attn_mask, torch_sdpa)
+        kv_cache.length += q_len
+        return x, kv_cache
+
+    def decode_next_token_rows(self, x: torch.Tensor, kv_caches: List[T2SKVCache]):
+        for kv_cache in kv_caches:
+            kv_cache.reserve(1)
+        cache_lens = [kv_cache.length for kv_cache in kv_caches]
+        for i, block in enumerate(self.blocks):
+            x = block.decode_next_token_rows(x, [kv_cache.k_cache[i] for kv_cache in kv_caches], [kv_cache.v_cache[i] for kv_cache in kv_caches], cache_lens)
+        for kv_cache in kv_caches:
+            kv_cache.length += 1
+        return x
+
+
+def quantize_t2s(t2s_model):
+    """
+    把 Text2SemanticDecoder 的 T2SBlock 与 ar_predict_layer 换成动态 int8 量化版本。
+    self.h 中对应的 float 线性层权重随后释放；与底模共享时底模持有的那份不受影响。
+    """
+    t2s_model.t2s_transformer = QuantizedT2STransformer(t2s_model.t2s_transformer)
+    t2s_model.ar_predict_layer = quantize_linears(nn.Sequential(t2s_model.ar_predict_layer))[0]
+    # 推理只走 t2s_transformer，释放 self.h 中已经量化过的 float 权重
+    for layer in t2s_model.h.layers:
+        for param in [layer.self_attn.in_proj_weight, layer.self_attn.out_proj.weight, layer.linear1.weight, layer.linear2.weight]:
+            param.data = param.data.new_empty(0)
+    return t2s_model
+
+
+def quantized_memory_size(t2s_model) -> int:
+    """
+    量化后 Text2SemanticDecoder 中不在 parameters() / buffers() 里的 int8 权重字节数：
+    QuantizedT2STransformer 的各线性层与 ar_predict_layer 等动态量化模块。未量化时为 0
+    """
+    total = sum(packed_linear_bytes(module) for module in t2s_model.modules() if isinstance(module, torch.ao.nn.quantized.dynamic.Linear))
+    if isinstance(t2s_model.t2s_transformer, QuantizedT2STransformer):
+        total += t2s_model.t2s_transformer.memory_size()
+    return total
@@ -102,8 +102,10 @@ from typing import Optional, Tuple
 
 def multinomial_sample_one_no_sync(
     probs_sort,
+    generator: Optional[torch.Generator] = None,
 ):  # Does multinomial sampling without a cuda synchronization
-    q = torch.empty_like(probs_sort).exponential_(1)
+    # 指定 generator 时使用请求自己的随机数序列，相同 seed 得到相同结果
+    q = torch.empty_like(probs_sort).exponential_(1, generator=generator)
     return torch.argmax(probs_sort / q, dim=-1, keepdim=True).to(dtype=torch.int)
 
 
@@ -153,12 +155,13 @@ def logits_to_probs(
 def sample(
     logits,
     previous_tokens: Optional[torch.Tensor] = None,
+    generator: Optional[torch.Generator] = None,
     **sampling_kwargs,
 ) -> Tuple[torch.Tensor, torch.Tensor]:
     probs = logits_to_probs(
         logits=logits, previous_tokens=previous_tokens, **sampling_kwargs
     )
-    idx_next = multinomial_sample_one_no_sync(probs)
+    idx_next = multinomial_sample_one_no_sync(probs, generator)
     return idx_next, probs
 
 def dpo_loss(policy_chosen_logps: torch.FloatTensor,
@@ -0,0 +1,89 @@
+import os
+import logging
+import torch
+
+logger = logging.getLogger(__name__)
+
+def state_dict_delta(base_state: dict, state: dict):
+    """返回与 base 不同的 tensor 的 key"""
+    keys = []
+    for key, tensor in state.items():
+        base_tensor = base_state.get(key)
+        if base_tensor is None or base_tensor.shape != tensor.shape or base_tensor.dtype != tensor.dtype or not torch.equal(base_tensor, tensor):
+            keys.append(key)
+    return keys
+
+def file_signature(path: str):
+    """文件大小与修改时间，文件更新后依赖它的缓存失效"""
+    stat = os.stat(path)
+    return f'{stat.st_size}-{int(stat.st_mtime)}'
+
+def share_state_dict(module: torch.nn.Module, state_dict: dict):
+    """
+    让 module 的参数和 buffer 直接引用 state_dict 中的 tensor 而不拷贝。
+    保持原 Parameter 对象不变，只替换其 data，T2SBlock 等持有参数引用的对象仍然有效。
+    """
+    own_state = module.state_dict(keep_vars=True)
+    missing = [key for key in own_state if key not in state_dict]
+    unexpected = [key for key in state_dict if key not in own_state]
+    if missing or unexpected:
+        raise RuntimeError(f'Error(s) in sharing state_dict for {module.__class__.__name__}: missing keys {missing}, unexpected keys {unexpected}')
+    for key, tensor in own_state.items():
+        target = state_dict[key]
+        if tensor.shape != target.shape:
+            raise RuntimeError(f'size mismatch for {key}: copying a param with shape {target.shape}, the shape in current model is {tensor.shape}')
+        tensor.data = target
+
+class BaseModel:
+    """
+    常驻内存的底模权重，只加载一份。
+    各音色只保存与底模不同的 tensor (gpt.delta.pth / sovits.delta.pth)，其余权重直接引用底模。
+    """
+    def __init__(self, base_dir: str, device, gpt_dtype: torch.dtype = torch.float32, sovits_dtype: torch.dtype = torch.float32):
+        self.base_dir = base_dir
+        self.device = device
+        self.gpt_dtype = gpt_dtype
+        self.sovits_dtype = sovits_dtype
+        self.gpt_path = f'{base_dir}/gpt.pth'
+        self.sovits_path = f'{base_dir}/sovits.pth'
+        self.gpt_state = self.convert(torch.load(self.gpt_path, map_location=device), gpt_dtype)
+        self.sovits_state = self.convert(torch.load(self.sovits_path, map_location=device), sovits_dtype)
+        self.data_ptrs = {tensor.data_ptr() for state in (self.gpt_state, self.sovits_state) for tensor in state.values()}
+
+    def convert(self, state: dict, dtype: torch.dtype):
+        if dtype == torch.float32:
+            return state
+        return {key: tensor.to(dtype) if tensor.is_floating_point() else tensor for key, tensor in state.items()}
+
+    def signature(self, base_path: str):
+        return file_signature(base_path)
+
+    def load_state(self, path: str, base_state: dict, base_path: str, dtype: torch.dtype):
+        """返回合并后的 state_dict：与底模相同的 tensor 直接引用底模，只有变化的 tensor 单独占用内存"""
+        delta_path = path.replace('.pth', '.delta.pth')
+        signature = self.signature(base_path)
+        delta = None
+        if os.path.exists(delta_path):
+            saved = torch.load(delta_path, map_location=self.device)
+            if saved.get('base') == signature:
+                delta = self.convert(saved['weights'], dtype)
+            else:
+                logger.info('base model changed, rebuilding %s', delta_path)
+
+        if delta is None:
+            state = torch.load(path, map_location=self.device)
+            keys = state_dict_delta(base_state, self.convert(state, dtype))
+            tmp_path = f'{delta_path}.tmp'
+            torch.save({'base': signature, 'weights': {key: state[key] for key in keys}}, tmp_path)
+            os.replace(tmp_path, delta_path)
+            delta = self.convert({key: state[key] for key in keys}, dtype)
+            del state
+
+        logger.debug('%s: %d tensors differ from base model', path, len(delta))
+        return {**base_state, **delta}
+
+    def load_gpt_state(self, path: str):
+        return self.load_state(path, self.gpt_state, self.gpt_path, self.gpt_dtype)
+
+    def load_sovits_state(self, path: str):
+        return self.load_state(path, self.sovits_state, self.sovits_path, self.sovits_dtype)
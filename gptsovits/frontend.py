@@ -1,25 +1,26 @@
 from typing import List
 from gptsovits.text.text_service import TextService
 from gptsovits.speech.speech_service import SpeechService
+from gptsovits.utils.precision import get_precision
 import torch
 
 class GPTSovitsFrontend:
     def __init__(self):
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        self.dtype = torch.float16 if torch.cuda.is_available() else torch.float32
-        self.text_service = TextService(device=self.device, dtype=self.dtype)
-        self.speech_service = SpeechService(device=self.device, dtype=self.dtype)
+        # 精度由环境变量 PRECISION_BERT / PRECISION_HUBERT / PRECISION 决定
+        self.text_service = TextService(device=self.device, precision=get_precision('bert', self.device))
+        self.speech_service = SpeechService(device=self.device, precision=get_precision('hubert', self.device))
 
-    def zero_shot(self, text: str, ref_audio, ref_prompt = None, speed = 1, extra_audios: List[bytes] = None):
+    def zero_shot(self, text: str, reference: dict, speed = 1):
         texts = self.text_service.split_paragraph(text)
         text_inputs = self.text_service.process_text_batch(texts)
-        ref_prompt_input = self.text_service.process_text(ref_prompt) if ref_prompt else None
-        ref_features, ref_mel_specs = self.speech_service.process_audio(ref_audio, ref_prompt, extra_audios)
-        
+        ref_phoneme_ids = reference['phoneme_ids']
+        ref_bert_features = reference['bert_features']
+
         for text_input in text_inputs:
-            bert_features = text_input[2] if not ref_prompt_input else torch.cat([ref_prompt_input[2], text_input[2]], 1)
+            bert_features = text_input[2] if ref_bert_features is None else torch.cat([ref_bert_features, text_input[2]], 1)
             bert_features = bert_features.to(self.device).unsqueeze(0)
-            all_phoneme_ids = text_input[1] if not ref_prompt_input else ref_prompt_input[1] + text_input[1]
+            all_phoneme_ids = text_input[1] if ref_phoneme_ids is None else ref_phoneme_ids + text_input[1]
             all_phoneme_ids = torch.LongTensor(all_phoneme_ids).to(self.device).unsqueeze(0)
             all_phoneme_len = torch.tensor([all_phoneme_ids.shape[-1]]).to(self.device)
             yield {
@@ -28,10 +29,18 @@ class GPTSovitsFrontend:
                 "phoneme": torch.LongTensor(text_input[1]).to(self.device).unsqueeze(0),
                 "all_phoneme_ids": all_phoneme_ids,
                 "all_phoneme_len": all_phoneme_len,
-                "ref_features": ref_features,
-                "ref_mel_specs": ref_mel_specs,
+                "prompt_semantic": reference['prompt_semantic'],
+                "ge": reference['ge'],
                 "speed": speed,
             }
 
+    def process_reference(self, ref_audio: bytes, ref_prompt = None):
+        """返回参考文本的 (phoneme_ids, bert_features) 以及参考音频的 hubert 特征和频谱"""
+        ref_prompt_input = self.text_service.process_text(ref_prompt) if ref_prompt else None
+        ref_features, ref_mel_specs = self.speech_service.process_audio(ref_audio, ref_prompt)
+        phoneme_ids = ref_prompt_input[1] if ref_prompt_input else None
+        bert_features = ref_prompt_input[2] if ref_prompt_input else None
+        return phoneme_ids, bert_features, ref_features, ref_mel_specs[0]
+
     def _extract_text_tokens(self, text: str) -> List[str]:
         return text.split()
@@ -4,42 +4,230 @@ nltk.data.path.append(pretrained_models_base_path('nltk'))
 from hyperpyyaml import load_hyperpyyaml
 from gptsovits.frontend import GPTSovitsFrontend
 from gptsovits.model import GPTSovitsModel
+from gptsovits.AR.models.t2s_quantized import quantized_memory_size
+from gptsovits.reference_cache import reference_cache
+from gptsovits.base_model import BaseModel, file_signature
 import numpy as np
+import torch
 import random
 import os
+import hashlib
+import logging
+from safetensors import safe_open
+from safetensors.torch import save_file
+
+logger = logging.getLogger(__name__)
+
+# 大于 1 时同一音色的并发请求共享 T2S 解码 batch
+T2S_MAX_BATCH_SIZE = int(os.getenv('T2S_MAX_BATCH_SIZE', '1'))
+
+# 编译 T2S 解码步：compile (torch.compile) 或 jit (TorchScript freeze)，gptsovits.yaml 中的 t2s_compile 优先
+T2S_COMPILE = os.getenv('T2S_COMPILE', '')
+T2S_COMPILE_BUCKET_SIZE = int(os.getenv('T2S_COMPILE_BUCKET_SIZE', '512'))
+T2S_COMPILE_MAX_LEN = int(os.getenv('T2S_COMPILE_MAX_LEN', '2560'))
+# 加载音色时预先编译所有 bucket；默认关闭，各 bucket 在第一次用到时编译
+T2S_COMPILE_WARMUP = os.getenv('T2S_COMPILE_WARMUP', 'false').lower() == 'true'
+
+# 预先计算的 preset 参考特征，每个音色一个文件
+PRESET_BUNDLE_NAME = 'presets.safetensors'
 
 class GPTSovits:
-    def __init__(self, id: str):
+    def __init__(self, id: str, frontend: GPTSovitsFrontend = None, base_model: BaseModel = None):
         self.id = id
+        self.base_model = base_model
+        # BERT、CNHubert、g2p 与音色无关，由 GPTSovitsManager 传入共享的 frontend
+        self.frontend = frontend
+        self.owns_frontend = frontend is None
 
         self.model_dir = f"{pretrained_models_base_path('voices')}/{self.id}"
+        self.preset_bundle_path = f"{self.model_dir}/{PRESET_BUNDLE_NAME}"
+        self.preset_bundle = None
+        self.preset_bundle_keys = set()
+        self.preset_bundle_versions = {}
+        # 加载时 gpt.pth / sovits.pth 的签名，音色权重更新后结果缓存与参考特征缓存随之失效
+        self.checkpoint_signature = None
 
-    def load(self):
+    def load(self, t2s_precision: str = None):
         model_dir = self.model_dir
         with open('{}/gptsovits.yaml'.format(model_dir), 'r', encoding='utf-8') as f:
             configs = load_hyperpyyaml(f)
 
-        self.model = GPTSovitsModel(configs['gpt'], configs['sovits'])
-        self.model.load('{}/gpt.pth'.format(model_dir), '{}/sovits.pth'.format(model_dir))
+        # 精度未配置时使用环境变量 PRECISION_T2S / PRECISION_SOVITS / PRECISION，见 gptsovits.utils.precision
+        self.model = GPTSovitsModel(
+            configs['gpt'], configs['sovits'],
+            t2s_precision=t2s_precision or configs.get('precision'),
+            sovits_precision=configs.get('sovits_precision'),
+        )
+        self.checkpoint_signature = '/'.join(file_signature(f'{model_dir}/{name}') for name in ('gpt.pth', 'sovits.pth'))
+        self.model.load('{}/gpt.pth'.format(model_dir), '{}/sovits.pth'.format(model_dir), base_model=self.base_model)
+        if T2S_MAX_BATCH_SIZE > 1:
+            self.model.enable_batching(T2S_MAX_BATCH_SIZE)
+        quantized = self.model.t2s_precision.quantized
+        t2s_compile = configs.get('t2s_compile')
+        if t2s_compile is None:
+            t2s_compile = T2S_COMPILE
+        if t2s_compile and quantized:
+            logger.warning('t2s_compile is ignored for int8 voice %s', self.id)
+        elif t2s_compile:
+            self.model.enable_compiled_decode(
+                'jit' if t2s_compile == 'jit' else 'compile',
+                bucket_size=T2S_COMPILE_BUCKET_SIZE,
+                max_len=T2S_COMPILE_MAX_LEN,
+                warmup=T2S_COMPILE_WARMUP,
+            )
+
+        if self.frontend is None:
+            self.frontend = GPTSovitsFrontend()
+        self._open_preset_bundle()
+
+    def memory_size(self):
+        """按参数和 buffer 大小估算该音色占用的内存字节数，共享的 frontend 和底模权重不计入"""
+        modules = [self.model.gpt, self.model.sovits]
+        if self.owns_frontend:
+            modules.append(self.frontend.speech_service.ssl_model)
+        shared_ptrs = self.base_model.data_ptrs if self.base_model is not None else set()
+        compiled_decoder = self.model.gpt.model.compiled_decoder
+        extra = compiled_decoder.memory_size() if compiled_decoder is not None else 0
+        # int8 打包权重不在 parameters() 中，单独计入
+        extra += quantized_memory_size(self.model.gpt.model)
+        return extra + sum(
+            tensor.numel() * tensor.element_size()
+            for module in modules
+            for tensor in list(module.parameters()) + list(module.buffers())
+            if tensor.data_ptr() not in shared_ptrs
+        )
+
+    def precision_signature(self):
+        """影响合成结果的各组件精度 (t2s / sovits / bert / hubert)"""
+        precisions = (self.model.t2s_precision, self.model.sovits_precision, self.frontend.text_service.precision, self.frontend.speech_service.precision)
+        return '/'.join(precision.name for precision in precisions)
+
+    def reference_version(self, ref_id: str):
+        """preset 参考特征的版本，音色权重、preset 的 wav/txt 或各组件精度变化时不同"""
+        presets_dir = f'{self.model_dir}/presets'
+        parts = [self.checkpoint_signature, self.precision_signature()]
+        parts += [file_signature(f'{presets_dir}/{ref_id}.{ext}') for ext in ('wav', 'txt')]
+        return hashlib.sha1('/'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+    def has_preset_bundle(self):
+        return os.path.exists(self.preset_bundle_path)
+
+    def preset_bundle_is_current(self):
+        """presets.safetensors 存在且记录的各 preset 版本与当前一致"""
+        return self.preset_bundle is not None and self.preset_bundle_versions == self._preset_versions()
+
+    def _preset_versions(self):
+        versions = {}
+        for ref_id in self.get_ref_ids():
+            try:
+                versions[ref_id] = self.reference_version(ref_id)
+            except OSError:
+                # wav 或 txt 缺失的 preset 无法计算，同样记录，避免每次加载都重新编译
+                versions[ref_id] = ''
+        return versions
 
-        self.frontend = GPTSovitsFrontend()
+    def precompile_presets(self):
+        """
+        计算所有 preset 的参考特征并保存到 presets.safetensors，之后加载时直接 mmap 读取。
+        各 preset 的版本 (见 reference_version) 写入文件的 metadata，版本变化时重新编译。
+        单个 preset 失败时跳过并记录日志，该 preset 在请求时再按原流程计算。
+        """
+        tensors = {}
+        versions = self._preset_versions()
+        for ref_id in versions:
+            try:
+                reference = self.build_reference(*self.load_reference(ref_id))
+            except Exception as e:
+                logger.warning('failed to precompile preset %s of voice %s: %s', ref_id, self.id, e, exc_info=True)
+                continue
+            for name, value in reference.items():
+                if value is None:
+                    continue
+                if name == 'phoneme_ids':
+                    value = torch.LongTensor(value)
+                tensors[f'{ref_id}.{name}'] = value.contiguous().cpu()
+        tmp_path = f'{self.preset_bundle_path}.tmp'
+        save_file(tensors, tmp_path, metadata=versions)
+        os.replace(tmp_path, self.preset_bundle_path)
+        self._open_preset_bundle()
 
-    def inference(self, text: str, ref_id = None, ref_audio = None, ref_prompt = None, speed = 1, extra_audios = None, extra_ref_ids = None):
+    def _open_preset_bundle(self):
+        if not self.has_preset_bundle():
+            return
+        self.preset_bundle = safe_open(self.preset_bundle_path, framework='pt', device=str(self.model.device))
+        self.preset_bundle_keys = set(self.preset_bundle.keys())
+        self.preset_bundle_versions = self.preset_bundle.metadata() or {}
+
+    def _load_preset_reference(self, ref_id: str, version: str):
+        # 编译后 preset、音色权重或精度变化时不使用旧的特征
+        if f'{ref_id}.ge' not in self.preset_bundle_keys or self.preset_bundle_versions.get(ref_id) != version:
+            return None
+
+        def get_tensor(name):
+            key = f'{ref_id}.{name}'
+            return self.preset_bundle.get_tensor(key) if key in self.preset_bundle_keys else None
+
+        phoneme_ids = get_tensor('phoneme_ids')
+        return {
+            'prompt_semantic': get_tensor('prompt_semantic'),
+            'ge': get_tensor('ge'),
+            'phoneme_ids': phoneme_ids.tolist() if phoneme_ids is not None else None,
+            'bert_features': get_tensor('bert_features'),
+        }
+
+    def inference(self, text: str, ref_id = None, ref_audio = None, ref_prompt = None, speed = 1, extra_audios = None, extra_ref_ids = None, seed = None):
+        tts_speeches = list(self.inference_stream(text, ref_id, ref_audio, ref_prompt, speed, extra_audios, extra_ref_ids, seed=seed))
+        return np.concatenate(tts_speeches, 0)
+
+    def inference_stream(self, text: str, ref_id = None, ref_audio = None, ref_prompt = None, speed = 1, extra_audios = None, extra_ref_ids = None, chunk_size = None, seed = None):
+        """
+        逐句生成 int16 PCM，每句合成完毕立即 yield，句尾带一段静音。
+        指定 chunk_size 时句内也按 chunk_size 个 semantic code 为窗口分块解码输出。
+        指定 seed 时相同输入得到相同的音频。
+        """
         if ref_id:
-            ref_audio, ref_prompt = self.load_reference(ref_id)
+            reference = self.get_reference(ref_id)
+        else:
+            reference = self.build_reference(ref_audio, ref_prompt)
 
+        extra_ges = []
         if extra_ref_ids:
-            extra_audios = [self.load_reference(ref_id)[0] for ref_id in extra_ref_ids]
-        
-        tts_speeches = []
-        generator = self.frontend.zero_shot(text, ref_audio, ref_prompt, speed, extra_audios=extra_audios)
-        for model_input in generator:
-            model_output = self.model.inference(**model_input)
-            tts_speeches.append(model_output)
-            tts_speeches.append(self.frontend.speech_service.get_zero_wav())
-
-        return (np.concatenate(tts_speeches, 0) * 32768).astype(np.int16)
-        
+            extra_ges += [self.get_reference(ref_id)['ge'] for ref_id in extra_ref_ids]
+        if extra_audios:
+            extra_ges += [self.build_reference(extra_audio)['ge'] for extra_audio in extra_audios]
+        if extra_ges:
+            # 多个参考音频的风格向量取平均
+            reference = dict(reference, ge=torch.stack([reference['ge']] + extra_ges, 0).mean(0))
+
+        zero_wav = self.frontend.speech_service.get_zero_wav()
+        for sentence_index, model_input in enumerate(self.frontend.zero_shot(text, reference, speed)):
+            # 每句、每个阶段的随机数由 seed 单独派生，结果与批处理方式和其他句子无关
+            generators = self.model.create_generators(seed, sentence_index)
+            if chunk_size:
+                for model_output in self.model.inference_stream(**model_input, chunk_size=chunk_size, **generators):
+                    yield (model_output * 32768).astype(np.int16)
+                yield (zero_wav * 32768).astype(np.int16)
+            else:
+                model_output = self.model.inference(**model_input, **generators)
+                yield (np.concatenate([model_output, zero_wav], 0) * 32768).astype(np.int16)
+
+    def get_reference(self, ref_id: str):
+        version = self.reference_version(ref_id)
+        return reference_cache.get_or_create(
+            (self.id, ref_id, version),
+            lambda: self._load_preset_reference(ref_id, version) or self.build_reference(*self.load_reference(ref_id)),
+        )
+
+    def build_reference(self, ref_audio: bytes, ref_prompt = None):
+        with torch.no_grad():
+            phoneme_ids, bert_features, ref_features, ref_mel_spec = self.frontend.process_reference(ref_audio, ref_prompt)
+            prompt_semantic, ge = self.model.extract_reference(ref_features, ref_mel_spec)
+        return {
+            'prompt_semantic': prompt_semantic,
+            'ge': ge,
+            'phoneme_ids': phoneme_ids,
+            'bert_features': bert_features,
+        }
 
     def load_reference(self, ref_id: str):
         presets_dir = '{}/presets'.format(self.model_dir)
@@ -49,8 +237,10 @@ class GPTSovits:
             ref_audio = f.read()
         return ref_audio, ref_prompt
     
-    def get_random_ref_id(self):
+    def get_ref_ids(self):
         presets_dir = '{}/presets'.format(self.model_dir)
-        ids = [f.split('.')[0] for f in os.listdir(presets_dir)]
-        return random.choice(ids)
+        return sorted(set(f.split('.')[0] for f in os.listdir(presets_dir)))
+
+    def get_random_ref_id(self):
+        return random.choice(self.get_ref_ids())
 
@@ -1,15 +1,31 @@
 import torch
+import logging
 import numpy as np
+from gptsovits.scheduler import T2SScheduler
+from gptsovits.AR.models.t2s_compiled import T2SCompiledDecoder
+from gptsovits.AR.models.t2s_quantized import quantize_t2s
+from gptsovits.sovits.modules import LayerNorm
+from gptsovits.utils.precision import NORM_TYPES, get_precision
+from gptsovits.base_model import BaseModel, share_state_dict
+
+logger = logging.getLogger(__name__)
+
+# create_generator 的 stream 编号
+T2S_STREAM = 0
+SOVITS_STREAM = 1
 
 class GPTSovitsModel:
   def __init__(self,
     gpt: torch.nn.Module,
-    sovits: torch.nn.Module):
+    sovits: torch.nn.Module,
+    t2s_precision: str = None,
+    sovits_precision: str = None):
     self.gpt = gpt
     self.sovits = sovits
 
     self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    self.is_half = self.device.type == 'cuda'
+    self.t2s_precision = get_precision('t2s', self.device, t2s_precision)
+    self.sovits_precision = get_precision('sovits', self.device, sovits_precision)
 
     self.top_k = 15
     self.top_p = 1
@@ -17,47 +33,116 @@ class GPTSovitsModel:
     self.hz = 50
     self.max_sec = 54
 
-  def load(self, gpt_path, sovits_path):
-    self.gpt.load_state_dict(torch.load(gpt_path, map_location=self.device))
-    self.sovits.load_state_dict(torch.load(sovits_path, map_location=self.device))
-    if self.is_half:
-      self.gpt = self.gpt.half().to(self.device)
-      self.sovits = self.sovits.half().to(self.device)
+    self.scheduler = None
+
+  def load(self, gpt_path, sovits_path, base_model: BaseModel = None):
+    if base_model is not None:
+      # 与底模相同的权重直接引用底模，不重复占用内存
+      share_state_dict(self.gpt, base_model.load_gpt_state(gpt_path))
+      share_state_dict(self.sovits, base_model.load_sovits_state(sovits_path))
     else:
-      self.gpt = self.gpt.to(self.device)
-      self.sovits = self.sovits.to(self.device)
+      self.gpt.load_state_dict(torch.load(gpt_path, map_location=self.device))
+      self.sovits.load_state_dict(torch.load(sovits_path, map_location=self.device))
+    # T2SBlock 持有参数引用且为 TorchScript，整体转换精度，LayerNorm 与 softmax 由内核按 float32 累加
+    self.gpt = self.t2s_precision.cast(self.gpt, norm_types=()) if not self.t2s_precision.quantized else self.gpt.to(self.device)
+    self.sovits = self.sovits_precision.cast(self.sovits, norm_types=NORM_TYPES + (LayerNorm,))
     self.gpt.eval()
     self.sovits.eval()
+    if self.t2s_precision.quantized:
+      quantize_t2s(self.gpt.model)
+
+  def enable_batching(self, max_batch_size):
+    """并发请求的句子在同一个解码 batch 中连续批处理"""
+    self.scheduler = T2SScheduler(self.gpt.model, max_batch_size=max_batch_size)
+
+  def disable_batching(self):
+    if self.scheduler is not None:
+      self.scheduler.close()
+      self.scheduler = None
+
+  def enable_compiled_decode(self, backend='compile', bucket_size=512, max_len=2560, warmup=False):
+    """逐句解码时使用按 bucket 编译的静态形状解码步，warmup 为 False 时各 bucket 在第一次用到时编译"""
+    decoder = T2SCompiledDecoder(self.gpt.model, backend=backend, bucket_size=bucket_size, max_len=max_len)
+    if warmup:
+      decoder.warmup()
+    self.gpt.model.compiled_decoder = decoder
 
-  def inference(self, text, bert_features, phoneme, all_phoneme_ids, all_phoneme_len,ref_features,ref_mel_specs, speed):
-    semantic_embedding = self._extract_embeddings(ref_features) if ref_features is not None else None
-    pred_semantic = self._extract_pred_semantic(all_phoneme_ids, all_phoneme_len, semantic_embedding, bert_features)
-    audio = self.sovits.decode(pred_semantic, phoneme, ref_mel_specs, speed).detach().cpu().numpy()[0, 0]
+  def disable_compiled_decode(self):
+    self.gpt.model.compiled_decoder = None
+
+  def create_generator(self, seed, *stream):
+    """
+    由 seed 和 stream 派生的独立随机数发生器，seed 为 None 时使用全局随机数。
+    不同 stream (句子序号、阶段) 的随机数互不影响。
+    """
+    if seed is None:
+      return None
+    state = np.random.SeedSequence([int(seed), *stream]).generate_state(1, dtype=np.uint64)[0]
+    return torch.Generator(device=self.device).manual_seed(int(state))
+
+  def create_generators(self, seed, sentence_index):
+    """
+    一句话的 T2S 采样与 SoVITS 噪声各用一个发生器。
+    T2S 丢弃的 EOS 之后的解码步、批处理方式都只消耗本句 T2S 的随机数，不影响其他句子和 SoVITS
+    """
+    return {
+      't2s_generator': self.create_generator(seed, sentence_index, T2S_STREAM),
+      'sovits_generator': self.create_generator(seed, sentence_index, SOVITS_STREAM),
+    }
+
+  def inference(self, text, bert_features, phoneme, all_phoneme_ids, all_phoneme_len, prompt_semantic, ge, speed, t2s_generator=None, sovits_generator=None):
+    pred_semantic = self._extract_pred_semantic(all_phoneme_ids, all_phoneme_len, prompt_semantic, bert_features, t2s_generator)
+    with self.sovits_precision.autocast():
+      audio = self.sovits.decode(pred_semantic, phoneme, None, speed=speed, ge=ge.to(self.sovits_precision.dtype), generator=sovits_generator)
+    audio = audio.detach().float().cpu().numpy()[0, 0]
     max_audio=np.abs(audio).max()#简单防止16bit爆音
     if max_audio>1:audio/=max_audio
     return audio
 
-  def _extract_pred_semantic(self, all_phoneme_ids, all_phoneme_len, semantic_embedding, bert_features):
+  def inference_stream(self, text, bert_features, phoneme, all_phoneme_ids, all_phoneme_len, prompt_semantic, ge, speed, chunk_size=50, t2s_generator=None, sovits_generator=None):
+    pred_semantic = self._extract_pred_semantic(all_phoneme_ids, all_phoneme_len, prompt_semantic, bert_features, t2s_generator)
+    chunks = self.sovits.decode_streaming(pred_semantic, phoneme, None, speed=speed, chunk_size=chunk_size, ge=ge.to(self.sovits_precision.dtype), generator=sovits_generator)
+    while True:
+      # autocast 只包住每块的解码，yield 出去后调用方不在 autocast 区域内
+      with self.sovits_precision.autocast():
+        audio = next(chunks, None)
+      if audio is None:
+        break
+      audio = audio.detach().float().cpu().numpy()[0, 0]
+      # 分块输出无法按整句峰值归一化，逐块截断防止16bit爆音
+      yield np.clip(audio, -1, 1)
+
+  def _extract_pred_semantic(self, all_phoneme_ids, all_phoneme_len, semantic_embedding, bert_features, generator=None):
     top_k = self.top_k
     top_p = self.top_p
     temperature = self.temperature
     hz = self.hz
     max_sec = self.max_sec
 
+    t2s_model = self.scheduler if self.scheduler is not None else self.gpt.model
     with torch.no_grad():
-      pred_semantic, idx = self.gpt.model.infer_panel(
+      pred_semantic, idx = t2s_model.infer_panel(
           all_phoneme_ids,
           all_phoneme_len,
           semantic_embedding,
-          bert_features,
+          bert_features.to(self.t2s_precision.dtype),
           top_k=top_k,
           top_p=top_p,
           temperature=temperature,
           early_stop_num=hz * max_sec,
+          generator=generator,
       )
       pred_semantic = pred_semantic[:, -idx:].unsqueeze(0)
     return pred_semantic
 
+  def extract_reference(self, ref_features, ref_mel_spec):
+    """参考音频的 prompt semantic tokens 与 SoVITS 风格向量 ge"""
+    dtype = self.sovits_precision.dtype
+    with torch.no_grad(), self.sovits_precision.autocast():
+      prompt_semantic = self._extract_embeddings(ref_features.to(dtype)) if ref_features is not None else None
+      ge = self.sovits.get_ge(ref_mel_spec.to(dtype))
+    return prompt_semantic, ge
+
   def _extract_embeddings(self, ref_features):
     codes = self.sovits.extract_latent(ref_features)
     prompt_semantic = codes[0, 0]
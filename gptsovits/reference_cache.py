@@ -0,0 +1,23 @@
+import os
+import torch
+from tools.path import relative_base_path
+from gptsovits.utils.lru_cache import LRUCache
+
+class ReferenceCache(LRUCache):
+    """
+    参考音频特征缓存，key 为 (model_id, ref_id, version)。
+    version 由音色权重、preset 文件和各组件精度决定 (见 GPTSovits.reference_version)，任一变化时不会读到旧的特征。
+    value 为 {'prompt_semantic', 'ge', 'phoneme_ids', 'bert_features'}，对同一个 version 是确定的。
+    内存中按 LRU 淘汰，指定 cache_dir 时同时持久化到磁盘。
+    """
+    def _path(self, key):
+        model_id, ref_id, version = key
+        return os.path.join(self.cache_dir, model_id, f'{ref_id}.{version}.pt')
+
+REF_CACHE_DIR = os.getenv('REF_CACHE_DIR')
+
+reference_cache = ReferenceCache(
+    max_size=int(os.getenv('REF_CACHE_SIZE', '64')),
+    cache_dir=relative_base_path(REF_CACHE_DIR) if REF_CACHE_DIR else None,
+    device=torch.device('cuda' if torch.cuda.is_available() else 'cpu'),
+)
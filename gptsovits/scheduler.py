@@ -0,0 +1,199 @@
+import threading
+import queue
+import logging
+from concurrent.futures import Future
+import torch
+from gptsovits.AR.models.sampler import Sampler
+from gptsovits.AR.models.t2s_model import MAX_DECODE_STEPS, EOS_CHECK_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+class T2SRequest:
+    def __init__(self, x, prompts, bert_feature, top_k, top_p, temperature, repetition_penalty, early_stop_num, generator=None):
+        self.x = x
+        self.prompts = prompts
+        self.bert_feature = bert_feature
+        self.top_k = top_k
+        self.top_p = top_p
+        self.temperature = temperature
+        self.repetition_penalty = repetition_penalty
+        self.early_stop_num = early_stop_num
+        # 每行使用本句 T2S 独占的随机数发生器，每步只按本行的 top_k 抽取噪声；
+        # 其他行触发的额外 EOS 检查只改变本行 EOS 之后多解码几步，这些步消耗的随机数随本句丢弃
+        self.generator = generator
+        self.future = Future()
+
+        self.kv_cache = None
+        self.y = None
+        self.y_len = 0
+        self.prefix_len = 0
+        self.ref_free = False
+        self.idx = 0
+
+    @property
+    def last_step(self) -> int:
+        """host 上已知的最后一步：达到 early stop 或最大解码步数"""
+        if self.early_stop_num == -1:
+            return MAX_DECODE_STEPS - 1
+        return min(MAX_DECODE_STEPS - 1, self.early_stop_num)
+
+class T2SScheduler:
+    """
+    连续批处理 T2S 解码：在每个解码步之间把新句子加入正在解码的 batch，
+    每行保留自己的 KV 缓存和 prompt 长度，生成完毕的行立即返回给调用方去做 SoVITS 解码。
+    """
+    def __init__(self, t2s_model, max_batch_size: int = 8, eos_check_interval: int = EOS_CHECK_INTERVAL):
+        self.t2s_model = t2s_model
+        self.max_batch_size = max_batch_size
+        self.eos_check_interval = max(1, eos_check_interval)
+        # 上次检查以来每步各行的 EOS 标记 [B]，攒满 eos_check_interval 步才同步回 host
+        self.eos_flags = []
+        self.pending = queue.Queue()
+        self.active = []
+        # active 中各行的采样状态，行顺序与 active 一致
+        self.sampler = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, x, prompts, bert_feature, top_k=-100, top_p=100, temperature=1.0, repetition_penalty=1.35, early_stop_num=-1, generator=None) -> Future:
+        request = T2SRequest(x, prompts, bert_feature, top_k, top_p, temperature, repetition_penalty, early_stop_num, generator)
+        self._ensure_started()
+        self.pending.put(request)
+        return request.future
+
+    def infer_panel(self, x, x_lens, prompts, bert_feature, top_k=-100, top_p=100, early_stop_num=-1, temperature=1.0, repetition_penalty=1.35, **kwargs):
+        """与 Text2SemanticDecoder.infer_panel 相同的签名，阻塞直到该句解码完成"""
+        future = self.submit(x, prompts, bert_feature, top_k=top_k, top_p=top_p, temperature=temperature, repetition_penalty=repetition_penalty, early_stop_num=early_stop_num, generator=kwargs.get('generator'))
+        return future.result()
+
+    def close(self):
+        """停止调度线程，释放对模型的引用"""
+        self.pending.put(None)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='t2s-scheduler', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            if not self.active:
+                # 没有正在解码的行时阻塞等待新请求
+                request = self.pending.get()
+                if request is None:
+                    self._cancel_pending()
+                    return
+                self._admit(request)
+            # 只在 EOS 检查之后加入新请求，保证一个检查块内各行不变
+            while not self.eos_flags and len(self.active) < self.max_batch_size:
+                try:
+                    request = self.pending.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    # 解码完当前 batch 后退出
+                    self.pending.put(None)
+                    break
+                self._admit(request)
+            if self.active:
+                self._step()
+
+    def _cancel_pending(self):
+        while True:
+            try:
+                request = self.pending.get_nowait()
+            except queue.Empty:
+                return
+            if request is not None:
+                request.future.set_exception(RuntimeError('T2S scheduler closed'))
+
+    def _admit(self, request: T2SRequest):
+        try:
+            with torch.no_grad():
+                self._process_prompt(request)
+        except Exception as e:
+            logger.error(e, exc_info=True)
+            request.future.set_exception(e)
+
+    def _process_prompt(self, request: T2SRequest):
+        model = self.t2s_model
+        xy_pos, xy_attn_mask, y, y_len, prefix_len, ref_free = model.prepare_prompt(request.x, request.prompts, request.bert_feature)
+        src_len = xy_pos.shape[1]
+        xy_dec, request.kv_cache = model.t2s_transformer.process_prompt(xy_pos, xy_attn_mask, None, True, src_len + MAX_DECODE_STEPS)
+        request.y = y
+        request.y_len = y_len
+        request.prefix_len = prefix_len
+        request.ref_free = ref_free
+        request.idx = 0
+        sampler = Sampler(
+            y, model.vocab_size, top_k=request.top_k, top_p=request.top_p, temperature=request.temperature,
+            repetition_penalty=request.repetition_penalty, generator=[request.generator],
+        )
+        # 第一步不允许直接生成 EOS，只可能因为 early stop 结束
+        logits = model.ar_predict_layer(xy_dec[:, -1])[:, :-1]
+        request.y = torch.concat([request.y, sampler.sample(logits)], dim=1)
+        if request.last_step == 0:
+            self._finish(request, 0)
+            return
+        self.active.append(request)
+        self.sampler = sampler if self.sampler is None else Sampler.cat([self.sampler, sampler])
+
+    def _step(self):
+        model = self.t2s_model
+        rows = self.active
+        try:
+            with torch.no_grad():
+                last_tokens = torch.cat([request.y[:, -1:] for request in rows], dim=0)
+                positions = torch.tensor([request.y_len + request.idx for request in rows], device=last_tokens.device)
+                xy_pos = model.embed_next_token(last_tokens, positions)
+                xy_dec = model.t2s_transformer.decode_next_token_rows(xy_pos, [request.kv_cache for request in rows])
+                logits = model.ar_predict_layer(xy_dec[:, -1])
+                samples = self.sampler.sample(logits)
+                for i, request in enumerate(rows):
+                    request.y = torch.concat([request.y, samples[i:i+1]], dim=1)
+                    request.idx += 1
+                self.eos_flags.append((torch.argmax(logits, dim=-1) == model.EOS) | (samples[:, 0] == model.EOS))
+                if len(self.eos_flags) >= self.eos_check_interval or any(request.idx >= request.last_step for request in rows):
+                    self._check_eos()
+        except Exception as e:
+            logger.error(e, exc_info=True)
+            for request in rows:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            self.active = []
+            self.sampler = None
+            self.eos_flags = []
+
+    def _check_eos(self):
+        """
+        把攒下的 EOS 标记一次性取回 host，结束已经生成完毕的行。
+        每行的 stop_step 只由本行的标记和 last_step 决定，与检查发生在哪一步无关
+        """
+        rows = self.active
+        flags = torch.stack(self.eos_flags, dim=1).cpu()
+        self.eos_flags = []
+        keep = []
+        for i, request in enumerate(rows):
+            hits = torch.nonzero(flags[i])
+            stop_step = request.idx - flags.shape[1] + 1 + int(hits[0, 0]) if hits.numel() > 0 else None
+            if request.idx >= request.last_step:
+                stop_step = request.last_step if stop_step is None else min(stop_step, request.last_step)
+            if stop_step is None:
+                keep.append(i)
+            else:
+                self._finish(request, stop_step)
+        self.active = [rows[i] for i in keep]
+        if not keep:
+            self.sampler = None
+        elif len(keep) < len(rows):
+            self.sampler.index_select(torch.tensor(keep, device=self.sampler.counts.device))
+
+    def _finish(self, request: T2SRequest, stop_step: int):
+        """stop_step 为生成 EOS (或达到上限) 的那一步，之后多解码的 token 丢弃"""
+        y = request.y[:, :request.prefix_len + stop_step + 1]
+        if request.early_stop_num != -1 and stop_step == request.early_stop_num:
+            logger.debug("use early stop num: %d", request.early_stop_num)
+        logger.debug("T2S Decoding EOS [%d -> %d]", request.prefix_len, y.shape[1])
+        request.kv_cache = None
+        request.future.set_result((y[:, :-1], 0 if request.ref_free else stop_step - 1))
@@ -858,26 +858,29 @@ class SynthesizerTrn(nn.Module):
         o = self.dec((z * y_mask)[:, :, :], g=ge)
         return o, y_mask, (z, z_p, m_p, logs_p)
 
-    @torch.no_grad()
-    def decode(self, codes, text, refer, noise_scale=0.5,speed=1):
-        def get_ge(refer):
-            ge = None
-            if refer is not None:
-                refer_lengths = torch.LongTensor([refer.size(2)]).to(refer.device)
-                refer_mask = torch.unsqueeze(
-                    commons.sequence_mask(refer_lengths, refer.size(2)), 1
-                ).to(refer.dtype)
-                ge = self.ref_enc(refer[:, :704] * refer_mask, refer_mask)
-            return ge
+    def get_ge(self, refer):
         if(type(refer)==list):
             ges=[]
             for _refer in refer:
-                ge=get_ge(_refer)
+                ge=self.get_ge(_refer)
                 ges.append(ge)
-            ge=torch.stack(ges,0).mean(0)
-        else:
-            ge=get_ge(refer)
+            return torch.stack(ges,0).mean(0)
+        ge = None
+        if refer is not None:
+            refer_lengths = torch.LongTensor([refer.size(2)]).to(refer.device)
+            refer_mask = torch.unsqueeze(
+                commons.sequence_mask(refer_lengths, refer.size(2)), 1
+            ).to(refer.dtype)
+            ge = self.ref_enc(refer[:, :704] * refer_mask, refer_mask)
+        return ge
+
+    @torch.no_grad()
+    def decode(self, codes, text, refer, noise_scale=0.5,speed=1, ge=None, generator=None):
+        if ge is None:
+            ge = self.get_ge(refer)
+        return self._decode_window(codes, text, ge, noise_scale, speed, generator)
 
+    def _decode_window(self, codes, text, ge, noise_scale=0.5, speed=1, generator=None):
         y_lengths = torch.LongTensor([codes.size(2) * 2]).to(codes.device)
         text_lengths = torch.LongTensor([text.size(-1)]).to(text.device)
 
@@ -889,13 +892,50 @@ class SynthesizerTrn(nn.Module):
         x, m_p, logs_p, y_mask = self.enc_p(
             quantized, y_lengths, text, text_lengths, ge,speed
         )
-        z_p = m_p + torch.randn_like(m_p) * torch.exp(logs_p) * noise_scale
+        noise = torch.randn(m_p.shape, generator=generator, device=m_p.device, dtype=m_p.dtype)
+        z_p = m_p + noise * torch.exp(logs_p) * noise_scale
 
         z = self.flow(z_p, y_mask, g=ge, reverse=True)
 
         o = self.dec((z * y_mask)[:, :, :], g=ge)
         return o
 
+    @torch.no_grad()
+    def decode_streaming(self, codes, text, refer, noise_scale=0.5, speed=1, chunk_size=50, overlap=4, left_context=16, right_context=8, ge=None, generator=None):
+        """
+        按窗口逐块解码 semantic codes，yield [1, 1, samples] 的音频。
+        每个窗口两侧带 left_context/right_context 个 code 的上下文，输出时裁掉；
+        相邻窗口共享 overlap 个 code，重叠部分线性交叉淡化。
+        """
+        if ge is None:
+            ge = self.get_ge(refer)
+        total = codes.size(2)
+        tail = None
+        start = 0
+        while start < total:
+            end = min(start + chunk_size + overlap, total)
+            ctx_start = max(0, start - left_context)
+            ctx_end = min(total, end + right_context)
+
+            o = self._decode_window(codes[:, :, ctx_start:ctx_end], text, ge, noise_scale, speed, generator)
+            # speed != 1 时每个 code 对应的采样数不是整数，按比例换算
+            samples_per_code = o.size(-1) / (ctx_end - ctx_start)
+            o = o[..., int(round((start - ctx_start) * samples_per_code)):int(round((end - ctx_start) * samples_per_code))]
+
+            if tail is not None:
+                fade = min(tail.size(-1), o.size(-1))
+                ramp = torch.linspace(0, 1, fade, device=o.device, dtype=o.dtype)
+                o = torch.cat([o[..., :fade] * ramp + tail[..., :fade] * (1 - ramp), o[..., fade:]], dim=-1)
+
+            if end >= total:
+                yield o
+                break
+
+            overlap_samples = int(round(overlap * samples_per_code))
+            tail = o[..., o.size(-1) - overlap_samples:]
+            yield o[..., :o.size(-1) - overlap_samples]
+            start += chunk_size
+
     def extract_latent(self, x):
         ssl = self.ssl_proj(x)
         quantized, codes, commit_loss, quantized_list = self.quantizer(ssl)
@@ -5,20 +5,21 @@ import numpy as np
 from gptsovits.module.mel_processing import spectrogram_torch
 from .constants import FILTER_LENGTH, HOP_LENGTH, WIN_LENGTH, SAMPLE_RATE
 from tools.path import pretrained_models_base_path
+from gptsovits.utils.precision import Precision, get_precision
 
 class SpeechService:
-  def __init__(self, device='cuda', dtype=torch.float32):
+  def __init__(self, device='cuda', precision: Precision = None):
     self.device = device
-    self.dtype = dtype
-
-    self.is_half = dtype == torch.float16
+    self.precision = precision or get_precision('hubert', device)
+    self.dtype = self.precision.dtype
 
     cnhubert_base_path = pretrained_models_base_path('gptsovits/chinese-hubert-base')
 
     cnhubert.cnhubert_base_path = cnhubert_base_path
 
     ssl_model = cnhubert.get_model()
-    self.ssl_model = ssl_model.half().to(device) if self.is_half else ssl_model.to(device)
+    # int8 时只量化 transformer 的线性层，卷积特征提取保持 float32
+    self.ssl_model = self.precision.cast(ssl_model)
 
   def process_audio(self, audio: bytes, ref_prompt = None, ex_audios: List[bytes] = None):
     ref_features = self._get_ref_features(audio) if ref_prompt else None
@@ -38,16 +39,10 @@ class SpeechService:
     zero_wav = self.get_zero_wav(sr)
     zero_wav_torch = torch.from_numpy(zero_wav)
     
-    if self.is_half:
-        wav16k = wav16k.half().to(device)
-        zero_wav_torch = zero_wav_torch.half().to(device)
-    else:
-        wav16k = wav16k.to(device)
-        zero_wav_torch = zero_wav_torch.to(device)
-    
-    wav16k = torch.cat([wav16k, zero_wav_torch])
+    wav16k = torch.cat([wav16k, zero_wav_torch]).to(device=device, dtype=self.dtype)
     
-    ssl_content = self.ssl_model.model(wav16k.unsqueeze(0))["last_hidden_state"].transpose(1, 2)
+    with self.precision.autocast():
+      ssl_content = self.ssl_model.model(wav16k.unsqueeze(0))["last_hidden_state"].transpose(1, 2)
     
     return ssl_content
   
@@ -66,12 +61,8 @@ class SpeechService:
         WIN_LENGTH,
         center=False,
     )
-    return spec.to(self.dtype).to(self.device)
+    # 频谱是 SoVITS 的输入，由 GPTSovitsModel 转换到 SoVITS 的精度
+    return spec.to(self.device)
 
   def get_zero_wav(self, sr=32000):
-    is_half = self.is_half
-    zero_wav = np.zeros(
-        int(sr * 0.3),
-        dtype=np.float16 if is_half == True else np.float32,
-    )
-    return zero_wav
+    return np.zeros(int(sr * 0.3), dtype=np.float32)
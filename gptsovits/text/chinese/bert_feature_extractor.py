@@ -0,0 +1,37 @@
+import torch
+from torch import nn
+from transformers import AutoConfig, AutoModel
+
+# 与原 hidden_states[-3:-2] 对应的 encoder 层
+BERT_FEATURE_LAYER = -3
+
+class BertFeatureExtractor(nn.Module):
+    """
+    只加载到被使用的那一层为止的 RoBERTa encoder，不加载 MLM head 和 pooler。
+    输出的 last_hidden_state 等价于完整模型 output_hidden_states 的 hidden_states[BERT_FEATURE_LAYER]。
+    """
+    def __init__(self, model_path: str, feature_layer: int = BERT_FEATURE_LAYER):
+        super().__init__()
+        config = AutoConfig.from_pretrained(model_path)
+        # hidden_states 包含 embedding 输出，倒数第 k 个对应前 num_hidden_layers - k + 1 层的输出
+        config.num_hidden_layers = config.num_hidden_layers + feature_layer + 1
+        self.model = AutoModel.from_pretrained(model_path, config=config, add_pooling_layer=False)
+        self.model.eval()
+
+    def forward(self, **inputs) -> torch.Tensor:
+        return self.model(**inputs).last_hidden_state
+
+def verify_bert_features(model_path: str, tokenizer, texts, device='cpu', atol=1e-4):
+    """与完整 AutoModelForMaskedLM 的 hidden_states[-3] 比较，返回最大绝对误差"""
+    from transformers import AutoModelForMaskedLM
+    full_model = AutoModelForMaskedLM.from_pretrained(model_path).to(device).eval()
+    extractor = BertFeatureExtractor(model_path).to(device)
+    max_diff = 0.0
+    with torch.no_grad():
+        for text in texts:
+            inputs = tokenizer(text, return_tensors="pt").to(device)
+            expected = full_model(**inputs, output_hidden_states=True)["hidden_states"][BERT_FEATURE_LAYER]
+            actual = extractor(**inputs)
+            max_diff = max(max_diff, (expected - actual).abs().max().item())
+    assert max_diff <= atol, f'truncated BERT features differ from full model: {max_diff}'
+    return max_diff
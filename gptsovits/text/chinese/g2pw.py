@@ -0,0 +1,85 @@
+import logging
+import threading
+from contextlib import contextmanager
+from typing import List, Optional
+from pypinyin import Style
+from pypinyin.constants import RE_HANS
+
+logger = logging.getLogger(__name__)
+
+
+class _PrefetchedPredictor:
+    """
+    包装 g2pw 的 ONNX 多音字模型：prefetch 时把一批句子一次前向，
+    之后 pypinyin 逐句调用时直接取结果，未预取的句子仍单独前向。
+    """
+    def __init__(self, predict):
+        self.predict = predict
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, sentences):
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        with self.lock:
+            cached = [self.results.get(sentence) for sentence in sentences]
+        missing = [sentence for sentence, result in zip(sentences, cached) if result is None]
+        predicted = iter(self.predict(missing)) if missing else iter(())
+        return [result if result is not None else next(predicted) for result in cached]
+
+    @contextmanager
+    def prefetch(self, sentences: List[str]):
+        sentences = list(dict.fromkeys(sentences))
+        results = dict(zip(sentences, self.predict(sentences))) if sentences else {}
+        with self.lock:
+            self.results.update(results)
+        try:
+            yield
+        finally:
+            with self.lock:
+                for sentence in results:
+                    self.results.pop(sentence, None)
+
+
+class G2PW:
+    """g2pw 多音字消歧，进程内只加载一次，由所有 ChinesePhonemeConverter 共享"""
+    def __init__(self, pinyin, correct_pronunciation):
+        self.pinyin = pinyin
+        self.correct_pronunciation = correct_pronunciation
+        self.predictor = None
+        converter = getattr(pinyin, '_converter', None)
+        if converter is not None and callable(getattr(converter, '_g2pw', None)):
+            self.predictor = _PrefetchedPredictor(converter._g2pw)
+            converter._g2pw = self.predictor
+
+    def lazy_pinyin(self, sentence: str) -> List[str]:
+        return self.pinyin.lazy_pinyin(sentence, neutral_tone_with_five=True, style=Style.TONE3)
+
+    def lazy_pinyin_batch(self, sentences: List[str]) -> List[List[str]]:
+        """一个请求的所有句子的多音字在同一次 ONNX 前向中消歧"""
+        if self.predictor is None or len(sentences) <= 1:
+            return [self.lazy_pinyin(sentence) for sentence in sentences]
+        # pypinyin 按汉字片段调用 g2pw，预取同样的片段
+        segments = [segment for sentence in sentences for segment in self.pinyin.seg(sentence) if RE_HANS.match(segment)]
+        with self.predictor.prefetch(segments):
+            return [self.lazy_pinyin(sentence) for sentence in sentences]
+
+
+_g2pw = None
+_g2pw_loaded = False
+_g2pw_lock = threading.Lock()
+
+
+def get_g2pw() -> Optional[G2PW]:
+    """首次调用时加载 g2pw，未安装时返回 None 并降级到 pypinyin"""
+    global _g2pw, _g2pw_loaded
+    if not _g2pw_loaded:
+        with _g2pw_lock:
+            if not _g2pw_loaded:
+                try:
+                    from text.g2pw import G2PWPinyin, correct_pronunciation
+                    _g2pw = G2PW(G2PWPinyin(), correct_pronunciation)
+                except ImportError:
+                    logger.warning("g2pw 加载失败，降级到 pypinyin")
+                _g2pw_loaded = True
+    return _g2pw
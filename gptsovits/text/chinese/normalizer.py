@@ -1,12 +1,15 @@
 import re
 from gptsovits.text.normalizer import TextNormalizer
 from gptsovits.text.constants import PUNCTUATION, PUNCTUATION_REP_MAP
-from .zh_normalization.text_normlization import TextNormalizer as ZHTextNormalizer
+from .zh_normalization.text_normlization import zh_text_normalizer
+
+RE_PUNCTUATION_REP = re.compile("|".join(re.escape(p) for p in PUNCTUATION_REP_MAP.keys()))
+RE_NON_CHINESE = re.compile(r"[^\u4e00-\u9fa5" + "".join(PUNCTUATION) + r"]+")
+RE_CONSECUTIVE_PUNCTUATION = re.compile('([{0}])([{0}])+'.format(''.join(re.escape(p) for p in PUNCTUATION)))
 
 class ChineseTextNormalizer(TextNormalizer):
     def normalize_text(self, text: str) -> str:
-      tx = ZHTextNormalizer()
-      sentences = tx.normalize(text)
+      sentences = zh_text_normalizer.normalize(text)
       dest_text = ""
       for sentence in sentences:
           dest_text += self._replace_punctuation(sentence)
@@ -17,18 +20,8 @@ class ChineseTextNormalizer(TextNormalizer):
     
     def _replace_punctuation(self, text):
       text = text.replace("嗯", "恩").replace("呣", "母")
-      pattern = re.compile("|".join(re.escape(p) for p in PUNCTUATION_REP_MAP.keys()))
-
-      replaced_text = pattern.sub(lambda x: PUNCTUATION_REP_MAP[x.group()], text)
-
-      replaced_text = re.sub(
-          r"[^\u4e00-\u9fa5" + "".join(PUNCTUATION) + r"]+", "", replaced_text
-      )
-
-      return replaced_text
+      replaced_text = RE_PUNCTUATION_REP.sub(lambda x: PUNCTUATION_REP_MAP[x.group()], text)
+      return RE_NON_CHINESE.sub("", replaced_text)
     
     def _replace_consecutive_punctuation(self, text):
-      punctuations = ''.join(re.escape(p) for p in PUNCTUATION)
-      pattern = f'([{punctuations}])([{punctuations}])+'
-      result = re.sub(pattern, r'\1', text)
-      return result
\ No newline at end of file
+      return RE_CONSECUTIVE_PUNCTUATION.sub(r'\1', text)
@@ -2,18 +2,21 @@ import re, os, json
 import torch
 from gptsovits.text.phoneme_converter import PhonemeConverter
 from gptsovits.text.constants import PUNCTUATION
-from transformers import AutoModelForMaskedLM, AutoTokenizer
+from transformers import AutoTokenizer
 import jieba_fast.posseg as psg
 from pypinyin import Style, lazy_pinyin
 from pypinyin.contrib.tone_convert import to_initials, to_finals_tone3
 from .tone_sandhi import ToneSandhi
+from .bert_feature_extractor import BertFeatureExtractor
+from .g2pw import get_g2pw
+from .pinyin_index import SYLLABLE_INDEX
+from gptsovits.utils.lru_cache import LRUCache
 from tools.path import pretrained_models_base_path
 
-current_file_path = os.path.dirname(__file__)
-pinyin_to_symbol_map = {
-    line.split("\t")[0]: line.strip().split("\t")[1]
-    for line in open(os.path.join(current_file_path, "opencpop-strict.txt")).readlines()
-}
+BERT_BATCH_SIZE = 16
+
+# 分词级 g2p 缓存：(word, pos) -> 变调和儿化处理后的 (initials, finals)
+G2P_WORD_CACHE_SIZE = int(os.getenv('G2P_WORD_CACHE_SIZE', '65536'))
 
 class ChinesePhonemeConverter(PhonemeConverter):
     def __init__(self):
@@ -23,79 +26,103 @@ class ChinesePhonemeConverter(PhonemeConverter):
         self.dtype = PhonemeConverter.dtype
         bert_model_path = pretrained_models_base_path('gptsovits/chinese-roberta-wwm-ext-large')
         self.tokenizer = AutoTokenizer.from_pretrained(bert_model_path)
-        self.bert_model = AutoModelForMaskedLM.from_pretrained(bert_model_path)
+        self.bert_model = BertFeatureExtractor(bert_model_path)
         self.tone_modifier = ToneSandhi()
+        self.word_cache = LRUCache(max_size=G2P_WORD_CACHE_SIZE)
 
-        if self.dtype == torch.float16:
-            self.bert_model = self.bert_model.half().to(self.device)
-        else:
-            self.bert_model = self.bert_model.to(self.device)
+        self.precision = PhonemeConverter.precision
+        self.bert_model = self.precision.cast(self.bert_model)
 
         self._loadErhuaDict()
     
     def convert_to_phonemes(self, text: str):
-        initials, finals = self._convert_to_initials_finals(text)
-        phones_list = self._process_phonemes(initials, finals, text)
-        phoneme_lengths = self._process_phoneme_lengths(initials, finals)
-        return phones_list, phoneme_lengths
+        return self.convert_to_phonemes_batch([text])[0]
+
+    def convert_to_phonemes_batch(self, texts: list[str]):
+        results = []
+        for text, (initials, finals) in zip(texts, self._convert_to_initials_finals_batch(texts)):
+            phones_list = self._process_phonemes(initials, finals, text)
+            phoneme_lengths = self._process_phoneme_lengths(initials, finals)
+            results.append((phones_list, phoneme_lengths))
+        return results
     
     def get_bert_features(self, text: str, phonemes: list[str], phoneme_lengths: list[int]):
-        with torch.no_grad():
-            inputs = self.tokenizer(text, return_tensors="pt").to(self.device)
-            res = self.bert_model(**inputs, output_hidden_states=True)
-            hidden_states = torch.cat(res["hidden_states"][-3:-2], -1)[0].cpu()[1:-1]
-        
-        assert len(phoneme_lengths) == len(text)
-        phone_level_feature = [
-            hidden_states[i].repeat(length, 1) for i, length in enumerate(phoneme_lengths)
-        ]
-        return torch.cat(phone_level_feature, dim=0).T.to(self.device)
-    
+        return self.get_bert_features_batch([(text, phonemes, phoneme_lengths)])[0]
+
+    def get_bert_features_batch(self, items):
+        # 按长度排序分桶，每个桶 padding 后做一次 BERT 前向
+        features = [None] * len(items)
+        order = sorted(range(len(items)), key=lambda i: len(items[i][0]))
+        for start in range(0, len(order), BERT_BATCH_SIZE):
+            batch = order[start:start + BERT_BATCH_SIZE]
+            hidden_states_list = self._get_bert_hidden_states([items[i][0] for i in batch])
+            for i, hidden_states in zip(batch, hidden_states_list):
+                text, _, phoneme_lengths = items[i]
+                assert len(phoneme_lengths) == len(text)
+                phone_level_feature = [
+                    hidden_states[j].repeat(length, 1) for j, length in enumerate(phoneme_lengths)
+                ]
+                features[i] = torch.cat(phone_level_feature, dim=0).T.to(self.device)
+        return features
+
+    def _get_bert_hidden_states(self, texts: list[str]):
+        """返回每条文本去掉 [CLS]/[SEP] 后倒数第三层的 hidden states"""
+        with torch.no_grad(), self.precision.autocast():
+            inputs = self.tokenizer(texts, return_tensors="pt", padding=True).to(self.device)
+            hidden_states = self.bert_model(**inputs).cpu()
+        lengths = inputs["attention_mask"].sum(-1).tolist()
+        return [hidden_states[i, 1:length - 1] for i, length in enumerate(lengths)]
+
+    def cache_stats(self):
+        return self.word_cache.stats()
+
     def _loadErhuaDict(self):
         config_file_path = os.path.join(self.base_path, "erhua.json")
+        self.erhua_mtime = os.path.getmtime(config_file_path)
         with open(config_file_path, 'r', encoding='utf-8') as f:
             erhua_config = json.load(f)
 
         self.must_erhua = set(erhua_config["must_erhua"])
         self.not_erhua = set(erhua_config["not_erhua"])
-    
-    def _convert_to_initials_finals(self, text: str):
-        sentences = [i.strip() for i in re.split(r"(?<=[{0}])\s*".format("".join(PUNCTUATION)), text) if i.strip()]
-        use_g2pw = self._initialize_g2pw()
-
-        initials_list, finals_list = [], []
-        for seg in sentences:
-            seg_cut = self._clean_and_segment_text(seg)
-            initials, finals = self._convert_to_pinyin(seg_cut, use_g2pw)
-            initials_list.extend(initials)
-            finals_list.extend(finals)
-
-        return initials_list, finals_list
-    
-    def _initialize_g2pw(self):
-        try:
-            from text.g2pw import G2PWPinyin, correct_pronunciation
-            self.g2pw = G2PWPinyin()
-            self.correct_pronunciation = correct_pronunciation
-            return True
-        except ImportError:
-            print("g2pw 加载失败，降级到 pypinyin")
-            return False
+
+    def _check_erhua_dict(self):
+        """erhua.json 被修改时重新加载，缓存的分词结果依赖儿化词表，一并清空"""
+        if os.path.getmtime(os.path.join(self.base_path, "erhua.json")) != self.erhua_mtime:
+            self._loadErhuaDict()
+            self.word_cache.invalidate()
+    
+    def _convert_to_initials_finals_batch(self, texts: list[str]):
+        """texts 中所有句子的多音字由 g2pw 一次消歧，返回每条文本的 (initials, finals)"""
+        self._check_erhua_dict()
+        segments_list = [
+            [self._clean_and_segment_text(seg) for seg in re.split(r"(?<=[{0}])\s*".format("".join(PUNCTUATION)), text) if seg.strip()]
+            for text in texts
+        ]
+        g2pw = get_g2pw()
+        if g2pw is not None:
+            pinyins_iter = iter(g2pw.lazy_pinyin_batch([seg for segments in segments_list for seg, _ in segments]))
+
+        results = []
+        for segments in segments_list:
+            initials_list, finals_list = [], []
+            for seg, seg_cut in segments:
+                if g2pw is not None:
+                    initials, finals = self._convert_using_g2pw(seg_cut, next(pinyins_iter), g2pw.correct_pronunciation)
+                else:
+                    initials, finals = self._convert_using_pypinyin(seg_cut)
+                initials_list.extend(initials)
+                finals_list.extend(finals)
+            results.append((initials_list, finals_list))
+        return results
     
     def _clean_and_segment_text(self, seg: str):
-        seg = re.sub("[a-zA-Z]+", "", seg)
+        """返回去掉英文后的句子及其分词结果"""
+        seg = re.sub("[a-zA-Z]+", "", seg.strip())
         seg_cut = psg.lcut(seg)
-        return self.tone_modifier.pre_merge_for_modify(seg_cut)
+        return seg, self.tone_modifier.pre_merge_for_modify(seg_cut)
     
-    def _convert_to_pinyin(self, seg_cut, use_g2pw):
-        if use_g2pw:
-            return self._convert_using_g2pw(seg_cut)
-        else:
-            return self._convert_using_pypinyin(seg_cut)
-    
-    def _convert_using_g2pw(self, seg_cut):
+    def _convert_using_g2pw(self, seg_cut, pinyins, correct_pronunciation):
         initials, finals = [], []
-        pinyins = self.g2pw.lazy_pinyin(seg_cut, neutral_tone_with_five=True, style=Style.TONE3)
         pre_word_length = 0
 
         for word, pos in seg_cut:
@@ -103,7 +130,7 @@ class ChinesePhonemeConverter(PhonemeConverter):
                 pre_word_length += len(word)
                 continue
 
-            word_pinyins = self.correct_pronunciation(word, pinyins[pre_word_length:pre_word_length + len(word)])
+            word_pinyins = correct_pronunciation(word, pinyins[pre_word_length:pre_word_length + len(word)])
             sub_initials, sub_finals = self._extract_initials_finals(word_pinyins)
             pre_word_length += len(word)
 
@@ -121,14 +148,23 @@ class ChinesePhonemeConverter(PhonemeConverter):
         for word, pos in seg_cut:
             if pos == "eng":
                 continue
-            sub_initials, sub_finals = self._extract_initials_finals_word(word)
-            sub_finals = self.tone_modifier.modified_tone(word, pos, sub_finals)
-            sub_initials, sub_finals = self._merge_erhua(sub_initials, sub_finals, word, pos)
-
+            sub_initials, sub_finals = self._convert_word(word, pos)
             initials.extend(sub_initials)
             finals.extend(sub_finals)
 
         return initials, finals
+
+    def _convert_word(self, word: str, pos: str):
+        """pypinyin 的结果只取决于 (word, pos)，变调和儿化处理后按分词缓存"""
+        key = (word, pos)
+        result = self.word_cache.get(key)
+        if result is None:
+            sub_initials, sub_finals = self._extract_initials_finals_word(word)
+            sub_finals = self.tone_modifier.modified_tone(word, pos, sub_finals)
+            sub_initials, sub_finals = self._merge_erhua(sub_initials, sub_finals, word, pos)
+            result = (tuple(sub_initials), tuple(sub_finals))
+            self.word_cache.put(key, result)
+        return result
     
     def _extract_initials_finals_word(self, word):
         initials = []
@@ -179,39 +215,14 @@ class ChinesePhonemeConverter(PhonemeConverter):
     def _process_phonemes(self, initials, finals, seg):
         phones_list = []
         for c, v in zip(initials, finals):
-            phone = self._map_pinyin_to_phone(c, v, seg)
-            phones_list.extend(phone)
+            if c == v:
+                assert c in PUNCTUATION
+                phones_list.append(c)
+                continue
+            phones = SYLLABLE_INDEX.get((c, v))
+            assert phones is not None, (seg, c + v)
+            phones_list.extend(phones)
         return phones_list
     
-    def _map_pinyin_to_phone(self, c, v, seg):
-        if c == v:
-            assert c in PUNCTUATION
-            return [c]
-        else:
-            v_without_tone = v[:-1]
-            tone = v[-1]
-            assert tone in "12345"
-            pinyin = self._normalize_pinyin(c, v_without_tone)
-
-            assert pinyin in pinyin_to_symbol_map.keys(), (pinyin, seg, c + v)
-            new_c, new_v = pinyin_to_symbol_map[pinyin].split(" ")
-            new_v += tone
-            return [new_c, new_v]
-    
-    def _normalize_pinyin(self, c, v_without_tone):
-        if c:
-            v_rep_map = {"uei": "ui", "iou": "iu", "uen": "un"}
-            return c + v_rep_map.get(v_without_tone, v_without_tone)
-        else:
-            pinyin = c + v_without_tone
-            pinyin_rep_map = { "ing": "ying", "i": "yi", "in": "yin", "u": "wu" }
-            if pinyin in pinyin_rep_map.keys():
-                pinyin = pinyin_rep_map[pinyin]
-            else:
-                single_rep_map = { "v": "yu", "e": "e", "i": "y", "u": "w" }
-                if pinyin[0] in single_rep_map.keys():
-                    pinyin = single_rep_map[pinyin[0]] + pinyin[1:]
-            return pinyin
-    
     def _process_phoneme_lengths(self, initials, finals):
         return [1 if c == v else 2 for c, v in zip(initials, finals)]
\ No newline at end of file
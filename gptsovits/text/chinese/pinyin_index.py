@@ -0,0 +1,54 @@
+import os
+from itertools import product
+from typing import Dict, Tuple
+
+current_file_path = os.path.dirname(__file__)
+pinyin_to_symbol_map = {
+    line.split("\t")[0]: line.strip().split("\t")[1]
+    for line in open(os.path.join(current_file_path, "opencpop-strict.txt")).readlines()
+}
+
+# pypinyin strict 模式下的声母与韵母 (ü 写作 v)
+INITIALS = ['', 'b', 'p', 'm', 'f', 'd', 't', 'n', 'l', 'g', 'k', 'h', 'j', 'q', 'x', 'zh', 'ch', 'sh', 'r', 'z', 'c', 's']
+FINALS = [
+    'a', 'o', 'e', 'i', 'u', 'v', 'ai', 'ei', 'ao', 'ou', 'an', 'en', 'ang', 'eng', 'ong', 'er',
+    'ia', 'ie', 'iao', 'iou', 'ian', 'in', 'iang', 'ing', 'iong',
+    'ua', 'uo', 'uai', 'uei', 'uan', 'uen', 'uang', 'ueng', 've', 'van', 'vn', 'io',
+]
+TONES = '12345'
+
+V_REP_MAP = {"uei": "ui", "iou": "iu", "uen": "un"}
+PINYIN_REP_MAP = {"ing": "ying", "i": "yi", "in": "yin", "u": "wu"}
+SINGLE_REP_MAP = {"v": "yu", "e": "e", "i": "y", "u": "w"}
+
+
+def normalize_pinyin(c: str, v_without_tone: str) -> str:
+    """pypinyin 的声母、无调韵母 -> opencpop-strict.txt 中的拼音写法"""
+    if c:
+        return c + V_REP_MAP.get(v_without_tone, v_without_tone)
+    pinyin = v_without_tone
+    if pinyin in PINYIN_REP_MAP:
+        return PINYIN_REP_MAP[pinyin]
+    if pinyin[0] in SINGLE_REP_MAP:
+        return SINGLE_REP_MAP[pinyin[0]] + pinyin[1:]
+    return pinyin
+
+
+def build_syllable_index() -> Dict[Tuple[str, str], Tuple[str, str]]:
+    """
+    (声母, 带调韵母) -> (音素声母, 带调音素韵母)，键与 pypinyin 的 INITIALS / FINALS_TONE3 输出一致。
+    启动时对所有声母、韵母、声调组合预先计算，覆盖 opencpop-strict.txt 的全部音节
+    (jue / yv 等写法与 jve / yu 对应同一音节，pypinyin 不会输出)。
+    """
+    index = {}
+    for c, v in product(INITIALS, FINALS):
+        phones = pinyin_to_symbol_map.get(normalize_pinyin(c, v))
+        if phones is None:
+            continue
+        new_c, new_v = phones.split(" ")
+        for tone in TONES:
+            index[(c, v + tone)] = (new_c, new_v + tone)
+    return index
+
+
+SYLLABLE_INDEX = build_syllable_index()
@@ -14,7 +14,7 @@
 import re
 from typing import List
 
-from .char_convert import tranditional_to_simplified
+from .char_convert import t2s_dict
 from .chronology import RE_DATE
 from .chronology import RE_DATE2
 from .chronology import RE_TIME
@@ -52,11 +52,114 @@ from .phonecode import RE_TELEPHONE
 from .phonecode import replace_mobile
 from .phonecode import replace_phone
 from .quantifier import RE_TEMPERATURE
-from .quantifier import replace_measure
+from .quantifier import measure_dict
 from .quantifier import replace_temperature
 
 
+# 繁体转简体与全角转半角的转换表。部分繁体字映射到全角数字，所以先转简体再转半角
+T2S_TABLE = str.maketrans(t2s_dict)
+F2H_TABLE = {**F2H_ASCII_LETTERS, **F2H_DIGITS, **F2H_SPACE}
+
+# 预筛用的字符类别，互不相交，合并成一个正则一次扫描
+TRIGGERS = {
+    'digit': r'\d',
+    'colon': r':',
+    'tilde': r'~',
+    'dash': r'-',
+    'slash': r'/',
+    'percent': r'%',
+    'star': r'\*',
+    'dot': r'\.',
+    'space': r' ',
+    'year': r'年',
+    'temp': r'[°℃度]',
+    'letter': r'[A-Za-z㎡]',
+    'op': r'[+×÷=]',
+    'power': r'[⁰¹²³⁴⁵⁶⁷⁸⁹ˣʸⁿ]',
+}
+RE_TRIGGER = re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern in TRIGGERS.items()))
+
+# 单位符号，数字或中文数字后的单位替换为中文
+RE_MEASURES = [
+    (re.compile(rf'((?:\d+(?:\.\d+)?|[一二三四五六七八九十百千万亿]+))\s*{re.escape(q_notation)}'), rf'\1{replacement}')
+    for q_notation, replacement in measure_dict.items()
+]
+
+POST_REPLACE_TABLE = str.maketrans({
+    '/': '每',
+    '①': '一', '②': '二', '③': '三', '④': '四', '⑤': '五',
+    '⑥': '六', '⑦': '七', '⑧': '八', '⑨': '九', '⑩': '十',
+    'α': '阿尔法', 'β': '贝塔', 'γ': '伽玛', 'Γ': '伽玛', 'δ': '德尔塔', 'Δ': '德尔塔',
+    'ε': '艾普西龙', 'ζ': '捷塔', 'η': '依塔', 'θ': '西塔', 'Θ': '西塔', 'ι': '艾欧塔',
+    'κ': '喀帕', 'λ': '拉姆达', 'Λ': '拉姆达', 'μ': '缪', 'ν': '拗', 'ξ': '克西', 'Ξ': '克西',
+    'ο': '欧米克伦', 'π': '派', 'Π': '派', 'ρ': '肉', 'ς': '西格玛', 'Σ': '西格玛', 'σ': '西格玛',
+    'τ': '套', 'υ': '宇普西龙', 'φ': '服艾', 'Φ': '服艾', 'χ': '器', 'ψ': '普赛', 'Ψ': '普赛',
+    'ω': '欧米伽', 'Ω': '欧米伽',
+    # 兜底数学运算，顺便兼容懒人用语
+    '+': '加', '-': '减', '×': '乘', '÷': '除', '=': '等',
+})
+# re filter special characters, have one more character "-" than _split
+RE_POST_FILTER = re.compile(r'[-——《》【】<=>{}()（）#&@“”^_|\\]')
+RE_SPLIT_FILTER = re.compile(r'[——《》【】<>{}()（）#&@“”^_|\\]')
+RE_NEWLINES = re.compile(r'\n+')
+
+
+def _sub(pattern, repl):
+    return lambda sentence: pattern.sub(repl, sentence)
+
+
+def _replace_measure(sentence: str) -> str:
+    for pattern, replacement in RE_MEASURES:
+        sentence = pattern.sub(replacement, sentence)
+    return sentence
+
+
+def _replace_asmd(sentence: str) -> str:
+    while RE_ASMD.search(sentence):
+        sentence = RE_ASMD.sub(replace_asmd, sentence)
+    return sentence
+
+
+# 按原顺序执行的规则：(触发条件, 规则)。触发条件中每一组类别至少出现一个时规则才可能匹配
+RULES = [
+    # number related NSW verbalization
+    ([{'digit'}, {'year'}], _sub(RE_DATE, replace_date)),
+    ([{'digit'}, {'dash', 'space', 'slash', 'dot'}], _sub(RE_DATE2, replace_date2)),
+    # range first
+    ([{'digit'}, {'colon'}], _sub(RE_TIME_RANGE, replace_time)),
+    ([{'digit'}, {'colon'}], _sub(RE_TIME, replace_time)),
+    # 处理~波浪号作为至的替换
+    ([{'digit'}, {'tilde'}], _sub(RE_TO_RANGE, replace_to_range)),
+    ([{'digit'}, {'star'}], _sub(RE_DIMENSION, replace_dimension)),
+    ([{'digit'}, {'temp'}], _sub(RE_TEMPERATURE, replace_temperature)),
+    ([{'letter'}], _replace_measure),
+    # 处理数学运算
+    ([{'op', 'dash'}], _replace_asmd),
+    ([{'power'}], _sub(RE_POWER, replace_power)),
+    ([{'digit'}, {'slash'}], _sub(RE_FRAC, replace_frac)),
+    ([{'digit'}, {'percent'}], _sub(RE_PERCENTAGE, replace_percentage)),
+    ([{'digit'}], _sub(RE_MOBILE_PHONE, replace_mobile)),
+    ([{'digit'}], _sub(RE_TELEPHONE, replace_phone)),
+    ([{'digit'}], _sub(RE_NATIONAL_UNIFORM_NUMBER, replace_phone)),
+    ([{'digit'}, {'dash', 'tilde'}], _sub(RE_RANGE, replace_range)),
+    ([{'digit'}, {'dash'}], _sub(RE_INTEGER, replace_negative_num)),
+    ([{'digit'}, {'dot'}], _sub(RE_DECIMAL_NUM, replace_number)),
+    ([{'digit'}], _sub(RE_POSITIVE_QUANTIFIERS, replace_positive_quantifier)),
+    ([{'digit'}], _sub(RE_DEFAULT_NUM, replace_default_num)),
+    ([{'digit'}], _sub(RE_NUMBER, replace_number)),
+]
+
+
+def _find_triggers(sentence: str) -> set:
+    return {match.lastgroup for match in RE_TRIGGER.finditer(sentence)}
+
+
 class TextNormalizer():
+    """
+    规则只在触发字符出现时执行：先用一个合并的正则找出句子中出现的字符类别，
+    跳过不可能匹配的规则；某条规则改写了句子后重新预筛，结果与逐条执行所有规则一致。
+    无状态，进程内共用 zh_text_normalizer。
+    """
     def __init__(self):
         self.SENTENCE_SPLITOR = re.compile(r'([：、，；。？！,;?!][”’]?)')
 
@@ -71,106 +174,35 @@ class TextNormalizer():
         if lang == "zh":
             text = text.replace(" ", "")
             # 过滤掉特殊字符
-            text = re.sub(r'[——《》【】<>{}()（）#&@“”^_|\\]', '', text)
+            text = RE_SPLIT_FILTER.sub('', text)
         text = self.SENTENCE_SPLITOR.sub(r'\1\n', text)
         text = text.strip()
-        sentences = [sentence.strip() for sentence in re.split(r'\n+', text)]
+        sentences = [sentence.strip() for sentence in RE_NEWLINES.split(text)]
         return sentences
 
     def _post_replace(self, sentence: str) -> str:
-        sentence = sentence.replace('/', '每')
-        # sentence = sentence.replace('~', '至')
-        # sentence = sentence.replace('～', '至')
-        sentence = sentence.replace('①', '一')
-        sentence = sentence.replace('②', '二')
-        sentence = sentence.replace('③', '三')
-        sentence = sentence.replace('④', '四')
-        sentence = sentence.replace('⑤', '五')
-        sentence = sentence.replace('⑥', '六')
-        sentence = sentence.replace('⑦', '七')
-        sentence = sentence.replace('⑧', '八')
-        sentence = sentence.replace('⑨', '九')
-        sentence = sentence.replace('⑩', '十')
-        sentence = sentence.replace('α', '阿尔法')
-        sentence = sentence.replace('β', '贝塔')
-        sentence = sentence.replace('γ', '伽玛').replace('Γ', '伽玛')
-        sentence = sentence.replace('δ', '德尔塔').replace('Δ', '德尔塔')
-        sentence = sentence.replace('ε', '艾普西龙')
-        sentence = sentence.replace('ζ', '捷塔')
-        sentence = sentence.replace('η', '依塔')
-        sentence = sentence.replace('θ', '西塔').replace('Θ', '西塔')
-        sentence = sentence.replace('ι', '艾欧塔')
-        sentence = sentence.replace('κ', '喀帕')
-        sentence = sentence.replace('λ', '拉姆达').replace('Λ', '拉姆达')
-        sentence = sentence.replace('μ', '缪')
-        sentence = sentence.replace('ν', '拗')
-        sentence = sentence.replace('ξ', '克西').replace('Ξ', '克西')
-        sentence = sentence.replace('ο', '欧米克伦')
-        sentence = sentence.replace('π', '派').replace('Π', '派')
-        sentence = sentence.replace('ρ', '肉')
-        sentence = sentence.replace('ς', '西格玛').replace('Σ', '西格玛').replace(
-            'σ', '西格玛')
-        sentence = sentence.replace('τ', '套')
-        sentence = sentence.replace('υ', '宇普西龙')
-        sentence = sentence.replace('φ', '服艾').replace('Φ', '服艾')
-        sentence = sentence.replace('χ', '器')
-        sentence = sentence.replace('ψ', '普赛').replace('Ψ', '普赛')
-        sentence = sentence.replace('ω', '欧米伽').replace('Ω', '欧米伽')
-        # 兜底数学运算，顺便兼容懒人用语
-        sentence = sentence.replace('+', '加')
-        sentence = sentence.replace('-', '减')
-        sentence = sentence.replace('×', '乘')
-        sentence = sentence.replace('÷', '除')
-        sentence = sentence.replace('=', '等')
-        # re filter special characters, have one more character "-" than line 68
-        sentence = re.sub(r'[-——《》【】<=>{}()（）#&@“”^_|\\]', '', sentence)
-        return sentence
+        sentence = sentence.translate(POST_REPLACE_TABLE)
+        return RE_POST_FILTER.sub('', sentence)
 
     def normalize_sentence(self, sentence: str) -> str:
         # basic character conversions
-        sentence = tranditional_to_simplified(sentence)
-        sentence = sentence.translate(F2H_ASCII_LETTERS).translate(
-            F2H_DIGITS).translate(F2H_SPACE)
-
-        # number related NSW verbalization
-        sentence = RE_DATE.sub(replace_date, sentence)
-        sentence = RE_DATE2.sub(replace_date2, sentence)
-
-        # range first
-        sentence = RE_TIME_RANGE.sub(replace_time, sentence)
-        sentence = RE_TIME.sub(replace_time, sentence)
-
-        # 处理~波浪号作为至的替换
-        sentence = RE_TO_RANGE.sub(replace_to_range, sentence)
-        sentence = RE_DIMENSION.sub(replace_dimension, sentence)
-        sentence = RE_TEMPERATURE.sub(replace_temperature, sentence)
-        sentence = replace_measure(sentence)
-
-        # 处理数学运算
-        while RE_ASMD.search(sentence):
-            sentence = RE_ASMD.sub(replace_asmd, sentence)
-        sentence = RE_POWER.sub(replace_power, sentence)
+        sentence = sentence.translate(T2S_TABLE).translate(F2H_TABLE)
 
-        sentence = RE_FRAC.sub(replace_frac, sentence)
-        sentence = RE_PERCENTAGE.sub(replace_percentage, sentence)
-        sentence = RE_MOBILE_PHONE.sub(replace_mobile, sentence)
+        triggers = _find_triggers(sentence)
+        for requires, rule in RULES:
+            if not all(group & triggers for group in requires):
+                continue
+            replaced = rule(sentence)
+            if replaced != sentence:
+                sentence = replaced
+                triggers = _find_triggers(sentence)
 
-        sentence = RE_TELEPHONE.sub(replace_phone, sentence)
-        sentence = RE_NATIONAL_UNIFORM_NUMBER.sub(replace_phone, sentence)
-
-        sentence = RE_RANGE.sub(replace_range, sentence)
-
-        sentence = RE_INTEGER.sub(replace_negative_num, sentence)
-        sentence = RE_DECIMAL_NUM.sub(replace_number, sentence)
-        sentence = RE_POSITIVE_QUANTIFIERS.sub(replace_positive_quantifier,
-                                               sentence)
-        sentence = RE_DEFAULT_NUM.sub(replace_default_num, sentence)
-        sentence = RE_NUMBER.sub(replace_number, sentence)
-        sentence = self._post_replace(sentence)
-
-        return sentence
+        return self._post_replace(sentence)
 
     def normalize(self, text: str) -> List[str]:
         sentences = self._split(text)
         sentences = [self.normalize_sentence(sent) for sent in sentences]
         return sentences
+
+
+zh_text_normalizer = TextNormalizer()
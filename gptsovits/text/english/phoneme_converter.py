@@ -1,32 +1,63 @@
 import os, re
+import logging
+import threading
 from wordsegment import load as wordsegment_load, segment as word_segment
 from nltk.tokenize import TweetTokenizer
-from nltk import pos_tag
+from nltk.tag.perceptron import PerceptronTagger
 from g2p_en import G2p
 from gptsovits.text.symbols import get_symbols
 from gptsovits.text.phoneme_converter import PhonemeConverter
+from gptsovits.utils.lru_cache import LRUCache
 from gptsovits.utils.pickle_utils import load_pickle, save_pickle
+from tools.path import relative_base_path
+
+logger = logging.getLogger(__name__)
+
+# OOV 单词 (分词 + g2p_en 神经网络预测) 的发音缓存条目数
+G2P_OOV_CACHE_SIZE = int(os.getenv('G2P_OOV_CACHE_SIZE', '65536'))
+# OOV 发音追加写入的热词表，格式同 engdict-hot.rep；默认放在运行时数据目录 (USER_DATA_PATH)，
+# 包目录在打包后可能只读，设为空字符串时不落盘
+G2P_OOV_DICT_PATH = os.getenv('G2P_OOV_DICT_PATH', relative_base_path(os.path.join('g2p', 'engdict-oov.rep')))
 
 class EnglishPhonemeConverter(PhonemeConverter):
     def __init__(self):
         self.base_path = os.path.dirname(os.path.abspath(__file__))
         self.g2p_model = G2p()
         wordsegment_load()
+        # nltk.pos_tag 每次调用都会重新加载 perceptron 模型，这里只加载一次
+        self.tokenizer = TweetTokenizer()
+        self.tagger = PerceptronTagger()
+        self.symbols = set(get_symbols())
         self.cmu = self._load_cmu_dict()
         self.namedict = self._load_namedict()
         self._remove_invalid_entries()
         self._add_homograph_corrections()
+        self.oov_cache = LRUCache(max_size=G2P_OOV_CACHE_SIZE)
+        self.oov_dict_lock = threading.Lock()
+        self.oov_dict_words = set()
+        self._load_oov_dict()
 
     def convert_to_phonemes(self, text: str):
-        words = TweetTokenizer().tokenize(text)
-        tokens = pos_tag(words)
-        prons = []
-        for o_word, pos in tokens:
-            prons.extend(self._get_pronunciation(o_word, pos))
-            prons.extend([" "])
-        prons = prons[:-1]
-        phonemes = self._process_phonemes(prons, get_symbols())
-        return phonemes, []
+        return self.convert_to_phonemes_batch([text])[0]
+
+    def convert_to_phonemes_batch(self, texts: list[str]):
+        """一个请求的所有英文片段一起做词性标注"""
+        tagged_texts = self.tagger.tag_sents([self.tokenizer.tokenize(text) for text in texts])
+        results = []
+        for tokens in tagged_texts:
+            prons = []
+            for o_word, pos in tokens:
+                prons.extend(self._get_pronunciation(o_word, pos))
+                prons.extend([" "])
+            prons = prons[:-1]
+            phonemes = self._process_phonemes(prons, self.symbols)
+            results.append((phonemes, []))
+        return results
+
+    def cache_stats(self):
+        stats = self.oov_cache.stats()
+        stats['disk_size'] = len(self.oov_dict_words)
+        return stats
 
     def _load_cmu_dict(self):
         cmu_dict = {}
@@ -57,6 +88,35 @@ class EnglishPhonemeConverter(PhonemeConverter):
                 cmu_dict[word.lower()] = [phonemes.split()]
         return cmu_dict
 
+    def _load_oov_dict(self):
+        """启动时把热词表中最近写入的 OOV 发音放入内存缓存，同一单词以后写入的为准"""
+        if not G2P_OOV_DICT_PATH or not os.path.exists(G2P_OOV_DICT_PATH):
+            return
+        oov_dict = {}
+        with open(G2P_OOV_DICT_PATH, encoding='utf-8') as f:
+            for line in f:
+                word, _, phonemes = line.strip().partition(" ")
+                # 跳过进程异常退出时写了一半的行
+                if phonemes:
+                    oov_dict[word.lower()] = tuple(phonemes.split())
+        self.oov_dict_words.update(oov_dict)
+        for word, phones in list(oov_dict.items())[-G2P_OOV_CACHE_SIZE:]:
+            self.oov_cache.put(word, phones)
+
+    def _save_oov_word(self, word, phones):
+        if not G2P_OOV_DICT_PATH or not phones or word in self.oov_dict_words:
+            return
+        with self.oov_dict_lock:
+            if word in self.oov_dict_words:
+                return
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(G2P_OOV_DICT_PATH)), exist_ok=True)
+                with open(G2P_OOV_DICT_PATH, 'a', encoding='utf-8') as f:
+                    f.write(f"{word.upper()} {' '.join(phones)}\n")
+            except OSError as e:
+                logger.warning("OOV 热词表写入失败，只保留内存缓存: %s", e)
+            self.oov_dict_words.add(word)
+
     def _load_namedict(self):
         name_dict_path = os.path.join(self.base_path, 'namedict_cache.pickle')
         return load_pickle(name_dict_path, default={})
@@ -107,12 +167,21 @@ class EnglishPhonemeConverter(PhonemeConverter):
                     phones.extend(self.cmu[w][0])
             return phones
 
+        # 以下结果只取决于小写的 word，缓存并追加写入热词表
+        phones = self.oov_cache.get(word)
+        if phones is None:
+            phones = tuple(self._qry_oov_word(word))
+            self.oov_cache.put(word, phones)
+            self._save_oov_word(word, phones)
+        return list(phones)
+
+    def _qry_oov_word(self, word):
         # 尝试分离所有格
         if re.match(r"^([a-z]+)('s)$", word):
             return self._handle_possessive(word)
 
         # 尝试进行分词，应对复合词
-        comps = word_segment(word.lower())
+        comps = word_segment(word)
 
         # 无法分词的送回去预测
         if len(comps)==1:
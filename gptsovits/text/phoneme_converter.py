@@ -1,20 +1,24 @@
 from abc import ABC, abstractmethod
-from typing import Tuple
+from typing import List, Tuple
 
 from torch import Tensor
 import torch
+from gptsovits.utils.precision import Precision
 
 class PhonemeConverter(ABC):
     dtype = torch.float32
     device = 'cuda'
+    # BERT 的推理精度，由 TextService 设置
+    precision: Precision = None
 
     @staticmethod
     def set_device(device: str):
         PhonemeConverter.device = device
 
     @staticmethod
-    def set_dtype(dtype: torch.dtype):
-        PhonemeConverter.dtype = dtype
+    def set_precision(precision: Precision):
+        PhonemeConverter.precision = precision
+        PhonemeConverter.dtype = precision.dtype
 
     def __init__(self):
         self.device = PhonemeConverter.device
@@ -24,6 +28,18 @@ class PhonemeConverter(ABC):
     def convert_to_phonemes(self, text: str) -> Tuple[list[str], list[int]]:
         pass
 
+    def convert_to_phonemes_batch(self, texts: List[str]) -> List[Tuple[list[str], list[int]]]:
+        """默认逐条转换，子类可以把一批文本合并处理"""
+        return [self.convert_to_phonemes(text) for text in texts]
+
+    def cache_stats(self):
+        """g2p 缓存统计，没有缓存时返回 None"""
+        return None
+
+    def get_bert_features_batch(self, items: List[Tuple[str, list[str], list[int]]]) -> List[Tensor]:
+        """items 为 (text, phonemes, phoneme_lengths) 列表，默认逐条计算"""
+        return [self.get_bert_features(text, phonemes, phoneme_lengths) for text, phonemes, phoneme_lengths in items]
+
     def get_bert_features(self, text: str, phonemes: list[str], phoneme_lengths: list[int]) -> Tensor:
         return torch.zeros(
             (1024, len(phonemes)),
@@ -1,4 +1,4 @@
-from typing import Tuple
+from typing import List, Tuple
 import torch
 import logging
 
@@ -33,13 +33,29 @@ class LanguageProcessor:
             raise ValueError(f"Unsupported language: {language}")
 
     def process(self, text: str) -> Tuple[str, list[str], torch.Tensor]:
-        normalized_text = self.text_normalizer.normalize_text(text)
-        logger.debug('normalized_text: %s', normalized_text)
-        phonemes, phoneme_lengths = self.phoneme_converter.convert_to_phonemes(normalized_text)
-        bert_features = self.phoneme_converter.get_bert_features(normalized_text, phonemes, phoneme_lengths)
+        return self.process_batch([text])[0]
+
+    def process_batch(self, texts: List[str]) -> List[Tuple[str, list[str], torch.Tensor]]:
+        # 先整批做 g2p，再把所有片段的 BERT 特征一起批量计算
+        prepared = self.prepare_batch(texts)
+        bert_features_list = self.phoneme_converter.get_bert_features_batch(prepared)
         symbols_dict = get_symbols_dict()
-        phonemes = [symbols_dict[phoneme] for phoneme in phonemes]
-        return normalized_text, phonemes, bert_features
+        return [
+            (normalized_text, [symbols_dict[phoneme] for phoneme in phonemes], bert_features)
+            for (normalized_text, phonemes, _), bert_features in zip(prepared, bert_features_list)
+        ]
+
+    def prepare(self, text: str) -> Tuple[str, list[str], list[int]]:
+        return self.prepare_batch([text])[0]
+
+    def prepare_batch(self, texts: List[str]) -> List[Tuple[str, list[str], list[int]]]:
+        normalized_texts = [self.text_normalizer.normalize_text(text) for text in texts]
+        logger.debug('normalized_texts: %s', normalized_texts)
+        converted = self.phoneme_converter.convert_to_phonemes_batch(normalized_texts)
+        return [
+            (normalized_text, phonemes, phoneme_lengths)
+            for normalized_text, (phonemes, phoneme_lengths) in zip(normalized_texts, converted)
+        ]
     
     def phonemes_to_seq(self, phonemes: list[str]) -> list[int]:
         rep_map = {"'": "-"}
@@ -62,3 +78,13 @@ class LanguageProcessorFactory:
         if language not in LanguageProcessorFactory._processor_cache:
             LanguageProcessorFactory._processor_cache[language] = LanguageProcessor(language)
         return LanguageProcessorFactory._processor_cache[language]
+
+    @staticmethod
+    def cache_stats():
+        """已创建的各语言 phoneme converter 的 g2p 缓存统计"""
+        stats = {}
+        for language, processor in LanguageProcessorFactory._processor_cache.items():
+            converter_stats = processor.phoneme_converter.cache_stats()
+            if converter_stats is not None:
+                stats[language] = converter_stats
+        return stats
@@ -1,49 +1,108 @@
 from typing import List
 import logging
+import os
 import re
 import torch
 from .text_processor import LanguageProcessorFactory
 from .phoneme_converter import PhonemeConverter
+from .chinese.zh_normalization.text_normlization import zh_text_normalizer
+from gptsovits.utils.precision import Precision, get_precision
+from gptsovits.utils.lru_cache import LRUCache
+from tools.path import relative_base_path
 import LangSegment
 
 logger = logging.getLogger(__name__)
 
+# 句子级文本前端缓存：条目数上限，以及可选的磁盘目录
+TEXT_CACHE_SIZE = int(os.getenv('TEXT_CACHE_SIZE', '1024'))
+TEXT_CACHE_DIR = os.getenv('TEXT_CACHE_DIR')
+
+RE_CHINESE = re.compile(r'[\u4e00-\u9fff]')
+
 class TextService:
-  def __init__(self, device='cuda', dtype=torch.float32):
+  def __init__(self, device='cuda', precision: Precision = None):
     self.device = device
-    self.dtype = dtype
+    self.precision = precision or get_precision('bert', device)
+    self.dtype = self.precision.dtype
 
     PhonemeConverter.set_device(device)
-    PhonemeConverter.set_dtype(dtype)
+    PhonemeConverter.set_precision(self.precision)
 
     LangSegment.setfilters(["zh","ja","en","ko"])
 
+    # (句子, language) -> (normalized_text, phoneme ids, bert_features)
+    # bert_features 存放在 CPU 上，命中时再拷贝到 device，缓存不占用模型池统计之外的显存
+    self.cache = LRUCache(
+      max_size=TEXT_CACHE_SIZE,
+      cache_dir=relative_base_path(TEXT_CACHE_DIR) if TEXT_CACHE_DIR else None,
+      device='cpu',
+    )
+
   def process_text(self, text: str, language = None):
+    return self.process_text_batch([text], language)[0]
+  
+  def process_text_batch(self, texts: List[str], language = None):
+    results = [self._to_device(self.cache.get((text, language))) for text in texts]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+      # 同一批次内重复的句子只处理一次
+      unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+      outputs = dict(zip(unique_texts, self._process_text_batch(unique_texts)))
+      for text, (normalized_text, phonemes, bert_features) in outputs.items():
+        self.cache.put((text, language), (normalized_text, phonemes, bert_features.cpu()))
+      for i in missing:
+        results[i] = outputs[texts[i]]
+    return results
+
+  def _to_device(self, result):
+    if result is None:
+      return None
+    normalized_text, phonemes, bert_features = result
+    return normalized_text, phonemes, bert_features.to(self.device, non_blocking=True)
+
+  def cache_stats(self):
+    return self.cache.stats()
+
+  def g2p_cache_stats(self):
+    return LanguageProcessorFactory.cache_stats()
+
+  def _process_text_batch(self, texts: List[str]):
+    segments_list = [self._segment_text(text) for text in texts]
+
+    # 所有句子的同语言片段一起处理，BERT 按批次前向
+    items_by_lang = {}
+    for i, segments in enumerate(segments_list):
+      for j, segment in enumerate(segments):
+        items_by_lang.setdefault(segment['lang'], []).append((i, j, segment['text']))
+
+    results_list = [[None] * len(segments) for segments in segments_list]
+    for lang, items in items_by_lang.items():
+      processor = LanguageProcessorFactory.get_processor(lang)
+      outputs = processor.process_batch([item[2] for item in items])
+      for (i, j, _), output in zip(items, outputs):
+        results_list[i][j] = output
+
+    return [self._merge_results(results) for results in results_list]
+
+  def _segment_text(self, text: str):
     # preprocess number in chinese text
-    if re.search(r'[\u4e00-\u9fff]', text):
-      from .chinese.zh_normalization.text_normlization import TextNormalizer
-      text = TextNormalizer().normalize_sentence(text)
+    if RE_CHINESE.search(text):
+      text = zh_text_normalizer.normalize_sentence(text)
 
     segments = []
     for item in LangSegment.getTexts(text):
       segments.append(item)
 
     logger.debug(segments)
+    return segments
 
-    results = []
-    for segment in segments:
-       processor = LanguageProcessorFactory.get_processor(segment['lang'])
-       results.append(processor.process(segment['text']))
-
+  def _merge_results(self, results):
     normalized_text = ''.join([result[0] for result in results])
     phonemes = sum([result[1] for result in results], [])
     bert_features = torch.cat([result[2] for result in results], dim=1)
        
     return normalized_text, phonemes, bert_features
   
-  def process_text_batch(self, texts: List[str], language = None):
-    return [self.process_text(text, language) for text in texts]
-  
   def split_paragraph(self, text, threshold=5, group_size=4):
     splits = {"，", "。", "？", "！", ",", ".", "?", "!", "~", ":", "：", "—", "…"}
     punctuation = set(['!', '?', '…', ',', '.', '-', " "])
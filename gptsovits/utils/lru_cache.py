@@ -0,0 +1,90 @@
+from collections import OrderedDict
+import hashlib
+import threading
+import logging
+import os
+import torch
+
+logger = logging.getLogger(__name__)
+
+class LRUCache:
+    """
+    线程安全的 LRU 缓存，超过 max_size 时淘汰最久未使用的条目。
+    指定 cache_dir 时同时用 torch.save 持久化到磁盘，内存未命中时从磁盘读取。
+    """
+    def __init__(self, max_size: int = 128, cache_dir: str = None, device=None):
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self.device = device
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return self.cache[key]
+        value = self._load(key)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._set(key, value)
+        return value
+
+    def put(self, key, value):
+        self._save(key, value)
+        with self.lock:
+            self._set(key, value)
+
+    def get_or_create(self, key, create_fn):
+        value = self.get(key)
+        if value is None:
+            value = create_fn()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, predicate=None):
+        """删除内存中满足 predicate(key) 的条目，不指定时清空"""
+        with self.lock:
+            for key in [key for key in self.cache if predicate is None or predicate(key)]:
+                del self.cache[key]
+
+    def stats(self):
+        with self.lock:
+            return {'size': len(self.cache), 'max_size': self.max_size, 'hits': self.hits, 'misses': self.misses}
+
+    def _set(self, key, value):
+        self.cache[key] = value
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+
+    def _path(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f'{digest}.pt')
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return torch.load(path, map_location=self.device)
+        except Exception as e:
+            logger.warning('failed to load cache %s: %s', path, e)
+            return None
+
+    def _save(self, key, value):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        torch.save(value, tmp_path)
+        os.replace(tmp_path, path)
@@ -0,0 +1,116 @@
+import contextlib
+import logging
+import os
+from typing import Tuple, Type
+import torch
+from torch import nn
+from gptsovits.utils.quantization import quantize_linears
+
+logger = logging.getLogger(__name__)
+
+# 推理精度 fp32 / bf16 / fp16 / int8，PRECISION 为所有组件的默认值，PRECISION_<组件> 单独覆盖
+# 留空时 CUDA 上为 fp16，CPU 上为 fp32
+PRECISION = os.getenv('PRECISION', '')
+COMPONENT_PRECISIONS = {
+    component: os.getenv(f'PRECISION_{component.upper()}', '')
+    for component in ['t2s', 'sovits', 'bert', 'hubert']
+}
+
+DTYPES = {
+    'fp32': torch.float32,
+    'bf16': torch.bfloat16,
+    'fp16': torch.float16,
+    # 动态量化只量化线性层权重，其余部分仍为 float32
+    'int8': torch.float32,
+}
+
+# 以线性层为主、适合动态 int8 量化的组件；SoVITS 以卷积为主不支持
+INT8_COMPONENTS = {'t2s', 'bert', 'hubert'}
+
+NORM_TYPES = (nn.LayerNorm, nn.GroupNorm)
+
+
+class Precision:
+    """
+    单个组件 (t2s / sovits / bert / hubert) 的推理精度。
+    cast 把模块转换到该精度，autocast 返回推理时使用的 autocast 区域。
+    """
+    def __init__(self, name: str, device: torch.device, component: str):
+        self.component = component
+        self.device = torch.device(device)
+        self.name = self._resolve((name or '').lower())
+        self.dtype = DTYPES[self.name]
+
+    def _resolve(self, name: str) -> str:
+        default = 'fp16' if self.device.type == 'cuda' else 'fp32'
+        if not name:
+            return default
+        if name not in DTYPES:
+            raise ValueError(f'unknown precision {name} for {self.component}, expected one of {list(DTYPES)}')
+        if name == 'int8' and (self.device.type != 'cpu' or self.component not in INT8_COMPONENTS):
+            logger.warning('int8 is not supported for %s on %s, using %s', self.component, self.device.type, default)
+            return default
+        if name == 'fp16' and self.device.type == 'cpu':
+            logger.warning('fp16 is not supported for %s on cpu, using fp32', self.component)
+            return 'fp32'
+        if name == 'bf16' and self.device.type == 'cuda' and not torch.cuda.is_bf16_supported():
+            logger.warning('bf16 is not supported for %s on this GPU, using fp16', self.component)
+            return 'fp16'
+        return name
+
+    @property
+    def is_half(self) -> bool:
+        return self.dtype != torch.float32
+
+    @property
+    def quantized(self) -> bool:
+        return self.name == 'int8'
+
+    def cast(self, module: nn.Module, norm_types: Tuple[Type[nn.Module], ...] = NORM_TYPES) -> nn.Module:
+        """
+        把 module 移到 device 并转换到推理精度。
+        fp16 / bf16 时 norm_types 中的归一化层保持 float32，输入先转成 float32 计算再转回；
+        int8 时对线性层做动态量化。
+        """
+        module = module.to(self.device)
+        if self.quantized:
+            return quantize_linears(module)
+        if not self.is_half:
+            return module
+        for submodule in module.modules():
+            if isinstance(submodule, norm_types):
+                submodule.float()
+                submodule.register_forward_pre_hook(_float_inputs)
+                submodule.register_forward_hook(self._cast_output)
+                continue
+            for param in submodule.parameters(recurse=False):
+                if param.is_floating_point():
+                    param.data = param.data.to(self.dtype)
+            for name, buffer in submodule.named_buffers(recurse=False):
+                if buffer.is_floating_point():
+                    submodule._buffers[name] = buffer.to(self.dtype)
+        return module
+
+    def autocast(self):
+        """
+        fp16 / bf16 时的 autocast 区域。CUDA 上 softmax / layer_norm 等由 autocast 自动提升到 float32；
+        CPU 上归一化层由 cast 保持 float32，bf16 的 softmax 内核本身按 float32 累加。
+        """
+        if not self.is_half:
+            return contextlib.nullcontext()
+        return torch.autocast(self.device.type, dtype=self.dtype)
+
+    def _cast_output(self, module, inputs, output):
+        return output.to(self.dtype)
+
+    def __repr__(self):
+        return f'Precision({self.component}={self.name})'
+
+
+def _float_inputs(module, inputs):
+    return tuple(x.float() if torch.is_tensor(x) and x.is_floating_point() else x for x in inputs)
+
+
+def get_precision(component: str, device, override: str = None) -> Precision:
+    """override (如 gptsovits.yaml 中的配置) 优先，其次 PRECISION_<组件>，最后 PRECISION"""
+    return Precision(override or COMPONENT_PRECISIONS[component] or PRECISION, device, component)
@@ -0,0 +1,26 @@
+from typing import Optional
+import torch
+from torch import nn
+
+
+def quantize_linear(weight: torch.Tensor, bias: Optional[torch.Tensor]) -> nn.Module:
+    """用 float 权重构造动态 int8 量化的 Linear，激活在运行时按 batch 量化"""
+    linear = nn.Linear(weight.shape[1], weight.shape[0], bias=bias is not None)
+    linear.weight = nn.Parameter(weight.detach().float().cpu(), requires_grad=False)
+    if bias is not None:
+        linear.bias = nn.Parameter(bias.detach().float().cpu(), requires_grad=False)
+    return quantize_linears(nn.Sequential(linear))[0]
+
+
+def quantize_linears(module: nn.Module) -> nn.Module:
+    """把 module 中所有 nn.Linear 原地替换为动态 int8 量化版本，只支持 CPU"""
+    return torch.ao.quantization.quantize_dynamic(module.float().cpu(), {nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def packed_linear_bytes(linear: nn.Module) -> int:
+    """动态量化 Linear 打包后的权重与 bias 字节数，这部分不在 parameters() / buffers() 中"""
+    weight, bias = linear._weight_bias()
+    total = weight.numel() * weight.element_size()
+    if bias is not None:
+        total += bias.numel() * bias.element_size()
+    return total
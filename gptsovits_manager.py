@@ -1,5 +1,9 @@
 import torch
 from gptsovits.index import GPTSovits
+from gptsovits.frontend import GPTSovitsFrontend
+from gptsovits.base_model import BaseModel
+from gptsovits.utils.precision import get_precision
+from gptsovits.reference_cache import reference_cache
 import os
 import requests
 from tqdm import tqdm
@@ -8,25 +12,141 @@ from tools.path import pretrained_models_base_path
 from services.mongo import get_collection
 from services.oss import cache_file
 import shutil
+import threading
+import gc
+import logging
+from collections import OrderedDict
 from bson.objectid import ObjectId
+
+logger = logging.getLogger(__name__)
+
 VOICE_BASE_DIR = pretrained_models_base_path('voices')
 
+# 模型池内存预算 (MB)，未设置时取物理内存的一半
+MODEL_POOL_MEMORY_MB = os.getenv('MODEL_POOL_MEMORY_MB')
+# 底模目录 (gpt.pth / sovits.pth)，设置后各音色只保存与底模不同的权重
+BASE_MODEL_DIR = os.getenv('BASE_MODEL_DIR')
+# 常驻不淘汰的音色 id，逗号分隔
+PINNED_VOICES = [id for id in os.getenv('PINNED_VOICES', '').split(',') if id]
+
+def _default_memory_budget():
+    if MODEL_POOL_MEMORY_MB:
+        return int(MODEL_POOL_MEMORY_MB) * 1024 * 1024
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // 2
+    except (AttributeError, ValueError, OSError):
+        return None
+
 class GPTSovitsManager:
-    def __init__(self, memory_threshold=0.9):
-        self.cached_gptsovits = {}
+    def __init__(self, memory_threshold=0.9, memory_budget=None, pinned_ids=None):
+        self.cached_gptsovits = OrderedDict()
+        self.memory_sizes = {}
         self.memory_threshold = memory_threshold
+        self.memory_budget = memory_budget if memory_budget is not None else _default_memory_budget()
+        self.pinned_ids = set(pinned_ids if pinned_ids is not None else PINNED_VOICES)
+        # self.lock 只保护缓存字典与淘汰，下载和加载在锁外进行
+        self.lock = threading.RLock()
+        # 正在加载的音色 id -> Future，同一音色的并发请求等待同一次加载
+        self.loading = {}
+        self.shared_models_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.frontend = None
+        self.base_model = None
   
     def get(self, id: str, auto_download=True):
-        if id in self.cached_gptsovits:
-            return self.cached_gptsovits[id]
-        else:
-            if auto_download:
-                self.download_model(id)
-            self._check_and_free_memory()
-            gptsovits = GPTSovits(id)
-            gptsovits.load()
+        with self.lock:
+            if id in self.cached_gptsovits:
+                # LRU：命中时移到末尾
+                self.cached_gptsovits.move_to_end(id)
+                self.hits += 1
+                return self.cached_gptsovits[id]
+            future = self.loading.get(id)
+            if future is None:
+                self.misses += 1
+                future = self.loading[id] = concurrent.futures.Future()
+                is_loader = True
+            else:
+                is_loader = False
+        if not is_loader:
+            return future.result()
+
+        try:
+            gptsovits = self._load(id, auto_download)
+        except BaseException as e:
+            with self.lock:
+                self.loading.pop(id, None)
+            future.set_exception(e)
+            raise
+        with self.lock:
             self.cached_gptsovits[id] = gptsovits
-            return gptsovits
+            self.memory_sizes[id] = gptsovits.memory_size()
+            self.loading.pop(id, None)
+            self._evict_until_under_budget(protected_id=id)
+        future.set_result(gptsovits)
+        return gptsovits
+
+    def _load(self, id: str, auto_download=True):
+        """下载并加载音色，不持有 self.lock，其他音色的请求不受影响"""
+        if auto_download:
+            self.download_model(id)
+        with self.lock:
+            self._check_and_free_memory()
+        gptsovits = GPTSovits(id, frontend=self.get_frontend(), base_model=self.get_base_model())
+        gptsovits.load()
+        if not gptsovits.preset_bundle_is_current():
+            # 下载或 preset、权重、精度变化后执行一次，之后加载直接读取预计算的参考特征
+            gptsovits.precompile_presets()
+        return gptsovits
+
+    def get_frontend(self):
+        """所有音色共享同一个 frontend，BERT 与 CNHubert 只加载一次"""
+        with self.shared_models_lock:
+            if self.frontend is None:
+                self.frontend = GPTSovitsFrontend()
+            return self.frontend
+
+    def get_base_model(self):
+        if not BASE_MODEL_DIR:
+            return None
+        with self.shared_models_lock:
+            if self.base_model is None:
+                device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+                self.base_model = BaseModel(
+                    pretrained_models_base_path(BASE_MODEL_DIR), device,
+                    gpt_dtype=get_precision('t2s', device).dtype,
+                    sovits_dtype=get_precision('sovits', device).dtype,
+                )
+            return self.base_model
+
+    def pin(self, id: str):
+        with self.lock:
+            self.pinned_ids.add(id)
+
+    def unpin(self, id: str):
+        with self.lock:
+            self.pinned_ids.discard(id)
+            self._evict_until_under_budget()
+
+    def used_memory(self):
+        return sum(self.memory_sizes.values())
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'loaded': list(self.cached_gptsovits.keys()),
+                'loading': list(self.loading.keys()),
+                'pinned': sorted(self.pinned_ids),
+                'used_memory': self.used_memory(),
+                'memory_budget': self.memory_budget,
+                'reference_cache': reference_cache.stats(),
+                'text_cache': self.frontend.text_service.cache_stats() if self.frontend else None,
+                'g2p_cache': self.frontend.text_service.g2p_cache_stats() if self.frontend else None,
+            }
     
     def get_download_state(self, ids):
         result = {}
@@ -118,16 +238,39 @@ class GPTSovitsManager:
             with open(prompt_file, 'w') as f:
                 f.write(voice_segment['ref_text'])
     
-    def _check_and_free_memory(self):
+    def _check_and_free_memory(self, protected_id=None):
         if torch.cuda.is_available():
-            current_memory = torch.cuda.memory_allocated() / torch.cuda.get_device_properties(0).total_memory
-            if current_memory > self.memory_threshold:
-                self._free_memory()
+            while self._is_cuda_memory_over_threshold() and self._free_memory(protected_id):
+                pass
+
+    def _is_cuda_memory_over_threshold(self):
+        current_memory = torch.cuda.memory_allocated() / torch.cuda.get_device_properties(0).total_memory
+        return current_memory > self.memory_threshold
+
+    def _evict_until_under_budget(self, protected_id=None):
+        while self.memory_budget is not None and self.used_memory() > self.memory_budget:
+            if not self._free_memory(protected_id):
+                logger.warning('model pool over budget (%d > %d bytes) but nothing can be evicted', self.used_memory(), self.memory_budget)
+                break
+        self._check_and_free_memory(protected_id)
     
-    def _free_memory(self):
-        if self.cached_gptsovits:
-            oldest_id = next(iter(self.cached_gptsovits))
-            del self.cached_gptsovits[oldest_id]
+    def _free_memory(self, protected_id=None):
+        """淘汰最久未使用且未固定的音色，返回是否淘汰成功"""
+        for id in self.cached_gptsovits:
+            if id in self.pinned_ids or id == protected_id:
+                continue
+            gptsovits = self.cached_gptsovits.pop(id)
+            self.memory_sizes.pop(id, None)
+            gptsovits.model.disable_batching()
+            gptsovits.model.disable_compiled_decode()
+            self.evictions += 1
+            logger.info('evicted voice %s from model pool', id)
+            del gptsovits
+            gc.collect()
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            return True
+        return False
 
 if __name__ == '__main__':
     manager = GPTSovitsManager()
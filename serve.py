@@ -1,14 +1,16 @@
 import os, io
-from flask import Flask, send_from_directory, request, Response
-from flask_socketio import SocketIO
+from flask import Flask, send_from_directory, request, Response, stream_with_context
+from flask_socketio import SocketIO, emit
 from tools.model_file_service import ModelFileService
 from flask_cors import CORS
 import soundfile as sf
+import numpy as np
 import logging
 import uuid
 import shutil
 from tools.path import relative_base_path, pretrained_models_base_path, abs_path
-from tools.media import speed_wav_file, merge_wav_files, pack_wav_files
+from tools.media import speed_wav_file, merge_wav_files, pack_wav_files, wav_stream_header, encode_opus_stream
+from tools.result_cache import ResultCache
 from gptsovits_manager import GPTSovitsManager
 
 IS_DEBUG = os.getenv('IS_DEBUG', 'false').lower() == 'true'
@@ -35,10 +37,25 @@ if os.path.exists(pretrained_models_base_path(TMP_PATH)):
 else:
     os.makedirs(TMP_ROOT_DIR, exist_ok=True)
 
+# 整句结果缓存，设置 RESULT_CACHE_DIR 后启用
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR')
+result_cache = ResultCache(
+    relative_base_path(RESULT_CACHE_DIR),
+    max_bytes=int(os.getenv('RESULT_CACHE_MB', '1024')) * 1024 * 1024,
+    ttl=float(os.getenv('RESULT_CACHE_TTL', str(7 * 24 * 3600))),
+) if RESULT_CACHE_DIR else None
+
 @app.route('/static/tmp/<name>', methods=['GET'])
 def serve_tmp_static(name):
     return send_from_directory(os.path.abspath(TMP_ROOT_DIR), name)
 
+@app.route('/pool/stats', methods=['GET'])
+def pool_stats():
+    stats = mgr.stats()
+    if result_cache:
+        stats['result_cache'] = result_cache.stats()
+    return stats
+
 @app.route('/tts', methods=['POST'])
 def tts():
     try:
@@ -48,29 +65,82 @@ def tts():
         ref_id = data.get('ref_id', None)
         extra_ref_ids = data.get('extra_ref_ids', [])
         is_upload = data.get('is_upload', False)
+        stream = data.get('stream', False)
+        seed = data.get('seed')
         gptsovits = mgr.get(model_id, auto_download=True)
         if not ref_id:
             ref_id = gptsovits.get_random_ref_id()
-        audio = gptsovits.inference(text, ref_id=ref_id, extra_ref_ids=extra_ref_ids)   
 
-        wav_io = io.BytesIO()
-        sf.write(wav_io, audio, 32000, format='wav')
+        if stream:
+            return stream_tts(gptsovits, text, ref_id, extra_ref_ids, data.get('stream_format', 'wav'), data.get('stream_chunk_size'), seed)
+
+        cache_key = None
+        if result_cache and data.get('cache', True):
+            cache_key = ResultCache.make_key(
+                text=text,
+                model_id=model_id,
+                ref_id=ref_id,
+                extra_ref_ids=list(extra_ref_ids),
+                top_k=gptsovits.model.top_k,
+                top_p=gptsovits.model.top_p,
+                temperature=gptsovits.model.temperature,
+                seed=seed,
+                checkpoint=gptsovits.checkpoint_signature,
+                precision=gptsovits.precision_signature(),
+            )
+            wav_bytes = result_cache.get(cache_key)
+        else:
+            wav_bytes = None
+
+        if wav_bytes is None:
+            audio = gptsovits.inference(text, ref_id=ref_id, extra_ref_ids=extra_ref_ids, seed=seed)
+            wav_io = io.BytesIO()
+            sf.write(wav_io, audio, 32000, format='wav')
+            wav_bytes = wav_io.getvalue()
+            if cache_key:
+                result_cache.put(cache_key, wav_bytes)
 
         if is_upload:
             from tools.file_service import FileService
             file_service = FileService.get_instance()
-            object_name = file_service.upload_tmp_file(wav_io, ext='wav')
+            # 上传的临时文件可能已被清理，命中缓存时同样重新上传
+            object_name = file_service.upload_tmp_file(io.BytesIO(wav_bytes), ext='wav')
             return {
                 'object_name': object_name,
                 'model_id': model_id,
                 'ref_id': ref_id
             }
         else:
-            return Response(wav_io.getvalue(), content_type='audio/wav')
+            return Response(wav_bytes, content_type='audio/wav')
     except Exception as e:
         logger.error(e, exc_info=True)
         return Response(status=500, response=str(e))
 
+def stream_tts(gptsovits, text, ref_id, extra_ref_ids, stream_format='wav', chunk_size=None, seed=None):
+    # 每句合成完毕立即输出，首包延迟只取决于第一句；指定 chunk_size 时句内也分块输出
+    pcm_chunks = (chunk.tobytes() for chunk in gptsovits.inference_stream(text, ref_id=ref_id, extra_ref_ids=extra_ref_ids, chunk_size=chunk_size, seed=seed))
+
+    if stream_format == 'opus':
+        body = encode_opus_stream(pcm_chunks, 32000)
+        content_type = 'audio/ogg'
+    else:
+        def wav_chunks():
+            yield wav_stream_header(32000)
+            yield from pcm_chunks
+        body = wav_chunks()
+        content_type = 'audio/wav'
+
+    def generate():
+        try:
+            yield from body
+        except Exception as e:
+            # 响应头已经发出，无法再返回 500；重新抛出让服务器中断连接、不发送结束 chunk，
+            # 客户端会收到不完整的响应而不是被截断但看似成功的音频
+            logger.error('stream aborted: %s', e, exc_info=True)
+            raise
+
+    return Response(stream_with_context(generate()), content_type=content_type, headers={'X-Ref-Id': ref_id})
+
 @socketio.on('tts')
 def text_to_speech(data):
     if not data or 'text' not in data or 'model_id' not in data or 'ref_audio_id' not in data:
@@ -79,9 +149,21 @@ def text_to_speech(data):
     text = data['text']
     model_id = data['model_id']
     ref_audio_id = data.get('ref_audio_id')
+    stream = data.get('stream', False)
+    seed = data.get('seed')
     try:
         gptsovits = mgr.get(model_id)
-        audio = gptsovits.inference(text, ref_id=ref_audio_id)
+        if stream:
+            # 逐句推送 tts_chunk 事件：首个 chunk 为 WAV 头，之后为 16bit PCM
+            stream_id = data.get('stream_id', str(uuid.uuid4()))
+            emit('tts_chunk', {'stream_id': stream_id, 'index': 0, 'audio': wav_stream_header(32000)})
+            chunks = []
+            for chunk in gptsovits.inference_stream(text, ref_id=ref_audio_id, seed=seed):
+                chunks.append(chunk)
+                emit('tts_chunk', {'stream_id': stream_id, 'index': len(chunks), 'audio': chunk.tobytes()})
+            audio = np.concatenate(chunks, 0)
+        else:
+            audio = gptsovits.inference(text, ref_id=ref_audio_id, seed=seed)
 
         object_name = f'{TMP_PATH}/{str(uuid.uuid4())}.wav'
         sf.write(relative_base_path(object_name), audio, 32000, format='wav')
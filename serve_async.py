@@ -0,0 +1,91 @@
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from worker_pool import WorkerPool, QueueFullError, PoolDrainingError, DeadlineExceededError, WorkerCrashedError
+
+IS_DEBUG = os.getenv('IS_DEBUG', 'false').lower() == 'true'
+# 推理进程数、每个进程的最大排队数、请求超时(秒)、关闭时等待已接收请求完成的时间(秒)
+NUM_WORKERS = int(os.getenv('NUM_WORKERS', '0')) or None
+MAX_QUEUE_DEPTH = int(os.getenv('MAX_QUEUE_DEPTH', '8'))
+REQUEST_TIMEOUT = float(os.getenv('REQUEST_TIMEOUT', '120'))
+DRAIN_TIMEOUT = float(os.getenv('DRAIN_TIMEOUT', '60'))
+
+logging.basicConfig(level=logging.DEBUG if IS_DEBUG else logging.INFO)
+logger = logging.getLogger(__name__)
+
+pool = WorkerPool(num_workers=NUM_WORKERS, max_queue_depth=MAX_QUEUE_DEPTH)
+
+async def tts(request: Request):
+    data = await request.json()
+    if not data.get('text') or not data.get('model_id'):
+        return Response(status_code=400, content='缺少必要的参数')
+
+    timeout = float(data.get('timeout', REQUEST_TIMEOUT))
+    params = {
+        'text': data['text'],
+        'model_id': data['model_id'],
+        'ref_id': data.get('ref_id'),
+        'extra_ref_ids': data.get('extra_ref_ids', []),
+        'seed': data.get('seed'),
+    }
+    try:
+        future = pool.submit(params, timeout=timeout)
+    except QueueFullError as e:
+        return Response(status_code=429, content=str(e), headers={'Retry-After': '1'})
+    except PoolDrainingError as e:
+        return Response(status_code=503, content=str(e))
+
+    try:
+        result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+    except (asyncio.TimeoutError, DeadlineExceededError):
+        return Response(status_code=504, content='deadline exceeded')
+    except WorkerCrashedError as e:
+        return Response(status_code=503, content=str(e), headers={'Retry-After': '1'})
+    except Exception as e:
+        logger.error(e, exc_info=True)
+        return Response(status_code=500, content=str(e))
+
+    if data.get('is_upload', False):
+        from tools.file_service import FileService
+        file_service = FileService.get_instance()
+        object_name = await asyncio.to_thread(file_service.upload_tmp_file, result['audio'], ext='wav')
+        return JSONResponse({
+            'object_name': object_name,
+            'model_id': params['model_id'],
+            'ref_id': result['ref_id'],
+        })
+    return Response(result['audio'], media_type='audio/wav')
+
+async def pool_stats(request: Request):
+    return JSONResponse(pool.stats())
+
+@asynccontextmanager
+async def lifespan(app):
+    pool.start()
+    yield
+    # 优雅退出：拒绝新请求，等待已接收的请求完成
+    await asyncio.to_thread(pool.drain, DRAIN_TIMEOUT)
+
+app = Starlette(
+    debug=IS_DEBUG,
+    routes=[
+        Route('/tts', tts, methods=['POST']),
+        Route('/pool/stats', pool_stats, methods=['GET']),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan,
+)
+
+def main():
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=int(os.getenv('PORT', 55001)), timeout_graceful_shutdown=int(DRAIN_TIMEOUT))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+# T2S 相关测试共用的小模型，结构与正式模型相同，只减少层数
+import pytest
+
+T2S_CONFIG = {
+    "vocab_size": 1025,
+    "phoneme_vocab_size": 732,
+    "embedding_dim": 512,
+    "hidden_dim": 512,
+    "head": 16,
+    "linear_units": 2048,
+    "n_layer": 2,
+    "dropout": 0,
+    "EOS": 1024,
+}
+
+
+@pytest.fixture(scope='session')
+def t2s_config():
+    return dict(T2S_CONFIG)
+
+
+@pytest.fixture(scope='module')
+def t2s_model(t2s_config):
+    """每个测试模块一个实例，模块内可以替换其中的层"""
+    torch = pytest.importorskip('torch')
+    from gptsovits.AR.models.t2s_model import Text2SemanticDecoder
+    torch.manual_seed(0)
+    return Text2SemanticDecoder(t2s_config).eval()
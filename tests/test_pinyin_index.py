@@ -0,0 +1,46 @@
+# SYLLABLE_INDEX 应与逐音节重建映射表的原实现给出相同的音素
+import pytest
+from gptsovits.text.chinese.pinyin_index import SYLLABLE_INDEX, pinyin_to_symbol_map
+
+# 原实现的输出，覆盖各条改写规则：韵母缩写、零声母 y/w 替换、ü 与 er
+GOLDEN = {
+    ('b', 'a1'): ('b', 'a1'),
+    ('zh', 'ang4'): ('zh', 'ang4'),
+    ('g', 'uei4'): ('g', 'ui4'),
+    ('d', 'iou1'): ('d', 'iu1'),
+    ('l', 'uen2'): ('l', 'un2'),
+    ('', 'ing2'): ('y', 'ing2'),
+    ('', 'i3'): ('y', 'i3'),
+    ('', 'in1'): ('y', 'in1'),
+    ('', 'u3'): ('w', 'u3'),
+    ('', 'v4'): ('y', 'v4'),
+    ('', 'van2'): ('y', 'van2'),
+    ('', 'ia5'): ('y', 'a5'),
+    ('', 'iou2'): ('y', 'ou2'),
+    ('', 'uo3'): ('w', 'o3'),
+    ('', 'uei2'): ('w', 'ei2'),
+    ('', 'uen1'): ('w', 'en1'),
+    ('', 'e4'): ('EE', 'e4'),
+    ('', 'er2'): ('EE', 'er2'),
+    ('j', 'v1'): ('j', 'v1'),
+    ('x', 've2'): ('x', 've2'),
+}
+
+
+@pytest.mark.parametrize('key, phones', GOLDEN.items())
+def test_index_matches_legacy_mapping(key, phones):
+    assert SYLLABLE_INDEX[key] == phones
+
+
+@pytest.mark.parametrize('key', [('b', 'v1'), ('zh', 'ing1'), ('g', 'a6')])
+def test_invalid_syllables_are_missing(key):
+    # 原实现对不存在的音节 assert 失败
+    assert key not in SYLLABLE_INDEX
+
+
+def test_index_covers_every_opencpop_syllable():
+    phones = {(new_c, new_v[:-1]) for new_c, new_v in SYLLABLE_INDEX.values()}
+    expected = {tuple(value.split(' ')) for value in pinyin_to_symbol_map.values()}
+    assert phones == expected
+    # 原实现在全部 声母 x 韵母 x 声调 组合中接受的音节数
+    assert len(SYLLABLE_INDEX) == 2110
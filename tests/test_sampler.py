@@ -0,0 +1,39 @@
+# 指定 seed 的行，单独采样与和其他请求拼成 batch 采样应得到相同的 token
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from gptsovits.AR.models.sampler import Sampler
+
+VOCAB = 1025
+
+
+def make_sampler(top_k, seed, prompt_len=16):
+    prev_tokens = torch.randint(0, VOCAB - 1, (1, prompt_len), generator=torch.Generator().manual_seed(seed))
+    return Sampler(prev_tokens, VOCAB, top_k=top_k, top_p=1, temperature=1.0, generator=torch.Generator().manual_seed(seed))
+
+
+def sample_steps(sampler, logits, row=0):
+    return [sampler.sample(step_logits)[row].item() for step_logits in logits]
+
+
+@pytest.mark.parametrize('other_top_k', [3, 200, -1])
+def test_seeded_row_independent_of_batch(other_top_k):
+    steps = 20
+    logits = torch.randn(steps, 2, VOCAB, generator=torch.Generator().manual_seed(1)) * 3
+
+    alone = sample_steps(make_sampler(15, seed=42), logits[:, :1])
+    batched = Sampler.cat([make_sampler(15, seed=42), make_sampler(other_top_k, seed=7)])
+    assert sample_steps(batched, logits) == alone
+
+
+def test_seeded_row_after_index_select():
+    steps = 20
+    logits = torch.randn(steps, 2, VOCAB, generator=torch.Generator().manual_seed(2)) * 3
+
+    alone = sample_steps(make_sampler(15, seed=42), logits[:, 1:])
+    sampler = Sampler.cat([make_sampler(500, seed=7), make_sampler(15, seed=42)])
+    tokens = [sampler.sample(logits[0])[1].item()]
+    sampler.index_select(torch.tensor([1]))
+    tokens += sample_steps(sampler, logits[1:, 1:])
+    assert tokens == alone
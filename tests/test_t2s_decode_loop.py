@@ -0,0 +1,89 @@
+# 按块检查 EOS 的 infer_panel_naive 应与逐步同步 EOS 的原解码循环得到相同的 token
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from torch import nn
+from gptsovits.AR.models.sampler import Sampler
+
+TEXT_LEN = 12
+PROMPT_LEN = 20
+
+
+class EosAfter(nn.Module):
+    """从第 eos_step 次调用起让 EOS 的 logit 最大，模拟在指定步数生成 EOS"""
+    def __init__(self, layer, eos, eos_step):
+        super().__init__()
+        self.layer = layer
+        self.eos = eos
+        self.eos_step = eos_step
+        self.calls = 0
+
+    def forward(self, x):
+        logits = self.layer(x)
+        if self.eos_step is not None and self.calls >= self.eos_step:
+            logits[..., self.eos] = logits.max() + 100
+        self.calls += 1
+        return logits
+
+
+def decode_per_step_sync(model, x, prompts, bert_feature, steps, seed):
+    """原实现：每步把 EOS 判断同步回 host，torch.concat 追加 y"""
+    xy_pos, xy_attn_mask, y, y_len, prefix_len, _ = model.prepare_prompt(x, prompts, bert_feature)
+    sampler = Sampler(y, model.vocab_size, top_k=15, top_p=1, temperature=1, repetition_penalty=1.35, generator=torch.Generator().manual_seed(seed))
+    xy_dec, kv_cache = model.t2s_transformer.process_prompt(xy_pos, xy_attn_mask, None, True, xy_pos.shape[1] + steps)
+    for idx in range(steps):
+        if idx > 0:
+            xy_dec, kv_cache = model.t2s_transformer.decode_next_token(xy_pos, kv_cache)
+        logits = model.ar_predict_layer(xy_dec[:, -1])
+        if idx == 0:
+            logits = logits[:, :-1]
+        samples = sampler.sample(logits)
+        y = torch.concat([y, samples], dim=1)
+        if y.shape[1] - prefix_len > steps - 1:
+            break
+        if torch.argmax(logits, dim=-1)[0] == model.EOS or samples[0, 0] == model.EOS:
+            break
+        y_emb = model.ar_audio_embedding(y[:, -1:])
+        position = model.ar_audio_position
+        xy_pos = y_emb * position.x_scale + position.alpha * position.pe[:, y_len + idx].to(dtype=y_emb.dtype)
+    return y[:, :-1]
+
+
+@pytest.fixture(scope='module')
+def inputs(t2s_model, t2s_config):
+    t2s_model.ar_predict_layer = EosAfter(t2s_model.ar_predict_layer, t2s_config['EOS'], None)
+    g = torch.Generator().manual_seed(0)
+    x = torch.randint(0, t2s_config['phoneme_vocab_size'], (1, TEXT_LEN), generator=g)
+    prompts = torch.randint(0, t2s_config['EOS'], (1, PROMPT_LEN), generator=g)
+    bert_feature = torch.randn(1, 1024, TEXT_LEN, generator=g)
+    return t2s_model, x, prompts, bert_feature
+
+
+def decode_both(inputs, steps, eos_step, eos_check_interval, seed=0):
+    model, x, prompts, bert_feature = inputs
+    model.ar_predict_layer.eos_step = eos_step
+    with torch.no_grad():
+        model.ar_predict_layer.calls = 0
+        y_sync = decode_per_step_sync(model, x, prompts, bert_feature, steps, seed)
+        model.ar_predict_layer.calls = 0
+        y_blocked, _ = model.infer_panel_naive(
+            x, None, prompts, bert_feature, top_k=15, top_p=1, temperature=1, early_stop_num=steps - 1,
+            generator=torch.Generator().manual_seed(seed), eos_check_interval=eos_check_interval,
+        )
+    return y_sync.long(), y_blocked.long()
+
+
+@pytest.mark.parametrize('eos_step', [1, 7, 8, 11])
+@pytest.mark.parametrize('eos_check_interval', [1, 8])
+def test_blocked_eos_matches_per_step(inputs, eos_step, eos_check_interval):
+    y_sync, y_blocked = decode_both(inputs, 40, eos_step, eos_check_interval)
+    assert y_blocked.shape[1] == PROMPT_LEN + eos_step
+    assert torch.equal(y_sync, y_blocked)
+
+
+@pytest.mark.parametrize('steps', [8, 21])
+def test_early_stop_without_eos_matches_per_step(inputs, steps):
+    y_sync, y_blocked = decode_both(inputs, steps, None, 8)
+    assert y_blocked.shape[1] == PROMPT_LEN + steps - 1
+    assert torch.equal(y_sync, y_blocked)
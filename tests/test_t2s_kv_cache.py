@@ -0,0 +1,72 @@
+# 预分配 KV 缓存的解码结果应与逐步 torch.cat 缓存的原实现一致
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from torch.nn import functional as F
+
+
+def concat_decode_next_token(block, x, k_cache, v_cache):
+    """原实现：每步把新的 k/v torch.cat 到整个缓存后面"""
+    q, k, v = F.linear(x, block.qkv_w, block.qkv_b).chunk(3, dim=-1)
+    k_cache = torch.cat([k_cache, k], dim=1)
+    v_cache = torch.cat([v_cache, v], dim=1)
+    batch_size, q_len, kv_len = q.shape[0], q.shape[1], k_cache.shape[1]
+    q = q.view(batch_size, q_len, block.num_heads, -1).transpose(1, 2)
+    k = k_cache.view(batch_size, kv_len, block.num_heads, -1).transpose(1, 2)
+    v = v_cache.view(batch_size, kv_len, block.num_heads, -1).transpose(1, 2)
+    attn = F.scaled_dot_product_attention(q, k, v)
+    attn = attn.permute(2, 0, 1, 3).reshape(batch_size * q_len, block.hidden_dim)
+    attn = attn.view(q_len, batch_size, block.hidden_dim).transpose(1, 0)
+    x = x + F.linear(attn, block.out_w, block.out_b)
+    x = F.layer_norm(x, [block.hidden_dim], block.norm_w1, block.norm_b1, block.norm_eps1)
+    x = x + block.mlp.forward(x)
+    x = F.layer_norm(x, [block.hidden_dim], block.norm_w2, block.norm_b2, block.norm_eps2)
+    return x, k_cache, v_cache
+
+
+def decode_concat(model, xy_pos, attn_mask, steps):
+    transformer = model.t2s_transformer
+    xy_dec, kv_cache = transformer.process_prompt(xy_pos, attn_mask, None)
+    k_cache = [k[:, :kv_cache.length] for k in kv_cache.k_cache]
+    v_cache = [v[:, :kv_cache.length] for v in kv_cache.v_cache]
+    x = xy_dec[:, -1:]
+    for _ in range(steps):
+        for i, block in enumerate(transformer.blocks):
+            x, k_cache[i], v_cache[i] = concat_decode_next_token(block, x, k_cache[i], v_cache[i])
+    return x
+
+
+def decode_preallocated(model, xy_pos, attn_mask, steps, max_len):
+    transformer = model.t2s_transformer
+    xy_dec, kv_cache = transformer.process_prompt(xy_pos, attn_mask, None, True, max_len)
+    x = xy_dec[:, -1:]
+    for _ in range(steps):
+        x, kv_cache = transformer.decode_next_token(x, kv_cache)
+    return x, kv_cache
+
+
+def make_prompt(config, prompt_len):
+    xy_pos = torch.randn(1, prompt_len, config['hidden_dim'])
+    attn_mask = torch.zeros(1, config['head'], prompt_len, prompt_len, dtype=torch.bool)
+    return xy_pos, attn_mask
+
+
+@pytest.mark.parametrize('prompt_len, steps', [(1, 5), (37, 40)])
+def test_preallocated_matches_concat(t2s_model, t2s_config, prompt_len, steps):
+    xy_pos, attn_mask = make_prompt(t2s_config, prompt_len)
+    with torch.no_grad():
+        expected = decode_concat(t2s_model, xy_pos, attn_mask, steps)
+        x, _ = decode_preallocated(t2s_model, xy_pos, attn_mask, steps, prompt_len + steps)
+    torch.testing.assert_close(x, expected)
+
+
+def test_cache_grows_past_preallocated_length(t2s_model, t2s_config):
+    # 预分配长度不够时 reserve 按倍数扩容，已写入的历史保持不变
+    xy_pos, attn_mask = make_prompt(t2s_config, 16)
+    with torch.no_grad():
+        expected = decode_concat(t2s_model, xy_pos, attn_mask, 20)
+        x, kv_cache = decode_preallocated(t2s_model, xy_pos, attn_mask, 20, 18)
+    assert kv_cache.length == 36
+    assert kv_cache.capacity() >= 36
+    torch.testing.assert_close(x, expected)
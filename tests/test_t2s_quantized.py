@@ -0,0 +1,28 @@
+# 量化后 T2S 的内存统计应包含 int8 打包权重
+import pytest
+
+torch = pytest.importorskip('torch')
+
+if 'fbgemm' not in torch.backends.quantized.supported_engines and 'qnnpack' not in torch.backends.quantized.supported_engines:
+    pytest.skip('quantized engine not available', allow_module_level=True)
+
+from gptsovits.AR.models.t2s_quantized import quantize_t2s, quantized_memory_size
+
+
+def tensor_bytes(module):
+    return sum(tensor.numel() * tensor.element_size() for tensor in list(module.parameters()) + list(module.buffers()))
+
+
+def test_quantized_memory_size_counts_packed_weights(t2s_model, t2s_config):
+    assert quantized_memory_size(t2s_model) == 0
+    float_bytes = tensor_bytes(t2s_model)
+
+    quantize_t2s(t2s_model)
+    d, units, vocab = t2s_config['hidden_dim'], t2s_config['linear_units'], t2s_config['vocab_size']
+    # 每层 qkv / out / mlp 的 int8 权重与 float32 bias，ar_predict_layer 无 bias
+    layer_bytes = (3 * d * d + d * d + 2 * d * units) + 4 * (3 * d + d + units + d)
+    packed = t2s_config['n_layer'] * layer_bytes + vocab * d
+    assert quantized_memory_size(t2s_model) == pytest.approx(packed, rel=0.01)
+
+    total = tensor_bytes(t2s_model) + quantized_memory_size(t2s_model)
+    assert 0 < total < float_bytes
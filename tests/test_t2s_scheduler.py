@@ -0,0 +1,85 @@
+# 相同 seed 下，连续批处理的 T2SScheduler 与逐句解码的 infer_panel_naive 应得到相同的 token
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from gptsovits.model import GPTSovitsModel
+from gptsovits.scheduler import T2SRequest, T2SScheduler
+
+TEXT_LEN = 12
+PROMPT_LEN = 20
+
+
+def make_inputs(config, seed):
+    g = torch.Generator().manual_seed(seed)
+    x = torch.randint(0, config['phoneme_vocab_size'], (1, TEXT_LEN), generator=g)
+    prompts = torch.randint(0, config['EOS'], (1, PROMPT_LEN), generator=g)
+    bert_feature = torch.randn(1, 1024, TEXT_LEN, generator=g)
+    return x, prompts, bert_feature
+
+
+def decode_naive(model, inputs, seed, **kwargs):
+    x, prompts, bert_feature = inputs
+    with torch.no_grad():
+        y, idx = model.infer_panel_naive(x, None, prompts, bert_feature, generator=torch.Generator().manual_seed(seed), **kwargs)
+    return y[:, -idx:]
+
+
+@pytest.mark.parametrize('early_stop_num', [5, 19])
+def test_scheduler_matches_naive(t2s_model, t2s_config, early_stop_num):
+    inputs = make_inputs(t2s_config, 1)
+    expected = decode_naive(t2s_model, inputs, 42, top_k=15, early_stop_num=early_stop_num)
+
+    scheduler = T2SScheduler(t2s_model)
+    try:
+        x, prompts, bert_feature = inputs
+        y, idx = scheduler.infer_panel(x, None, prompts, bert_feature, top_k=15, early_stop_num=early_stop_num, generator=torch.Generator().manual_seed(42))
+    finally:
+        scheduler.close()
+    assert torch.equal(y[:, -idx:], expected)
+
+
+def test_sentence_generators_independent_of_batching(t2s_model, t2s_config):
+    # 同一请求的多句话并发进入 scheduler 与逐句解码的结果相同
+    gptsovits_model = GPTSovitsModel(SimpleNamespace(model=t2s_model), None)
+    gptsovits_model.hz, gptsovits_model.max_sec = 20, 1
+    sentences = [make_inputs(t2s_config, i) for i in range(3)]
+
+    def extract(i):
+        x, prompts, bert_feature = sentences[i]
+        generator = gptsovits_model.create_generators(7, i)['t2s_generator']
+        return gptsovits_model._extract_pred_semantic(x, None, prompts, bert_feature, generator)
+
+    expected = [extract(i) for i in range(len(sentences))]
+    gptsovits_model.enable_batching(max_batch_size=4)
+    try:
+        with ThreadPoolExecutor(len(sentences)) as executor:
+            batched = list(executor.map(extract, range(len(sentences))))
+    finally:
+        gptsovits_model.disable_batching()
+    for a, b in zip(batched, expected):
+        assert torch.equal(a, b)
+
+
+def test_row_independent_of_batch_mates(t2s_model, t2s_config):
+    # 其他行的 top_k 不同、提前到达 early stop 触发额外的 EOS 检查，都不影响本行的 token
+    inputs = make_inputs(t2s_config, 1)
+    expected = decode_naive(t2s_model, inputs, 42, top_k=15, early_stop_num=30)
+
+    scheduler = T2SScheduler(t2s_model)
+    requests = [
+        T2SRequest(*make_inputs(t2s_config, 2), 200, 100, 1.0, 1.35, 5, torch.Generator().manual_seed(1)),
+        T2SRequest(*inputs, 15, 100, 1.0, 1.35, 30, torch.Generator().manual_seed(42)),
+        T2SRequest(*make_inputs(t2s_config, 3), -1, 100, 1.0, 1.35, 13, torch.Generator().manual_seed(2)),
+    ]
+    # 先放入队列再启动调度线程，保证三个请求在同一个 batch 中解码
+    for request in requests:
+        scheduler.pending.put(request)
+    try:
+        scheduler._ensure_started()
+        y, idx = requests[1].future.result()
+    finally:
+        scheduler.close()
+    assert torch.equal(y[:, -idx:], expected)
@@ -0,0 +1,69 @@
+# WorkerPool 的取消、推理进程崩溃与 drain 路径，推理进程换成不加载模型的假 worker
+import os
+import time
+import pytest
+import worker_pool
+from worker_pool import WorkerPool, WorkerCrashedError, PoolDrainingError
+
+
+def fake_worker(worker_index, request_queue, result_conn):
+    # params: sleep 处理耗时 (秒)，crash 为 True 时直接退出进程
+    while True:
+        job = request_queue.get()
+        if job is None:
+            break
+        request_id, deadline, params = job
+        if params.get('crash'):
+            os._exit(1)
+        time.sleep(params.get('sleep', 0))
+        result_conn.send((request_id, {'pid': os.getpid(), 'text': params.get('text')}, None))
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(worker_pool, 'WORKER_CHECK_INTERVAL', 0.1)
+    pool = WorkerPool(num_workers=1, max_queue_depth=4, worker_target=fake_worker)
+    pool.start()
+    yield pool
+    pool.drain(timeout=5)
+
+
+def test_late_result_for_cancelled_request_is_dropped(pool):
+    cancelled = pool.submit({'model_id': 'a', 'text': 'slow', 'sleep': 0.5})
+    assert cancelled.cancel()
+    result = pool.submit({'model_id': 'a', 'text': 'next'}).result(timeout=10)
+    assert result['text'] == 'next'
+    assert pool._result_thread.is_alive()
+    assert pool.stats()['queue_depths'] == [0]
+
+
+def test_crashed_worker_fails_pending_and_restarts(pool):
+    first_pid = pool.submit({'model_id': 'a'}).result(timeout=10)['pid']
+    crashed = pool.submit({'model_id': 'a', 'crash': True})
+    queued = pool.submit({'model_id': 'a', 'text': 'queued'})
+    with pytest.raises(WorkerCrashedError):
+        crashed.result(timeout=10)
+    with pytest.raises(WorkerCrashedError):
+        queued.result(timeout=10)
+
+    result = pool.submit({'model_id': 'a', 'text': 'after'}).result(timeout=10)
+    assert result['text'] == 'after'
+    assert result['pid'] != first_pid
+    stats = pool.stats()
+    assert stats['restarts'] == 1
+    assert stats['queue_depths'] == [0]
+
+
+def test_drain_skips_cancelled_requests(monkeypatch):
+    monkeypatch.setattr(worker_pool, 'WORKER_CHECK_INTERVAL', 0.1)
+    pool = WorkerPool(num_workers=1, worker_target=fake_worker)
+    pool.start()
+    cancelled = pool.submit({'model_id': 'a', 'sleep': 2})
+    pending = pool.submit({'model_id': 'a', 'sleep': 2})
+    cancelled.cancel()
+    pool.drain(timeout=0.5)
+    assert cancelled.cancelled()
+    with pytest.raises(PoolDrainingError):
+        pending.result(timeout=1)
+    with pytest.raises(PoolDrainingError):
+        pool.submit({'model_id': 'a'})
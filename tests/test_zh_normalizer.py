@@ -0,0 +1,54 @@
+# 按触发字符预筛的中文文本规范化应与逐条执行全部规则的原实现输出一致
+import pytest
+from gptsovits.text.chinese.zh_normalization import text_normlization as tn
+
+# (分句后的句子, 原实现的输出)，覆盖各条规则及其触发字符，原实现的怪异输出同样保留
+GOLDEN = [
+    ('纯中文句子，', '纯中文句子，'),
+    ('没有任何需要规范化的内容。', '没有任何需要规范化的内容。'),
+    ('2的3次方等于8，', '二的三次方等于八，'),
+    ('x2+y2=1。', 'x二加y二等于一。'),
+    ('3+5-2*4=0，', '三加五减二*四等于零，'),
+    ('12/4=3。', '四分之十二等于三。'),
+    ('温度从-10°C升到25℃，', '温度从零下十度升到二十五度，'),
+    ('湿度60%~80%。', '湿度百分之六十至百分之八十。'),
+    ('电话：', '电话：'),
+    ('010-12345678，', '零幺零减幺二三四五六七八，'),
+    ('手机：', '手机：'),
+    ('+8613912345678。', '八六幺三九幺二三四五六七八。'),
+    ('会议时间：', '会议时间：'),
+    ('2024年5月1日10:30至2024/05/0218:00。', '二零二四年五月一日十点半至二零二四年五月二日十八点。'),
+    ('价格为1,', '价格为一,'),
+    ('234.56元，', '二百三十四点五六元，'),
+    ('约合$170。', '约合$幺七零。'),
+    ('第1000名，', '第一千名，'),
+    ('共3/4的人参加，', '共四分之三的人参加，'),
+    ('-0.5分。', '负零零点五分。'),
+    ('全角数字１２３和ＡＢＣ，', '全角数字幺二三和ABC，'),
+    ('以及繁體字測試。', '以及繁体字测试。'),
+    ('标题注释括号引号破折号。', '标题注释括号引号破折号。'),
+    ('ABC-123型号，', 'ABC减幺二三型号，'),
+    ('长宽高为3m×2m×1m。', '长宽高为三米乘二米乘一米。'),
+    ('截至2024-06-30，', '截至二零二四年六月三十日，'),
+    ('该基金累计净值为1.2345元，', '该基金累计净值为一点二三四五元，'),
+    ('近一年收益率为12.5%。', '近一年收益率为百分之十二点五。'),
+    ('本次活动时间为8:30-12:30，', '本次活动时间为八点半至十二点半，'),
+    ('请各位参会代表提前十五分钟到场签到。', '请各位参会代表提前十五分钟到场签到。'),
+    ('客服热线400-123-4567，', '客服热线四零零减幺二三减四五六七，'),
+    ('工作时间为每天9:00~21:00。', '工作时间为每天九点至二十一点。'),
+    ('这款保温杯容量500ml，', '这款保温杯容量五百毫升，'),
+    ('采用304不锈钢内胆，', '采用三零四不锈钢内胆，'),
+    ('保温时长可达12小时。', '保温时长可达十二小时。'),
+    ('詳細資訊請聯繫客服中心，', '详细资讯请联系客服中心，'),
+    ('我們將竭誠為您服務。', '我们将竭诚为您服务。'),
+]
+
+
+@pytest.mark.parametrize('sentence, expected', GOLDEN)
+def test_prescreened_rules_match_legacy(sentence, expected):
+    assert tn.zh_text_normalizer.normalize_sentence(sentence) == expected
+
+
+def test_split_then_normalize():
+    # normalize 先分句再逐句规范化
+    assert tn.zh_text_normalizer.normalize('温度25℃，湿度60%。') == ['温度二十五度，', '湿度百分之六十。']
@@ -1,10 +1,17 @@
 from tools.path import abs_path
 import ffmpeg
 import os
-from typing import List
+from typing import Iterable, Iterator, List
+import struct
+import threading
 import zipfile
+import logging
+
+logger = logging.getLogger(__name__)
 
 IS_WINDOWS = os.name == 'nt'
+# 流式编码结束时等待 PCM 写入线程退出的时间 (秒)
+STREAM_WRITER_JOIN_TIMEOUT = 5
 
 if IS_WINDOWS:
     os.environ['FFMPEG_BINARY'] = os.path.join(os.getcwd(), 'ffmpeg.exe')
@@ -36,3 +43,59 @@ def pack_wav_files(input_files: List[str], output_file: str) -> str:
         for input_file in input_files:
             zip.write(input_file, os.path.basename(input_file))
     return output_file
+
+def wav_stream_header(sample_rate: int = 32000, channels: int = 1, sample_width: int = 2) -> bytes:
+    # 流式输出时总长度未知，RIFF/data 大小填 0xFFFFFFFF，播放器会读到流结束为止
+    byte_rate = sample_rate * channels * sample_width
+    block_align = channels * sample_width
+    return b''.join([
+        b'RIFF', struct.pack('<I', 0xFFFFFFFF), b'WAVE',
+        b'fmt ', struct.pack('<IHHIIHH', 16, 1, channels, sample_rate, byte_rate, block_align, sample_width * 8),
+        b'data', struct.pack('<I', 0xFFFFFFFF),
+    ])
+
+def encode_opus_stream(pcm_chunks: Iterable[bytes], sample_rate: int = 32000, bitrate: str = '32k') -> Iterator[bytes]:
+    # 通过 ffmpeg 管道把 16bit PCM 分块编码为 ogg/opus，边写边读
+    process = (
+        ffmpeg
+        .input('pipe:', format='s16le', ar=sample_rate, ac=1)
+        .output('pipe:', format='ogg', acodec='libopus', audio_bitrate=bitrate, flush_packets=1)
+        .run_async(pipe_stdin=True, pipe_stdout=True, quiet=True)
+    )
+
+    errors = []
+
+    def feed():
+        try:
+            for chunk in pcm_chunks:
+                process.stdin.write(chunk)
+                process.stdin.flush()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    finished = False
+    try:
+        while True:
+            data = process.stdout.read1(4096)
+            if not data:
+                break
+            yield data
+        finished = True
+    finally:
+        # 客户端中途断开时没有人再读 stdout，feeder 会阻塞在 stdin.write，先结束 ffmpeg 再等待 feeder
+        process.stdout.close()
+        if not finished:
+            process.kill()
+        process.wait()
+        writer.join(timeout=STREAM_WRITER_JOIN_TIMEOUT)
+        if writer.is_alive():
+            logger.warning('opus stream feeder did not stop within %.0fs', STREAM_WRITER_JOIN_TIMEOUT)
+    if errors:
+        raise errors[0]
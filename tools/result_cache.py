@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class ResultCache:
+    """
+    整句合成结果的磁盘缓存，相同的请求参数直接返回已合成的 wav。
+    超过 max_bytes 时按 LRU 淘汰，超过 ttl 秒的条目视为过期。
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = 1024 * 1024 * 1024, ttl: float = 7 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._scan()
+
+    @staticmethod
+    def make_key(**params):
+        return hashlib.sha1(json.dumps(params, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def get(self, key: str):
+        """返回缓存的 wav 字节，未命中或过期返回 None"""
+        with self.lock:
+            entry = self._get_entry(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        try:
+            with open(self._wav_path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            with self.lock:
+                self._remove(key)
+            return None
+
+    def put(self, key: str, wav_bytes: bytes):
+        wav_path = self._wav_path(key)
+        tmp_path = f'{wav_path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(wav_bytes)
+        os.replace(tmp_path, wav_path)
+        entry = {'size': len(wav_bytes), 'created_at': time.time()}
+        self._write_meta(key, entry)
+        with self.lock:
+            self._remove(key, delete_files=False)
+            self.entries[key] = entry
+            self.total_bytes += entry['size']
+            self._evict()
+
+    def stats(self):
+        with self.lock:
+            return {'size': len(self.entries), 'bytes': self.total_bytes, 'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses}
+
+    def _get_entry(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl and time.time() - entry['created_at'] > self.ttl:
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self.entries:
+            key = next(iter(self.entries))
+            self._remove(key)
+
+    def _remove(self, key, delete_files=True):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry['size']
+        if delete_files:
+            for path in (self._wav_path(key), self._meta_path(key)):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _scan(self):
+        # 重启后从磁盘恢复索引，按文件修改时间近似 LRU 顺序
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            key = name[:-len('.json')]
+            try:
+                with open(self._meta_path(key), 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                if not os.path.exists(self._wav_path(key)):
+                    continue
+                entries.append((os.path.getmtime(self._meta_path(key)), key, entry))
+            except (OSError, ValueError) as e:
+                logger.warning('invalid result cache entry %s: %s', name, e)
+        for _, key, entry in sorted(entries):
+            self.entries[key] = entry
+            self.total_bytes += entry['size']
+        self._evict()
+
+    def _write_meta(self, key, entry):
+        with open(self._meta_path(key), 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+
+    def _wav_path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.wav')
+
+    def _meta_path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.json')
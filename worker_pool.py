@@ -0,0 +1,239 @@
+import os
+import io
+import time
+import uuid
+import zlib
+import logging
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+from concurrent.futures import Future, InvalidStateError
+
+logger = logging.getLogger(__name__)
+
+# 检查推理进程是否存活的间隔 (秒)
+WORKER_CHECK_INTERVAL = float(os.getenv('WORKER_CHECK_INTERVAL', '1'))
+
+class QueueFullError(Exception):
+    pass
+
+class PoolDrainingError(Exception):
+    pass
+
+class DeadlineExceededError(Exception):
+    pass
+
+class WorkerCrashedError(Exception):
+    pass
+
+def _resolve_future(future: Future, result=None, error: Exception = None):
+    # 请求超时或客户端断开时 future 已被取消，迟到的结果直接丢弃
+    if future.done():
+        return
+    try:
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+def _worker_main(worker_index, request_queue, result_conn):
+    # 每个推理进程持有自己的 GPTSovitsManager，只加载路由到自己的音色
+    import soundfile as sf
+    from gptsovits_manager import GPTSovitsManager
+
+    logging.basicConfig(level=logging.INFO)
+    mgr = GPTSovitsManager()
+    logger.info('inference worker %d started (pid %d)', worker_index, os.getpid())
+
+    while True:
+        job = request_queue.get()
+        if job is None:
+            break
+        request_id, deadline, params = job
+        if deadline is not None and time.time() > deadline:
+            result_conn.send((request_id, None, DeadlineExceededError('deadline exceeded before start')))
+            continue
+        try:
+            gptsovits = mgr.get(params['model_id'], auto_download=True)
+            ref_id = params.get('ref_id') or gptsovits.get_random_ref_id()
+            audio = gptsovits.inference(params['text'], ref_id=ref_id, extra_ref_ids=params.get('extra_ref_ids'), seed=params.get('seed'))
+            wav_io = io.BytesIO()
+            sf.write(wav_io, audio, 32000, format='wav')
+            result_conn.send((request_id, {'audio': wav_io.getvalue(), 'ref_id': ref_id}, None))
+        except Exception as e:
+            logger.error(e, exc_info=True)
+            # 任意异常不一定能 pickle，统一转换后传回主进程
+            result_conn.send((request_id, None, RuntimeError(str(e))))
+
+    logger.info('inference worker %d stopped', worker_index)
+
+class WorkerPool:
+    """
+    推理进程池：按 model_id 粘性路由到固定的进程，每个进程只持有部分音色。
+    每个进程的排队数超过 max_queue_depth 时拒绝新请求，drain 时等待已接收的请求完成。
+    推理进程异常退出时，分配给它的请求以 WorkerCrashedError 失败，并在原位置重启进程。
+    """
+    def __init__(self, num_workers: int = None, max_queue_depth: int = 8, worker_target=_worker_main):
+        self.num_workers = num_workers or max(1, (os.cpu_count() or 1) // 4)
+        self.max_queue_depth = max_queue_depth
+        self.worker_target = worker_target
+        self.context = multiprocessing.get_context('spawn')
+        # 每个进程独立的请求队列和结果管道：进程被强杀时可能持有共享队列的锁，重启时全部换新
+        self.request_queues = [None] * self.num_workers
+        self.result_conns = [None] * self.num_workers
+        self.processes = [None] * self.num_workers
+        self.stopped_workers = set()
+        self.pending = {}
+        self.depths = [0] * self.num_workers
+        self.lock = threading.Lock()
+        self.draining = False
+        self.stopped = False
+        self.restarts = 0
+        self._result_thread = None
+
+    def start(self):
+        for i in range(self.num_workers):
+            self._spawn(i)
+        self._result_thread = threading.Thread(target=self._collect_results, name='worker-pool-results', daemon=True)
+        self._result_thread.start()
+
+    def _spawn(self, worker_index: int):
+        request_queue = self.context.Queue()
+        result_reader, result_writer = self.context.Pipe(duplex=False)
+        process = self.context.Process(target=self.worker_target, args=(worker_index, request_queue, result_writer), daemon=True)
+        process.start()
+        result_writer.close()
+        self.request_queues[worker_index] = request_queue
+        self.result_conns[worker_index] = result_reader
+        self.processes[worker_index] = process
+
+    def route(self, model_id: str) -> int:
+        # crc32 在进程间稳定，保证同一音色总是落在同一个进程
+        return zlib.crc32(model_id.encode('utf-8')) % self.num_workers
+
+    def submit(self, params: dict, timeout: float = None) -> Future:
+        worker_index = self.route(params['model_id'])
+        with self.lock:
+            if self.draining:
+                raise PoolDrainingError('worker pool is draining')
+            if self.depths[worker_index] >= self.max_queue_depth:
+                raise QueueFullError(f'worker {worker_index} queue is full')
+            self.depths[worker_index] += 1
+            request_id = str(uuid.uuid4())
+            future = Future()
+            self.pending[request_id] = (future, worker_index)
+            request_queue = self.request_queues[worker_index]
+        deadline = time.time() + timeout if timeout else None
+        request_queue.put((request_id, deadline, params))
+        return future
+
+    def _collect_results(self):
+        # 同时等待结果管道和进程 sentinel，进程退出时 sentinel 变为就绪
+        while not self.stopped:
+            with self.lock:
+                conns = {
+                    self.result_conns[i]: i for i in range(self.num_workers) if i not in self.stopped_workers
+                }
+                sentinels = {
+                    self.processes[i].sentinel: i for i in range(self.num_workers) if i not in self.stopped_workers
+                }
+            ready = wait(list(conns) + list(sentinels), timeout=WORKER_CHECK_INTERVAL)
+            for obj in ready:
+                if obj in conns:
+                    self._receive(conns[obj])
+            for obj in ready:
+                if obj in sentinels:
+                    try:
+                        self._handle_exit(sentinels[obj])
+                    except Exception as e:
+                        logger.error('failed to restart inference worker %d: %s', sentinels[obj], e, exc_info=True)
+
+    def _receive(self, worker_index: int):
+        conn = self.result_conns[worker_index]
+        try:
+            while conn.poll():
+                self._deliver(*conn.recv())
+        except (EOFError, OSError):
+            # 进程已退出，由 sentinel 处理
+            pass
+
+    def _deliver(self, request_id, result, error):
+        with self.lock:
+            future, worker_index = self.pending.pop(request_id, (None, None))
+            if worker_index is not None:
+                self.depths[worker_index] -= 1
+        if future is None:
+            return
+        try:
+            _resolve_future(future, result, error)
+        except Exception as e:
+            logger.error('failed to deliver result of request %s: %s', request_id, e, exc_info=True)
+
+    def _handle_exit(self, worker_index: int):
+        """进程退出后先收完已发出的结果，再让其余排队请求失败；非 drain 时重启该进程"""
+        self._receive(worker_index)
+        process = self.processes[worker_index]
+        # sentinel 就绪后回收进程，得到 exitcode
+        process.join(1)
+        with self.lock:
+            failed = [request_id for request_id, (_, index) in self.pending.items() if index == worker_index]
+            futures = [self.pending.pop(request_id)[0] for request_id in failed]
+            self.depths[worker_index] = 0
+            old_queue = self.request_queues[worker_index]
+            self.result_conns[worker_index].close()
+            if self.draining:
+                self.stopped_workers.add(worker_index)
+            else:
+                self.restarts += 1
+                self._spawn(worker_index)
+        if not self.draining:
+            logger.error(
+                'inference worker %d (pid %s) exited with code %s, failed %d pending requests',
+                worker_index, process.pid, process.exitcode, len(futures),
+            )
+        # 旧队列没有消费者了，不等待其后台线程把数据写完
+        old_queue.cancel_join_thread()
+        old_queue.close()
+        for future in futures:
+            if self.draining:
+                _resolve_future(future, error=PoolDrainingError('worker pool stopped'))
+            else:
+                _resolve_future(future, error=WorkerCrashedError(f'inference worker {worker_index} exited'))
+
+    def stats(self):
+        with self.lock:
+            return {
+                'num_workers': self.num_workers,
+                'queue_depths': list(self.depths),
+                'max_queue_depth': self.max_queue_depth,
+                'restarts': self.restarts,
+                'draining': self.draining,
+            }
+
+    def drain(self, timeout: float = 60):
+        """停止接收新请求，等待已接收的请求完成后关闭推理进程"""
+        with self.lock:
+            self.draining = True
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self.lock:
+                if not self.pending:
+                    break
+            time.sleep(0.1)
+        with self.lock:
+            request_queues = [queue for i, queue in enumerate(self.request_queues) if i not in self.stopped_workers]
+        for request_queue in request_queues:
+            request_queue.put(None)
+        for process in self.processes:
+            process.join(max(0, deadline - time.time()))
+            if process.is_alive():
+                process.terminate()
+        self.stopped = True
+        if self._result_thread is not None:
+            self._result_thread.join(WORKER_CHECK_INTERVAL * 2)
+        with self.lock:
+            for future, _ in self.pending.values():
+                _resolve_future(future, error=PoolDrainingError('worker pool stopped'))
+            self.pending.clear()